@@ -8,9 +8,10 @@ from flask_bcrypt import Bcrypt
 from flask_migrate import Migrate
 from flask_wtf.csrf import CSRFProtect
 from config import config
+from app.replica import RoutingSession
 
 # Initialize Flask extensions
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 login_manager = LoginManager()
 bcrypt = Bcrypt()
 migrate = Migrate()
@@ -32,6 +33,13 @@ def create_app(config_name='default'):
     # Load configuration
     app.config.from_object(config[config_name])
     
+    # Compiled templates are cached on disk (must be set before jinja_env is first used)
+    configure_template_cache(app)
+    
+    # Instrumented connection pools (must be configured before the engines are created)
+    from app.db_pool import configure_pool
+    configure_pool(app)
+    
     # Initialize extensions with app
     db.init_app(app)
     login_manager.init_app(app)
@@ -39,6 +47,14 @@ def create_app(config_name='default'):
     migrate.init_app(app, db)
     csrf.init_app(app)
     
+    # In-process donor search index
+    from app.donor_index import donor_index
+    donor_index.init_app(app)
+    
+    # Cross-worker cache for counters and other hot reads
+    from app.cache import cache
+    cache.init_app(app)
+    
     # Configure Flask-Login
     login_manager.login_view = 'auth.login'
     login_manager.login_message = 'Please log in to access this page.'
@@ -57,12 +73,28 @@ def create_app(config_name='default'):
     app.register_blueprint(patient_bp, url_prefix='/patient')
     app.register_blueprint(admin_bp, url_prefix='/admin')
     
+    # Route read-only views to the read replica (DATABASE_REPLICA_URL)
+    from app.replica import init_replica
+    init_replica(app)
+    
+    # Per-request SQL query counting and N+1 warnings
+    from app.instrumentation import init_instrumentation
+    init_instrumentation(app)
+    
+    # Warn when the pools can exceed the database's connection limit
+    from app.db_pool import check_pool_budget
+    check_pool_budget(app)
+    
     # Register error handlers
     register_error_handlers(app)
     
     # Register template filters
     register_template_filters(app)
     
+    # Fingerprinted static assets (built with `flask build-assets`)
+    from app.assets import init_assets
+    init_assets(app)
+    
     # Initialize database tables on startup (tables only, admin is created in build script)
     with app.app_context():
         try:
@@ -71,9 +103,40 @@ def create_app(config_name='default'):
         except Exception as e:
             print(f"Note: Database initialization during startup: {e}")
     
+    # Indexed user search for the admin pages
+    from app.search import init_search
+    init_search(app)
+    
+    # Cached user/profile loading for Flask-Login
+    from app.identity import init_identity_cache
+    init_identity_cache(app)
+    
+    # Incrementally maintained blood group statistics
+    from app.stats import init_stats
+    init_stats(app)
+    
     return app
 
 
+def configure_template_cache(app):
+    """
+    Store compiled Jinja bytecode on disk so new workers skip template compilation.
+    
+    The cache is filled at build time by `flask precompile-templates`; entries are
+    keyed by a checksum of the template source, so edited templates recompile.
+    """
+    import os
+    from jinja2 import FileSystemBytecodeCache
+    
+    cache_dir = app.config.get('TEMPLATE_CACHE_DIR') or os.path.join(app.instance_path, 'jinja_cache')
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+    except OSError as e:
+        app.logger.warning(f"Template bytecode cache disabled: {e}")
+        return
+    app.jinja_options = dict(app.jinja_options, bytecode_cache=FileSystemBytecodeCache(cache_dir))
+
+
 def register_error_handlers(app):
     """Register custom error handlers."""
     
@@ -1,18 +1,47 @@
 """
 Admin routes for dashboard, user management, and CRUD operations.
 """
-from flask import render_template, redirect, url_for, flash, request, jsonify, current_app
+from flask import render_template, stream_template, stream_with_context, redirect, url_for, flash, request, jsonify, current_app
 from flask_login import login_required, current_user
-from datetime import datetime, timedelta
+from datetime import datetime
 from sqlalchemy import func
+from sqlalchemy.orm import joinedload, selectinload
 from app import db
 from app.admin import admin_bp
-from app.models import User, Donor, Patient, Feedback
+from app.models import User, Donor, Patient, Feedback, URGENCY_LEVELS, urgency_rank_for
 from app.forms import AdminFeedbackResponseForm, AdminEditUserForm
-from app.utils import get_blood_group_statistics
+from app.utils import get_blood_group_statistics, normalize_location, invalidate_homepage_counters
+from app.dashboard import get_dashboard_data
+from app.db_pool import pool_status
+from app.donor_index import donor_index
+from app.exports import EXPORT_FORMATS, chunked, export_stream
+from app.pagination import order_query, paginate
+from app.replica import read_only
+from app.search import matching_user_ids
 from functools import wraps
 
 
+def eager(*relationships):
+    """
+    Loader options for relationships rendered on every row of a list page.
+    
+    ADMIN_LOADING_STRATEGY selects ``joined`` (same query, best for the
+    one-to-one and many-to-one relations used here), ``selectin`` (one extra
+    ``IN`` query per relation) or ``lazy`` (no eager loading).
+    
+    Args:
+        *relationships: Relationship attributes, e.g. ``Donor.user``
+    
+    Returns:
+        list: Loader options for ``query.options()``
+    """
+    strategy = current_app.config.get('ADMIN_LOADING_STRATEGY', 'joined')
+    if strategy == 'lazy':
+        return []
+    loader = selectinload if strategy == 'selectin' else joinedload
+    return [loader(relationship) for relationship in relationships]
+
+
 def admin_required(f):
     """Decorator to ensure user is an admin."""
     @wraps(f)
@@ -26,70 +55,34 @@ def admin_required(f):
 
 
 @admin_bp.route('/dashboard')
+@read_only
 @admin_required
 def dashboard():
     """Admin dashboard with statistics and overview."""
-    # Get statistics
-    stats = get_blood_group_statistics()
-    
-    # Recent users (last 7 days)
-    week_ago = datetime.utcnow() - timedelta(days=7)
-    recent_users = User.query.filter(User.created_at >= week_ago).count()
-    
-    # Total users by role
-    total_admins = User.query.filter_by(role='admin').count()
-    total_donors = User.query.filter_by(role='donor').count()
-    total_patients = User.query.filter_by(role='patient').count()
-    
-    # Pending feedback
-    pending_feedback = Feedback.query.filter_by(is_resolved=False).count()
-    
-    # Recent feedback
-    recent_feedback = Feedback.query.order_by(Feedback.created_at.desc()).limit(5).all()
-    
-    # Urgent patient requests
-    urgent_patients = Patient.query.filter(
-        Patient.urgency_level == 'Critical',
-        Patient.is_fulfilled == False
-    ).limit(5).all()
-    
-    # Blood group distribution data for charts
-    blood_groups = ['A+', 'A-', 'B+', 'B-', 'O+', 'O-', 'AB+', 'AB-']
-    donor_counts = []
-    patient_counts = []
-    
-    for bg in blood_groups:
-        donor_counts.append(stats['donor_distribution'].get(bg, 0))
-        patient_counts.append(stats['patient_requests'].get(bg, 0))
-    
+    # Counts and lists come from a few aggregate queries, cached for a few seconds
     return render_template(
         'admin/dashboard.html',
-        stats=stats,
-        recent_users=recent_users,
-        total_admins=total_admins,
-        total_donors=total_donors,
-        total_patients=total_patients,
-        pending_feedback=pending_feedback,
-        recent_feedback=recent_feedback,
-        urgent_patients=urgent_patients,
-        blood_groups=blood_groups,
-        donor_counts=donor_counts,
-        patient_counts=patient_counts,
+        **get_dashboard_data(),
         title='Admin Dashboard'
     )
 
 
-@admin_bp.route('/users')
-@admin_required
-def manage_users():
-    """Manage all users."""
-    page = request.args.get('page', 1, type=int)
-    per_page = 20
+def filter_users(args):
+    """
+    Build the user listing query from the request's filter arguments.
+    
+    Shared by the admin and sub-admin listings.
     
+    Args:
+        args: Request query arguments
+    
+    Returns:
+        tuple: (unordered query, dict of filter values for the template)
+    """
     # Filter options
-    role_filter = request.args.get('role', 'all')
-    status_filter = request.args.get('status', 'all')
-    search_query = request.args.get('search', '')
+    role_filter = args.get('role', 'all')
+    status_filter = args.get('status', 'all')
+    search_query = args.get('search', '')
     
     query = User.query
     
@@ -118,59 +111,41 @@ def manage_users():
         elif search_query_lower.startswith('name-'):
             # Search by name (check donor/patient full_name)
             name_value = search_query[5:].strip()
-            query = query.outerjoin(Donor).outerjoin(Patient).filter(
-                db.or_(
-                    Donor.full_name.ilike(f'%{name_value}%'),
-                    Patient.full_name.ilike(f'%{name_value}%')
-                )
-            )
+            query = query.filter(User.id.in_(matching_user_ids('name', name_value)))
         elif search_query_lower.startswith('email-'):
             # Search by email (partial match)
             email_value = search_query[6:].strip()
-            query = query.filter(User.email.ilike(f'%{email_value}%'))
+            query = query.filter(User.id.in_(matching_user_ids('email', email_value)))
         elif search_query_lower.startswith('phone-'):
-            # Search by phone (partial match)
+            # Search by phone (partial match on user, donor or patient phone)
             phone_value = search_query[6:].strip()
-            query = query.outerjoin(Donor).outerjoin(Patient).filter(
-                db.or_(
-                    User.phone.ilike(f'%{phone_value}%'),
-                    Donor.phone.ilike(f'%{phone_value}%'),
-                    Patient.phone.ilike(f'%{phone_value}%')
-                )
-            )
+            query = query.filter(User.id.in_(matching_user_ids('phone', phone_value)))
         else:
             # Default: search by email
-            query = query.filter(User.email.ilike(f'%{search_query}%'))
+            query = query.filter(User.id.in_(matching_user_ids('email', search_query)))
     
-    # Order by creation date (newest first)
-    query = query.order_by(User.created_at.desc())
-    
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
-    users = pagination.items
-    
-    return render_template(
-        'admin/manage_users.html',
-        users=users,
-        pagination=pagination,
-        role_filter=role_filter,
-        status_filter=status_filter,
-        search_query=search_query,
-        title='Manage Users'
-    )
+    return query, {
+        'role_filter': role_filter,
+        'status_filter': status_filter,
+        'search_query': search_query,
+    }
 
 
-@admin_bp.route('/donors')
-@admin_required
-def manage_donors():
-    """Manage donors."""
-    page = request.args.get('page', 1, type=int)
-    per_page = 20
+def filter_donors(args):
+    """
+    Build the donor listing query from the request's filter arguments.
+    
+    Args:
+        args: Request query arguments
     
+    Returns:
+        tuple: (unordered query, dict of filter values for the template)
+    """
     # Filter options
-    blood_group_filter = request.args.get('blood_group', 'all')
-    availability_filter = request.args.get('availability', 'all')
-    city_filter = request.args.get('city', '')
-    search_query = request.args.get('search', '')
+    blood_group_filter = args.get('blood_group', 'all')
+    availability_filter = args.get('availability', 'all')
+    city_filter = args.get('city', '')
+    search_query = args.get('search', '')
     
     query = Donor.query
     
@@ -182,9 +157,13 @@ def manage_donors():
         query = query.filter_by(is_available=True)
     elif availability_filter == 'unavailable':
         query = query.filter_by(is_available=False)
+    elif availability_filter == 'eligible':
+        # Available and outside the 90-day donation interval (indexed range scan)
+        query = query.filter(Donor.is_available == True, Donor.eligible_on())
     
     if city_filter:
-        query = query.filter(Donor.city.ilike(f'%{city_filter}%'))
+        # Equality on the normalized key so the (city_key, ...) index is used
+        query = query.filter(Donor.city_key == normalize_location(city_filter))
     
     # Search functionality with prefix support
     if search_query:
@@ -200,54 +179,42 @@ def manage_donors():
         elif search_query_lower.startswith('name-'):
             # Search by name (partial match)
             name_value = search_query[5:].strip()
-            query = query.filter(Donor.full_name.ilike(f'%{name_value}%'))
+            query = query.filter(Donor.user_id.in_(matching_user_ids('donor_name', name_value)))
         elif search_query_lower.startswith('email-'):
-            # Search by email (partial match via user relationship)
+            # Search by email (partial match on the owning user)
             email_value = search_query[6:].strip()
-            query = query.join(User).filter(User.email.ilike(f'%{email_value}%'))
+            query = query.filter(Donor.user_id.in_(matching_user_ids('email', email_value)))
         elif search_query_lower.startswith('phone-'):
             # Search by phone (partial match)
             phone_value = search_query[6:].strip()
-            query = query.filter(Donor.phone.ilike(f'%{phone_value}%'))
+            query = query.filter(Donor.user_id.in_(matching_user_ids('donor_phone', phone_value)))
         else:
             # Default: search by email
-            query = query.join(User).filter(User.email.ilike(f'%{search_query}%'))
-    
-    # Order by creation date (newest first)
-    query = query.order_by(Donor.created_at.desc())
-    
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
-    donors = pagination.items
-    
-    # Get unique cities for filter
-    cities = db.session.query(Donor.city).distinct().all()
-    cities = [city[0] for city in cities]
+            query = query.filter(Donor.user_id.in_(matching_user_ids('email', search_query)))
     
-    return render_template(
-        'admin/manage_donors.html',
-        donors=donors,
-        pagination=pagination,
-        blood_group_filter=blood_group_filter,
-        availability_filter=availability_filter,
-        city_filter=city_filter,
-        cities=cities,
-        search_query=search_query,
-        title='Manage Donors'
-    )
+    return query, {
+        'blood_group_filter': blood_group_filter,
+        'availability_filter': availability_filter,
+        'city_filter': city_filter,
+        'search_query': search_query,
+    }
 
 
-@admin_bp.route('/patients')
-@admin_required
-def manage_patients():
-    """Manage patients."""
-    page = request.args.get('page', 1, type=int)
-    per_page = 20
+def filter_patients(args):
+    """
+    Build the patient listing query from the request's filter arguments.
     
+    Args:
+        args: Request query arguments
+    
+    Returns:
+        tuple: (unordered query, dict of filter values for the template)
+    """
     # Filter options
-    blood_group_filter = request.args.get('blood_group', 'all')
-    urgency_filter = request.args.get('urgency', 'all')
-    fulfillment_filter = request.args.get('fulfillment', 'all')
-    search_query = request.args.get('search', '')
+    blood_group_filter = args.get('blood_group', 'all')
+    urgency_filter = args.get('urgency', 'all')
+    fulfillment_filter = args.get('fulfillment', 'all')
+    search_query = args.get('search', '')
     
     query = Patient.query
     
@@ -256,7 +223,7 @@ def manage_patients():
         query = query.filter_by(blood_group_required=blood_group_filter)
     
     if urgency_filter != 'all':
-        query = query.filter_by(urgency_level=urgency_filter)
+        query = query.filter_by(urgency_rank=urgency_rank_for(urgency_filter))
     
     if fulfillment_filter == 'fulfilled':
         query = query.filter_by(is_fulfilled=True)
@@ -277,46 +244,116 @@ def manage_patients():
         elif search_query_lower.startswith('name-'):
             # Search by name (partial match)
             name_value = search_query[5:].strip()
-            query = query.filter(Patient.full_name.ilike(f'%{name_value}%'))
+            query = query.filter(Patient.user_id.in_(matching_user_ids('patient_name', name_value)))
         elif search_query_lower.startswith('email-'):
-            # Search by email (partial match via user relationship)
+            # Search by email (partial match on the owning user)
             email_value = search_query[6:].strip()
-            query = query.join(User).filter(User.email.ilike(f'%{email_value}%'))
+            query = query.filter(Patient.user_id.in_(matching_user_ids('email', email_value)))
         elif search_query_lower.startswith('phone-'):
             # Search by phone (partial match)
             phone_value = search_query[6:].strip()
-            query = query.filter(Patient.phone.ilike(f'%{phone_value}%'))
+            query = query.filter(Patient.user_id.in_(matching_user_ids('patient_phone', phone_value)))
         else:
             # Default: search by email
-            query = query.join(User).filter(User.email.ilike(f'%{search_query}%'))
+            query = query.filter(Patient.user_id.in_(matching_user_ids('email', search_query)))
     
-    # Order by urgency and creation date
-    query = query.order_by(Patient.urgency_level, Patient.created_at.desc())
+    return query, {
+        'blood_group_filter': blood_group_filter,
+        'urgency_filter': urgency_filter,
+        'fulfillment_filter': fulfillment_filter,
+        'search_query': search_query,
+    }
+
+
+# Listing orders (newest first; patients in priority order). The last column
+# is unique so keyset pagination has a total order.
+USER_ORDER = [(User.created_at, True), (User.id, True)]
+DONOR_ORDER = [(Donor.created_at, True), (Donor.id, True)]
+PATIENT_ORDER = Patient.priority_order()
+
+
+def donor_cities():
+    """Get one display name per normalized donor city, for the city filter."""
+    cities = db.session.query(func.min(Donor.city)).group_by(Donor.city_key).all()
+    return [city[0] for city in cities]
+
+
+@admin_bp.route('/users')
+@read_only
+@admin_required
+def manage_users():
+    """Manage all users."""
+    per_page = 20
     
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+    query, filters = filter_users(request.args)
+    query = query.options(*eager(User.donor, User.patient))
+    pagination = paginate(query, USER_ORDER, per_page)
+    users = pagination.items
+    
+    return render_template(
+        'admin/manage_users.html',
+        users=users,
+        pagination=pagination,
+        title='Manage Users',
+        **filters
+    )
+
+
+@admin_bp.route('/donors')
+@read_only
+@admin_required
+def manage_donors():
+    """Manage donors."""
+    per_page = 20
+    
+    query, filters = filter_donors(request.args)
+    query = query.options(*eager(Donor.user))
+    pagination = paginate(query, DONOR_ORDER, per_page)
+    donors = pagination.items
+    
+    return render_template(
+        'admin/manage_donors.html',
+        donors=donors,
+        pagination=pagination,
+        cities=donor_cities(),
+        title='Manage Donors',
+        **filters
+    )
+
+
+@admin_bp.route('/patients')
+@read_only
+@admin_required
+def manage_patients():
+    """Manage patients."""
+    per_page = 20
+    
+    query, filters = filter_patients(request.args)
+    query = query.options(*eager(Patient.user))
+    pagination = paginate(query, PATIENT_ORDER, per_page)
     patients = pagination.items
     
     return render_template(
         'admin/manage_patients.html',
         patients=patients,
         pagination=pagination,
-        blood_group_filter=blood_group_filter,
-        urgency_filter=urgency_filter,
-        fulfillment_filter=fulfillment_filter,
-        search_query=search_query,
-        title='Manage Patients'
+        title='Manage Patients',
+        **filters
     )
 
 
-@admin_bp.route('/feedback')
-@admin_required
-def manage_feedback():
-    """Manage feedback submissions."""
-    page = request.args.get('page', 1, type=int)
-    per_page = 20
+def filter_feedback(args):
+    """
+    Build the feedback listing query from the request's filter arguments.
+    
+    Args:
+        args: Request query arguments
     
+    Returns:
+        tuple: (unordered query, dict of filter values for the template)
+    """
     # Filter options
-    status_filter = request.args.get('status', 'all')
+    status_filter = args.get('status', 'all')
     
     query = Feedback.query
     
@@ -326,18 +363,37 @@ def manage_feedback():
     elif status_filter == 'resolved':
         query = query.filter_by(is_resolved=True)
     
-    # Order by creation date (newest first)
-    query = query.order_by(Feedback.created_at.desc())
+    return query, {'status_filter': status_filter}
+
+
+FEEDBACK_ORDER = [(Feedback.created_at, True), (Feedback.id, True)]
+
+# Listing filters by export table name
+EXPORT_FILTERS = {
+    'users': filter_users,
+    'donors': filter_donors,
+    'patients': filter_patients,
+    'feedback': filter_feedback,
+}
+
+
+@admin_bp.route('/feedback')
+@read_only
+@admin_required
+def manage_feedback():
+    """Manage feedback submissions."""
+    per_page = 20
     
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+    query, filters = filter_feedback(request.args)
+    pagination = paginate(query, FEEDBACK_ORDER, per_page)
     feedback_items = pagination.items
     
     return render_template(
         'admin/manage_feedback.html',
         feedback_items=feedback_items,
         pagination=pagination,
-        status_filter=status_filter,
-        title='Manage Feedback'
+        title='Manage Feedback',
+        **filters
     )
 
 
@@ -383,6 +439,9 @@ def delete_user(user_id):
         user.donor.is_available = False
     
     db.session.commit()
+    if user.donor:
+        donor_index.refresh(user.donor)
+        invalidate_homepage_counters()
     
     flash(f'User {email} has been deleted. They can re-register after 24 hours.', 'success')
     return redirect(url_for('admin.manage_users'))
@@ -463,6 +522,7 @@ def fulfill_patient_request(patient_id):
 
 
 @admin_bp.route('/stats/export')
+@read_only
 @admin_required
 def export_stats():
     """Export statistics as CSV."""
@@ -497,6 +557,43 @@ def export_stats():
     return output
 
 
+@admin_bp.route('/pool-stats')
+@admin_required
+def pool_stats():
+    """Connection pool usage and checkout wait times per database bind (JSON)."""
+    response = jsonify(pool_status())
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+
+@admin_bp.route('/export/<any(users, donors, patients, feedback):table>.<any(csv, ndjson):fmt>')
+@read_only
+@admin_required
+def export_table(table, fmt):
+    """
+    Export a full table as CSV or NDJSON, streamed.
+    
+    Takes the same filter arguments as the corresponding manage page;
+    ``?gzip=1`` compresses the download on the fly.
+    """
+    query, _ = EXPORT_FILTERS[table](request.args)
+    compress = request.args.get('gzip') in ('1', 'true', 'y')
+    
+    filename = f"{table}-{datetime.utcnow():%Y%m%d-%H%M%S}.{fmt}"
+    if compress:
+        filename += '.gz'
+    body = export_stream(query, table, fmt, compress=compress,
+                         batch_size=current_app.config['LISTING_YIELD_PER'])
+    
+    response = current_app.response_class(
+        stream_with_context(body),
+        mimetype='application/gzip' if compress else EXPORT_FORMATS[fmt]
+    )
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+
 @admin_bp.route('/block-user/<int:user_id>', methods=['POST'])
 @login_required
 def block_user(user_id):
@@ -566,6 +663,7 @@ def edit_user(user_id):
                 user.donor.state = form.donor_state.data
             if form.donor_pincode.data:
                 user.donor.pincode = form.donor_pincode.data
+                user.donor.update_coordinates()
                 
         # Update patient data if exists
         if user.patient:
@@ -583,8 +681,12 @@ def edit_user(user_id):
                 user.patient.state = form.patient_state.data
             if form.patient_pincode.data:
                 user.patient.pincode = form.patient_pincode.data
+                user.patient.update_coordinates()
         
         db.session.commit()
+        if user.donor:
+            donor_index.refresh(user.donor)
+            invalidate_homepage_counters()
         flash(f'User {user.email} updated successfully!', 'success')
         return redirect(url_for('admin.manage_users'))
     
@@ -620,6 +722,7 @@ def edit_user(user_id):
 
 
 @admin_bp.route('/sub-admin/dashboard')
+@read_only
 @login_required
 def sub_admin_dashboard():
     """Sub-admin dashboard - view only access."""
@@ -647,7 +750,39 @@ def sub_admin_dashboard():
                          title='Sub-Admin Dashboard')
 
 
+def listing_response(template_name, query, order_by, per_page, items_name, **context):
+    """
+    Render a read-only listing, paginated or streamed (``?view=all``).
+    
+    The paginated view loads one page. The streamed view iterates the whole
+    query with ``yield_per`` and sends the page while it renders, so memory
+    stays bounded by one batch of rows however large the table is.
+    
+    Args:
+        template_name: Listing template
+        query: Unordered listing query (with loader options)
+        order_by: Sequence of (column, descending) pairs ending with a unique column
+        per_page: Rows per page in the paginated view
+        items_name: Template variable that receives the rows
+        **context: Additional template variables
+    
+    Returns:
+        Response
+    """
+    if request.args.get('view') == 'all':
+        rows = order_query(query, order_by).yield_per(current_app.config['LISTING_YIELD_PER'])
+        context.update({items_name: rows, 'pagination': None, 'streamed': True})
+        return current_app.response_class(
+            chunked(stream_template(template_name, **context), size=16 * 1024), mimetype='text/html'
+        )
+    
+    pagination = paginate(query, order_by, per_page)
+    context.update({items_name: pagination.items, 'pagination': pagination, 'streamed': False})
+    return render_template(template_name, **context)
+
+
 @admin_bp.route('/sub-admin/users')
+@read_only
 @login_required
 def sub_admin_users():
     """View all users (read-only)."""
@@ -655,11 +790,30 @@ def sub_admin_users():
         flash('Access denied.', 'danger')
         return redirect(url_for('main.index'))
     
-    users = User.query.order_by(User.created_at.desc()).all()
-    return render_template('admin/sub_admin_users.html', users=users, title='View Users')
+    query, filters = filter_users(request.args)
+    
+    # Summary over every matching user, not just the page shown
+    total, active, verified = query.with_entities(
+        func.count(User.id),
+        func.count(User.id).filter(User.is_active == True),
+        func.count(User.id).filter(User.is_verified == True)
+    ).one()
+    summary = {'total': total, 'active': active, 'verified': verified}
+    
+    return listing_response(
+        'admin/sub_admin_users.html',
+        query.options(*eager(User.donor, User.patient)),
+        USER_ORDER,
+        20,
+        'users',
+        summary=summary,
+        title='View Users',
+        **filters
+    )
 
 
 @admin_bp.route('/sub-admin/donors')
+@read_only
 @login_required
 def sub_admin_donors():
     """View all donors (read-only)."""
@@ -667,11 +821,36 @@ def sub_admin_donors():
         flash('Access denied.', 'danger')
         return redirect(url_for('main.index'))
     
-    donors = Donor.query.order_by(Donor.created_at.desc()).all()
-    return render_template('admin/sub_admin_donors.html', donors=donors, title='View Donors')
+    query, filters = filter_donors(request.args)
+    
+    # Per blood group totals over every matching donor
+    by_group = {}
+    for blood_group, donors, available in query.with_entities(
+        Donor.blood_group,
+        func.count(Donor.id),
+        func.count(Donor.id).filter(Donor.is_available == True)
+    ).group_by(Donor.blood_group):
+        by_group[blood_group] = {'donors': donors, 'available': available}
+    summary = {
+        'total': sum(counts['donors'] for counts in by_group.values()),
+        'available': sum(counts['available'] for counts in by_group.values()),
+        'by_group': by_group,
+    }
+    
+    return listing_response(
+        'admin/sub_admin_donors.html',
+        query.options(*eager(Donor.user)),
+        DONOR_ORDER,
+        20,
+        'donors',
+        summary=summary,
+        title='View Donors',
+        **filters
+    )
 
 
 @admin_bp.route('/sub-admin/patients')
+@read_only
 @login_required
 def sub_admin_patients():
     """View all patients (read-only)."""
@@ -679,5 +858,29 @@ def sub_admin_patients():
         flash('Access denied.', 'danger')
         return redirect(url_for('main.index'))
     
-    patients = Patient.query.order_by(Patient.created_at.desc()).all()
-    return render_template('admin/sub_admin_patients.html', patients=patients, title='View Patients')
+    query, filters = filter_patients(request.args)
+    
+    # Totals by blood group and urgency over every matching patient
+    summary = {'total': 0, 'fulfilled': 0, 'by_group': {}, 'by_urgency': {}}
+    for blood_group, urgency_rank, patients, fulfilled in query.with_entities(
+        Patient.blood_group_required,
+        Patient.urgency_rank,
+        func.count(Patient.id),
+        func.count(Patient.id).filter(Patient.is_fulfilled == True)
+    ).group_by(Patient.blood_group_required, Patient.urgency_rank):
+        urgency = URGENCY_LEVELS.get(urgency_rank)
+        summary['total'] += patients
+        summary['fulfilled'] += fulfilled
+        summary['by_group'][blood_group] = summary['by_group'].get(blood_group, 0) + patients
+        summary['by_urgency'][urgency] = summary['by_urgency'].get(urgency, 0) + patients
+    
+    return listing_response(
+        'admin/sub_admin_patients.html',
+        query.options(*eager(Patient.user)),
+        PATIENT_ORDER,
+        20,
+        'patients',
+        summary=summary,
+        title='View Patients',
+        **filters
+    )
@@ -0,0 +1,171 @@
+"""
+Fingerprinted, precompressed static assets.
+
+``flask build-assets`` minifies the CSS/JS under ``app/static``. It writes
+each file to ``app/static/dist`` under a content-hashed name, together with
+``.gz`` and ``.br`` variants (``.br`` only if the optional ``brotli`` package
+is installed), and records the mapping in ``manifest.json``.
+
+Templates call ``asset_url('css/style.css')`` instead of
+``url_for('static', ...)``. With a manifest it returns the hashed
+``/assets/...`` URL. That route picks the best precompressed variant for
+``Accept-Encoding`` and marks the response immutable, so browsers never ask
+for it again. Without a manifest (e.g. in development) the plain static URL
+is used.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import shutil
+
+from flask import current_app, request, send_from_directory, url_for
+from werkzeug.exceptions import NotFound
+
+try:
+    import brotli
+except ImportError:  # Optional: only gzip variants are written without it
+    brotli = None
+
+
+DIST_DIRNAME = 'dist'
+MANIFEST_NAME = 'manifest.json'
+ONE_YEAR = 365 * 24 * 3600
+
+# Encodings in order of preference, with the file suffix of each variant
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+
+def minify_css(source):
+    """Remove comments and redundant whitespace from CSS."""
+    source = re.sub(r'/\*.*?\*/', '', source, flags=re.S)
+    source = re.sub(r'\s+', ' ', source)
+    source = re.sub(r'\s*([{}:;,>])\s*', r'\1', source)
+    return source.replace(';}', '}').strip()
+
+
+def minify_js(source):
+    """
+    Conservatively minify JavaScript.
+
+    Only indentation, blank lines and whole-line ``//`` comments are removed;
+    lines inside multi-line template literals are kept verbatim.
+    """
+    lines = []
+    in_template = False
+    for line in source.splitlines():
+        if in_template:
+            lines.append(line)
+        else:
+            stripped = line.strip()
+            if stripped and not stripped.startswith('//'):
+                lines.append(stripped)
+        # An odd number of unescaped backticks toggles template-literal state
+        if len(re.findall(r'(?<!\\)`', line)) % 2:
+            in_template = not in_template
+    return '\n'.join(lines) + '\n'
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+def build_assets(static_folder):
+    """
+    Build fingerprinted and precompressed copies of the static assets.
+
+    Args:
+        static_folder: Application static folder
+
+    Returns:
+        dict: Manifest mapping source paths to hashed paths (relative to dist)
+    """
+    dist = os.path.join(static_folder, DIST_DIRNAME)
+    if os.path.isdir(dist):
+        shutil.rmtree(dist)
+
+    manifest = {}
+    for root, dirs, files in os.walk(static_folder):
+        dirs[:] = [d for d in dirs if os.path.join(root, d) != dist]
+        for name in sorted(files):
+            source_path = os.path.join(root, name)
+            relative = os.path.relpath(source_path, static_folder).replace(os.sep, '/')
+            base, ext = os.path.splitext(relative)
+
+            with open(source_path, 'rb') as f:
+                content = f.read()
+            minifier = MINIFIERS.get(ext)
+            if minifier is not None:
+                content = minifier(content.decode('utf-8')).encode('utf-8')
+
+            digest = hashlib.sha256(content).hexdigest()[:12]
+            hashed = f'{base}.{digest}{ext}'
+            target = os.path.join(dist, hashed)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+
+            with open(target, 'wb') as f:
+                f.write(content)
+            with open(target + '.gz', 'wb') as f:
+                f.write(gzip.compress(content, compresslevel=9, mtime=0))
+            if brotli is not None:
+                with open(target + '.br', 'wb') as f:
+                    f.write(brotli.compress(content, quality=11))
+
+            manifest[relative] = hashed
+
+    with open(os.path.join(dist, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    return manifest
+
+
+def init_assets(app):
+    """Load the asset manifest and register the asset route and template helper."""
+    manifest = {}
+    manifest_path = os.path.join(app.static_folder, DIST_DIRNAME, MANIFEST_NAME)
+    if app.config.get('ASSETS_USE_MANIFEST', True) and os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    app.extensions['asset_manifest'] = manifest
+
+    app.add_url_rule('/assets/<path:filename>', 'assets', serve_asset)
+    app.add_template_global(asset_url)
+
+
+def asset_url(filename):
+    """
+    Get the URL of a static asset, fingerprinted when a build exists.
+
+    Args:
+        filename: Path relative to the static folder (as for ``url_for('static')``)
+
+    Returns:
+        str: Asset URL
+    """
+    hashed = current_app.extensions.get('asset_manifest', {}).get(filename)
+    if hashed is None:
+        return url_for('static', filename=filename)
+    return url_for('assets', filename=hashed)
+
+
+def serve_asset(filename):
+    """Serve a fingerprinted asset, precompressed when the client accepts it."""
+    dist = os.path.join(current_app.static_folder, DIST_DIRNAME)
+    if filename not in current_app.extensions.get('asset_manifest', {}).values():
+        raise NotFound()
+
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    encoding, path = None, filename
+    for name, suffix in ENCODINGS:
+        if name in request.accept_encodings and os.path.exists(os.path.join(dist, filename + suffix)):
+            encoding, path = name, filename + suffix
+            break
+
+    response = send_from_directory(dist, path, mimetype=mimetype, max_age=ONE_YEAR)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
@@ -328,6 +328,11 @@ def delete_account():
         user.donor.is_available = False
     
     db.session.commit()
+    if user.donor:
+        from app.donor_index import donor_index
+        from app.utils import invalidate_homepage_counters
+        donor_index.refresh(user.donor)
+        invalidate_homepage_counters()
     
     # Logout user
     logout_user()
@@ -0,0 +1,336 @@
+"""
+Batch donor-to-request assignment for `flask match-all`.
+
+All unfulfilled patients and all available, eligible donors are loaded into
+compact NumPy arrays and partitioned by state. Each state is solved in a
+worker process: requests are served in priority order (urgency, then
+required-by date) and each takes its best compatible donors, preferring exact
+blood group matches and nearby donors. Donors have a limited number of offers
+so they are spread across requests. Universal O- donors go to patients of
+other groups only after every request has had its pick of the other
+compatible donors, and with a tighter offer limit. Requests whose
+required-by date has passed are served after all current ones.
+
+Results replace the contents of the donor_suggestions table.
+"""
+import math
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from app import db
+from app.geo import haversine_km
+from app.pagination import order_query
+from app.models import BLOOD_COMPATIBILITY, UNKNOWN_URGENCY_RANK
+
+
+BLOOD_GROUPS = ['A+', 'A-', 'B+', 'B-', 'O+', 'O-', 'AB+', 'AB-']
+GROUP_CODES = {group: code for code, group in enumerate(BLOOD_GROUPS)}
+UNIVERSAL_DONOR = GROUP_CODES['O-']
+
+# COMPATIBLE[donor_code, patient_code] is True when the donor can give to the patient
+COMPATIBLE = np.zeros((len(BLOOD_GROUPS), len(BLOOD_GROUPS)), dtype=bool)
+for _donor_group, _recipients in BLOOD_COMPATIBILITY.items():
+    for _recipient in _recipients:
+        COMPATIBLE[GROUP_CODES[_donor_group], GROUP_CODES[_recipient]] = True
+
+# Distance used for ranking when coordinates are missing
+SAME_CITY_KM = 5.0
+UNKNOWN_DISTANCE_KM = 1000.0
+# Added to the distance of non-exact matches so that they rank after every exact one
+OTHER_GROUP_OFFSET_KM = 100000.0
+
+
+def load_partitions():
+    """
+    Load open requests and eligible donors, partitioned by normalized state.
+
+    Returns:
+        list: One dict of NumPy arrays per state that has both patients and donors
+    """
+    from app.models import Donor, Patient
+
+    patients = defaultdict(list)
+    for row in db.session.query(
+        Patient.id, Patient.blood_group_required, Patient.urgency_rank, Patient.required_by_date,
+        Patient.city_key, Patient.state_key, Patient.latitude, Patient.longitude
+    ).filter(Patient.is_fulfilled == False).yield_per(5000):
+        if row.blood_group_required not in GROUP_CODES:
+            continue
+        patients[row.state_key].append(row)
+
+    donors = defaultdict(list)
+    for row in db.session.query(
+        Donor.id, Donor.blood_group, Donor.city_key, Donor.state_key, Donor.latitude, Donor.longitude
+    ).filter(
+        Donor.is_available == True,
+        Donor.eligible_on()
+    ).yield_per(5000):
+        if row.blood_group not in GROUP_CODES:
+            continue
+        donors[row.state_key].append(row)
+
+    today = date.today().toordinal()
+    partitions = []
+    for state, state_patients in patients.items():
+        state_donors = donors.get(state)
+        if not state_donors:
+            continue
+
+        cities = {}
+        partitions.append({
+            'state': state,
+            'today': today,
+            'patient_ids': np.array([p.id for p in state_patients], dtype=np.int64),
+            'patient_groups': np.array([GROUP_CODES[p.blood_group_required] for p in state_patients], dtype=np.int8),
+            'patient_urgency': np.array([p.urgency_rank or UNKNOWN_URGENCY_RANK for p in state_patients], dtype=np.int8),
+            'patient_due': np.array([p.required_by_date.toordinal() for p in state_patients], dtype=np.int64),
+            'patient_cities': np.array([cities.setdefault(p.city_key, len(cities)) for p in state_patients], dtype=np.int32),
+            'patient_lat': np.array([np.nan if p.latitude is None else p.latitude for p in state_patients]),
+            'patient_lon': np.array([np.nan if p.longitude is None else p.longitude for p in state_patients]),
+            'donor_ids': np.array([d.id for d in state_donors], dtype=np.int64),
+            'donor_groups': np.array([GROUP_CODES[d.blood_group] for d in state_donors], dtype=np.int8),
+            'donor_cities': np.array([cities.setdefault(d.city_key, len(cities)) for d in state_donors], dtype=np.int32),
+            'donor_lat': np.array([np.nan if d.latitude is None else d.latitude for d in state_donors]),
+            'donor_lon': np.array([np.nan if d.longitude is None else d.longitude for d in state_donors]),
+        })
+
+    return partitions
+
+
+def _candidate_distances(partition, i, candidates):
+    """
+    Get the distance from patient ``i`` to each candidate donor.
+
+    Returns:
+        tuple: (distances in km, mask of distances measured from coordinates)
+    """
+    donor_lat = partition['donor_lat']
+    donor_lon = partition['donor_lon']
+    lat = partition['patient_lat'][i]
+    lon = partition['patient_lon'][i]
+    same_city = partition['donor_cities'][candidates] == partition['patient_cities'][i]
+    distance = np.where(same_city, SAME_CITY_KM, UNKNOWN_DISTANCE_KM)
+    measured = np.zeros(candidates.size, dtype=bool)
+    if not math.isnan(lat):
+        measured = ~np.isnan(donor_lat[candidates])
+        if measured.any():
+            distance[measured] = haversine_km(
+                lat, lon, donor_lat[candidates][measured], donor_lon[candidates][measured]
+            )
+    return distance, measured
+
+
+def _smallest(keys, n):
+    """Positions of the ``n`` smallest keys in ascending order (ties by position)."""
+    if keys.size > n:
+        part = np.argpartition(keys, n - 1)[:n]
+        return part[np.lexsort((part, keys[part]))]
+    return np.argsort(keys, kind='stable')
+
+
+class _LiveDonors:
+    """
+    Donor indices per blood group, limited to donors with offers left.
+
+    Exhausted donors are dropped from their group lazily, once they make up
+    half of it, so a request only looks at the donors of its compatible
+    groups instead of every donor in the state.
+    """
+
+    def __init__(self, donor_groups, capacity):
+        self.capacity = capacity
+        self.groups = [np.nonzero(donor_groups == code)[0] for code in range(len(BLOOD_GROUPS))]
+        self.exhausted = [0] * len(BLOOD_GROUPS)
+
+    def candidates(self, codes):
+        indices = np.concatenate([self.groups[code] for code in codes]) if codes else np.empty(0, dtype=np.int64)
+        return indices[self.capacity[indices] > 0]
+
+    def take(self, donors, donor_groups):
+        self.capacity[donors] -= 1
+        for code in donor_groups[donors[self.capacity[donors] == 0]]:
+            self.exhausted[code] += 1
+            group = self.groups[code]
+            if self.exhausted[code] * 2 > group.size:
+                self.groups[code] = group[self.capacity[group] > 0]
+                self.exhausted[code] = 0
+
+
+def solve_partition(partition, per_patient=5, max_offers=3, universal_max_offers=1):
+    """
+    Assign donors to the requests of one state.
+
+    Runs in a worker process, so it only uses the arrays in ``partition``.
+    Two passes over the requests in priority order: the first assigns every
+    donor except O- donors for other groups (O- patients take O- donors
+    here, as exact matches); the second fills the remaining slots with the
+    O- donors that are left. Requests past their required-by date come
+    after all others.
+
+    Args:
+        partition: Dict of arrays produced by load_partitions()
+        per_patient: Maximum donors suggested per request
+        max_offers: Maximum requests a donor is suggested for
+        universal_max_offers: Maximum requests an O- donor is suggested for
+
+    Returns:
+        list: (patient_id, donor_id, rank, distance_km or None) tuples
+    """
+    donor_groups = partition['donor_groups']
+    capacity = np.where(donor_groups == UNIVERSAL_DONOR, universal_max_offers, max_offers).astype(np.int32)
+    live = _LiveDonors(donor_groups, capacity)
+
+    # Donor groups each patient group takes in the first pass
+    first_pass_groups = {
+        patient_code: [
+            donor_code for donor_code in range(len(BLOOD_GROUPS))
+            if COMPATIBLE[donor_code, patient_code]
+            and (donor_code != UNIVERSAL_DONOR or patient_code == UNIVERSAL_DONOR)
+        ]
+        for patient_code in range(len(BLOOD_GROUPS))
+    }
+
+    # Live requests first, then most urgent, then earliest required-by date
+    overdue = partition['patient_due'] < partition['today']
+    order = np.lexsort((partition['patient_due'], partition['patient_urgency'], overdue))
+
+    chosen_by_patient = {}  # patient index -> list of (donor index, distance or None)
+    for spend_universal in (False, True):
+        for i in order:
+            taken = chosen_by_patient.setdefault(i, [])
+            slots = per_patient - len(taken)
+            if slots <= 0:
+                continue
+            patient_group = partition['patient_groups'][i]
+            if spend_universal:
+                if patient_group == UNIVERSAL_DONOR:
+                    continue  # O- patients already had every O- donor available in the first pass
+                candidates = live.candidates([UNIVERSAL_DONOR])
+            else:
+                # Exact matches rank first, so other groups only matter when they run short
+                candidates = live.candidates([patient_group])
+                if candidates.size < slots:
+                    candidates = live.candidates(first_pass_groups[patient_group])
+            if candidates.size == 0:
+                continue
+
+            # Exact group first, then nearest
+            distance, measured = _candidate_distances(partition, i, candidates)
+            not_exact = donor_groups[candidates] != patient_group
+            chosen = _smallest(distance + not_exact * OTHER_GROUP_OFFSET_KM, slots)
+
+            live.take(candidates[chosen], donor_groups)
+            taken.extend(
+                (candidates[c], round(float(distance[c]), 1) if measured[c] else None) for c in chosen
+            )
+
+    assignments = []
+    for i in order:
+        patient_id = int(partition['patient_ids'][i])
+        for rank, (donor, distance_km) in enumerate(chosen_by_patient.get(i, []), start=1):
+            assignments.append((patient_id, int(partition['donor_ids'][donor]), rank, distance_km))
+
+    return assignments
+
+
+def match_all(workers=None, per_patient=5, max_offers=3, universal_max_offers=1):
+    """
+    Compute suggestions for every open request and store them.
+
+    Args:
+        workers: Number of worker processes (defaults to the CPU count)
+        per_patient: Maximum donors suggested per request
+        max_offers: Maximum requests a donor is suggested for
+        universal_max_offers: Maximum requests an O- donor is suggested for
+
+    Returns:
+        dict: Summary with the number of states, requests matched and suggestions
+    """
+    from app.models import DonorSuggestion
+
+    partitions = load_partitions()
+    options = dict(per_patient=per_patient, max_offers=max_offers, universal_max_offers=universal_max_offers)
+    workers = workers or os.cpu_count() or 1
+
+    if workers > 1 and len(partitions) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(partitions))) as pool:
+            futures = [pool.submit(solve_partition, partition, **options) for partition in partitions]
+            results = [future.result() for future in futures]
+    else:
+        results = [solve_partition(partition, **options) for partition in partitions]
+
+    created_at = datetime.utcnow()
+    rows = [
+        {
+            'patient_id': patient_id,
+            'donor_id': donor_id,
+            'rank': rank,
+            'distance_km': distance_km,
+            'created_at': created_at,
+        }
+        for assignments in results
+        for patient_id, donor_id, rank, distance_km in assignments
+    ]
+
+    db.session.execute(DonorSuggestion.__table__.delete())
+    for start in range(0, len(rows), 5000):
+        db.session.execute(DonorSuggestion.__table__.insert(), rows[start:start + 5000])
+    db.session.commit()
+
+    return {
+        'states': len(partitions),
+        'requests_matched': len({row['patient_id'] for row in rows}),
+        'suggestions': len(rows),
+    }
+
+
+def suggested_donors(patient, max_age_hours=24, eligible_only=False):
+    """
+    Get the batch matcher's current suggestions for a patient.
+
+    Args:
+        patient: Patient object
+        max_age_hours: Ignore suggestions older than this
+        eligible_only: Only return donors eligible to donate today
+
+    Returns:
+        list: Donor objects in suggestion order that are still available, or
+        an empty list if there are no fresh suggestions
+    """
+    from app.models import Donor, DonorSuggestion
+
+    cutoff = datetime.utcnow() - timedelta(hours=max_age_hours)
+    query = Donor.query.join(DonorSuggestion, DonorSuggestion.donor_id == Donor.id).filter(
+        DonorSuggestion.patient_id == patient.id,
+        DonorSuggestion.created_at >= cutoff,
+        Donor.is_available == True
+    )
+    if eligible_only:
+        query = query.filter(Donor.eligible_on())
+    return query.order_by(DonorSuggestion.rank).all()
+
+
+def suggested_patients(donor, max_age_hours=24):
+    """
+    Get the open requests the batch matcher suggested a donor for.
+
+    Args:
+        donor: Donor object
+        max_age_hours: Ignore suggestions older than this
+
+    Returns:
+        list: Patient objects, most urgent first
+    """
+    from app.models import DonorSuggestion, Patient
+
+    cutoff = datetime.utcnow() - timedelta(hours=max_age_hours)
+    query = Patient.query.join(DonorSuggestion, DonorSuggestion.patient_id == Patient.id).filter(
+        DonorSuggestion.donor_id == donor.id,
+        DonorSuggestion.created_at >= cutoff,
+        Patient.is_fulfilled == False
+    )
+    return order_query(query, Patient.priority_order()).all()
@@ -0,0 +1,241 @@
+"""
+Endpoint load benchmark (`flask benchmark`).
+
+Drives the main pages through the Flask test client. Each page is measured
+separately and gets its own latency percentiles (p50/p95/p99), SQL queries
+per request and throughput. The requests run in-process, so network and
+WSGI server overhead are not included. With ``concurrency`` > 1, that many
+threads share the work, each using its own logged-in client.
+
+Query counts are taken from the ``Server-Timing`` header that
+app.instrumentation adds, which is switched on for the run. Results are
+written as JSON, and ``compare_results`` prints the change in latency and
+queries per request between two result files.
+
+Run ``flask seed-data`` first: it creates the data and the login accounts
+used here.
+"""
+import math
+import os
+import platform
+import re
+import subprocess
+import threading
+import time
+from datetime import datetime
+
+from flask import current_app
+
+from app import db
+from app.models import User, Donor, Patient, Feedback
+
+
+# Endpoint -> request to send; ``login`` is the seeded account role to use
+BENCHMARK_ENDPOINTS = {
+    'main.index': {'path': '/'},
+    'auth.login': {'path': '/auth/login', 'method': 'POST', 'login_form': 'donor'},
+    'patient.search_donors': {'path': '/patient/search', 'login': 'patient'},
+    'patient.dashboard': {'path': '/patient/dashboard', 'login': 'patient'},
+    'admin.dashboard': {'path': '/admin/dashboard', 'login': 'admin'},
+    'admin.manage_users': {'path': '/admin/users', 'login': 'admin'},
+}
+
+_QUERY_COUNT = re.compile(r'desc="(\d+) queries"')
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def _login_path(role):
+    return '/auth/admin-login' if role == 'admin' else '/auth/login'
+
+
+def _logged_in_client(app, accounts, password, role):
+    client = app.test_client()
+    if role:
+        response = client.post(_login_path(role), data={'email': accounts[role], 'password': password})
+        if response.status_code != 302 or 'login' in response.headers.get('Location', ''):
+            raise RuntimeError(f"Could not log in as {accounts[role]}; run `flask seed-data` first")
+    return client
+
+
+class _Worker(threading.Thread):
+    def __init__(self, app, spec, accounts, password, count):
+        super().__init__(daemon=True)
+        self.app = app
+        self.spec = spec
+        self.accounts = accounts
+        self.password = password
+        self.count = count
+        self.samples = []  # (seconds, status, queries, bytes)
+        self.error = None
+
+    def _request(self, client):
+        spec = self.spec
+        data = None
+        if spec.get('login_form'):
+            # A fresh anonymous client per request, or the view redirects the logged-in user
+            client = self.app.test_client()
+            data = {'email': self.accounts[spec['login_form']], 'password': self.password}
+        started = time.perf_counter()
+        response = client.open(spec['path'], method=spec.get('method', 'GET'), data=data)
+        body = response.get_data()  # Consume streamed bodies too
+        elapsed = time.perf_counter() - started
+        match = _QUERY_COUNT.search(response.headers.get('Server-Timing', ''))
+        return elapsed, response.status_code, int(match.group(1)) if match else None, len(body)
+
+    def run(self):
+        try:
+            client = _logged_in_client(self.app, self.accounts, self.password, self.spec.get('login'))
+            for _ in range(self.count):
+                self.samples.append(self._request(client))
+        except Exception as e:  # Reported by run_benchmark
+            self.error = e
+
+
+def benchmark_endpoint(app, name, accounts, password, requests=50, warmup=5, concurrency=1):
+    """
+    Measure one endpoint.
+
+    Args:
+        app: Flask application
+        name: Key of BENCHMARK_ENDPOINTS
+        accounts: Role -> email of the seeded login accounts
+        password: Their password
+        requests: Measured requests
+        warmup: Requests sent first and not measured (fills caches, compiles templates)
+        concurrency: Threads sending requests at the same time
+
+    Returns:
+        dict: Latency percentiles (ms), queries per request, throughput and status codes
+    """
+    spec = BENCHMARK_ENDPOINTS[name]
+
+    if warmup:
+        warm = _Worker(app, spec, accounts, password, warmup)
+        warm.run()
+        if warm.error:
+            raise warm.error
+
+    per_worker = [requests // concurrency + (1 if i < requests % concurrency else 0) for i in range(concurrency)]
+    workers = [_Worker(app, spec, accounts, password, count) for count in per_worker if count]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    wall_time = time.perf_counter() - started
+    for worker in workers:
+        if worker.error:
+            raise worker.error
+
+    samples = [sample for worker in workers for sample in worker.samples]
+    latencies = sorted(sample[0] * 1000 for sample in samples)
+    queries = [sample[2] for sample in samples if sample[2] is not None]
+    statuses = {}
+    for sample in samples:
+        statuses[str(sample[1])] = statuses.get(str(sample[1]), 0) + 1
+
+    return {
+        'requests': len(samples),
+        'concurrency': concurrency,
+        'p50_ms': round(percentile(latencies, 0.50), 2),
+        'p95_ms': round(percentile(latencies, 0.95), 2),
+        'p99_ms': round(percentile(latencies, 0.99), 2),
+        'mean_ms': round(sum(latencies) / len(latencies), 2),
+        'max_ms': round(latencies[-1], 2),
+        'queries_per_request': round(sum(queries) / len(queries), 2) if queries else None,
+        'max_queries': max(queries) if queries else None,
+        'throughput_rps': round(len(samples) / wall_time, 1),
+        'avg_bytes': int(sum(sample[3] for sample in samples) / len(samples)),
+        'status_codes': statuses,
+    }
+
+
+def _git_commit():
+    commit = os.environ.get('RENDER_GIT_COMMIT')
+    if commit:
+        return commit
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(current_app.root_path)
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(accounts, password, endpoints=None, requests=50, warmup=5, concurrency=1, progress=None):
+    """
+    Benchmark the selected endpoints of the current application.
+
+    Args:
+        accounts: Role -> email of the seeded login accounts
+        password: Their password
+        endpoints: Endpoint names (default: all of BENCHMARK_ENDPOINTS)
+        requests: Measured requests per endpoint
+        warmup: Unmeasured requests per endpoint
+        concurrency: Threads per endpoint
+        progress: Optional callable receiving (endpoint, result)
+
+    Returns:
+        dict: Run metadata and per-endpoint results, ready to be saved as JSON
+    """
+    app = current_app._get_current_object()
+    app.config.update(WTF_CSRF_ENABLED=False, SQL_SERVER_TIMING=True)
+
+    result = {
+        'timestamp': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'database': db.engine.dialect.name,
+        'rows': {
+            'users': User.query.count(),
+            'donors': Donor.query.count(),
+            'patients': Patient.query.count(),
+            'feedback': Feedback.query.count(),
+        },
+        'settings': {'requests': requests, 'warmup': warmup, 'concurrency': concurrency},
+        'endpoints': {},
+    }
+    db.session.remove()  # Workers use their own sessions
+
+    for name in endpoints or BENCHMARK_ENDPOINTS:
+        endpoint_result = benchmark_endpoint(
+            app, name, accounts, password, requests=requests, warmup=warmup, concurrency=concurrency
+        )
+        result['endpoints'][name] = endpoint_result
+        if progress:
+            progress(name, endpoint_result)
+    return result
+
+
+def compare_results(baseline, current):
+    """
+    Compare two benchmark results.
+
+    Args:
+        baseline: Result dict of the reference run
+        current: Result dict of the new run
+
+    Returns:
+        list: (endpoint, metric, baseline value, current value, change in %) for
+        p50, p95, p99 and queries per request of endpoints present in both
+    """
+    rows = []
+    for name, now in current['endpoints'].items():
+        before = baseline['endpoints'].get(name)
+        if not before:
+            continue
+        for metric in ('p50_ms', 'p95_ms', 'p99_ms', 'queries_per_request'):
+            old, new = before.get(metric), now.get(metric)
+            if old is None or new is None:
+                continue
+            change = (new - old) / old * 100 if old else 0.0
+            rows.append((name, metric, old, new, change))
+    return rows
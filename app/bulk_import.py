@@ -0,0 +1,431 @@
+"""
+Bulk donor and patient import for `flask import-donors` / `flask import-patients`.
+
+Rows are read from a CSV or XLSX file one at a time and validated with the
+registration forms, so imported profiles follow the same rules as the
+signup pages. Valid rows are inserted in batches. Each batch is one
+multi-row INSERT for the users and one for the profiles, committed
+together.
+
+Bulk inserts skip the ORM's validators and flush hooks, so this module does
+their work itself:
+
+* It fills the location keys, the next eligible date and the urgency rank.
+* It looks up the coordinates for each pincode.
+* It writes the search documents for each batch.
+* At the end it recounts the blood group statistics and invalidates the
+  cached counters and the donor index.
+
+Every account needs a password it can log in with, since there is no
+self-service password reset. Rows without a ``password`` are rejected
+unless a credentials file is given. With one, each such account gets a
+random password, and the email and password are appended to that CSV file
+once the batch is committed, so an administrator can hand them out.
+Password hashing is the slow part (one hash takes tens of milliseconds),
+so passwords are hashed in worker processes.
+
+After every committed batch the next line number is saved to a checkpoint
+file next to the input. An interrupted import continues from there.
+Emails that already exist are always skipped, so running an import again is
+safe.
+"""
+import csv
+import json
+import os
+import secrets
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+
+from flask import current_app
+from sqlalchemy import insert
+from werkzeug.datastructures import MultiDict
+from werkzeug.security import generate_password_hash
+from wtforms import BooleanField, PasswordField
+from wtforms.validators import Length, Optional
+
+try:
+    import openpyxl
+except ImportError:  # Optional: only CSV files can be imported without it
+    openpyxl = None
+
+from app import db
+from app.forms import DonorRegistrationForm, PatientRegistrationForm, RegistrationForm
+from app.models import (
+    User, Donor, Patient, Pincode, next_eligible_date_for, urgency_rank_for
+)
+from app.utils import normalize_location
+
+
+# Stored for rows inserted without a password (the synthetic accounts of
+# `flask seed-data`, which are not meant to log in); never matches a password
+UNUSABLE_PASSWORD = '!imported'
+
+
+def generate_password():
+    """Random password for an account imported without one."""
+    return secrets.token_urlsafe(12)
+
+
+class DonorImportForm(DonorRegistrationForm):
+    """Donor registration rules plus the account email and optional password."""
+    email = RegistrationForm.email
+    password = PasswordField('Password', validators=[
+        Optional(),
+        Length(min=6, message='Password must be at least 6 characters long')
+    ])
+    is_available = BooleanField('Available', default=True,
+                                false_values=(False, 'false', 'no', 'n', '0', ''))
+
+
+class PatientImportForm(PatientRegistrationForm):
+    """Patient registration rules plus the account email and optional password."""
+    email = RegistrationForm.email
+    password = DonorImportForm.password
+
+
+IMPORT_KINDS = {
+    'donors': {'role': 'donor', 'model': Donor, 'form': DonorImportForm},
+    'patients': {'role': 'patient', 'model': Patient, 'form': PatientImportForm},
+}
+
+
+def _cell_text(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        value = value.date()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))  # Spreadsheets store phone numbers and pincodes as numbers
+    return str(value).strip()
+
+
+def read_records(path, start_line=2):
+    """
+    Stream the data rows of a CSV or XLSX file.
+
+    The first row holds the column names (matched case-insensitively to the
+    registration form fields).
+
+    Args:
+        path: Path to a .csv or .xlsx file
+        start_line: First line to yield (line 1 is the header)
+
+    Yields:
+        tuple: (line number, dict of column name -> text)
+    """
+    if path.lower().endswith('.xlsx'):
+        if openpyxl is None:
+            raise RuntimeError("Reading .xlsx files requires the openpyxl package")
+        workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = [_cell_text(name).lower() for name in next(rows, [])]
+            for line, values in enumerate(rows, start=2):
+                if line >= start_line:
+                    yield line, dict(zip(header, map(_cell_text, values)))
+        finally:
+            workbook.close()
+        return
+
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        header = [name.strip().lower() for name in next(reader, [])]
+        for line, values in enumerate(reader, start=2):
+            if line >= start_line:
+                yield line, dict(zip(header, (value.strip() for value in values)))
+
+
+def validate_record(form, record):
+    """
+    Validate one row with the import form.
+
+    The form is reused for every row (binding its fields costs more than
+    validating them).
+
+    Args:
+        form: DonorImportForm or PatientImportForm instance
+        record: Dict of column name -> text
+
+    Returns:
+        tuple: (cleaned data, None) or (None, error message)
+    """
+    record = dict(record)
+    if 'is_available' in form and not record.get('is_available'):
+        record['is_available'] = 'y'  # Missing column or empty cell: available, as on the signup page
+    form.process(formdata=MultiDict(record))
+    if not form.validate():
+        return None, '; '.join(
+            f"{field}: {', '.join(messages)}" for field, messages in form.errors.items()
+        )
+    data = {name: field.data for name, field in form._fields.items() if name != 'submit'}
+    data['email'] = data['email'].lower()
+    return data, None
+
+
+def _profile_row(kind, data, user_id, coordinates):
+    latitude, longitude = coordinates.get(data['pincode'], (None, None))
+    row = {
+        'user_id': user_id,
+        'full_name': data['full_name'],
+        'phone': data['phone'],
+        'city': data['city'],
+        'state': data['state'],
+        'city_key': normalize_location(data['city']),
+        'state_key': normalize_location(data['state']),
+        'pincode': data['pincode'],
+        'latitude': latitude,
+        'longitude': longitude,
+    }
+    if kind == 'donors':
+        row.update({
+            'blood_group': data['blood_group'],
+            'date_of_birth': data['date_of_birth'],
+            'gender': data['gender'],
+            'last_donation_date': data['last_donation_date'],
+            'next_eligible_date': next_eligible_date_for(data['last_donation_date']),
+            'medical_history': data['medical_history'] or None,
+            'is_available': data['is_available'],
+        })
+    else:
+        row.update({
+            'blood_group_required': data['blood_group_required'],
+            'hospital_name': data['hospital_name'],
+            'urgency_level': data['urgency_level'],
+            'urgency_rank': urgency_rank_for(data['urgency_level']),
+            'required_by_date': data['required_by_date'],
+            'medical_condition': data['medical_condition'] or None,
+        })
+    return row
+
+
+class BulkImporter:
+    """
+    Import donors or patients from a file in committed batches.
+
+    ``summary`` holds the running counts: rows read, ``created``,
+    ``existing`` (email already registered or repeated in the file),
+    ``invalid`` and ``generated_passwords``. ``errors`` is a list of (line,
+    email, message) for the rejected rows.
+
+    Rows without a password are rejected unless ``credentials_path`` is
+    set, in which case they get a generated password that is appended to
+    that CSV file (email, password).
+    """
+
+    def __init__(self, kind, batch_size=1000, workers=None, checkpoint_path=None, credentials_path=None):
+        self.kind = kind
+        self.spec = IMPORT_KINDS[kind]
+        self.batch_size = batch_size
+        self.workers = workers or os.cpu_count() or 1
+        self.checkpoint_path = checkpoint_path
+        self.credentials_path = credentials_path
+        self.summary = {'rows': 0, 'created': 0, 'existing': 0, 'invalid': 0, 'generated_passwords': 0}
+        self.errors = []
+        self._executor = None
+        self._seen_emails = set()
+        self._form = self.spec['form'](formdata=None, meta={'csrf': False})
+
+    def load_checkpoint(self):
+        """
+        Restore the counts of an interrupted run.
+
+        Returns:
+            int: Line to continue from (2 when there is no checkpoint)
+        """
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return 2
+        with open(self.checkpoint_path) as f:
+            checkpoint = json.load(f)
+        if checkpoint.get('kind') != self.kind:
+            raise RuntimeError(f"Checkpoint {self.checkpoint_path} belongs to a {checkpoint.get('kind')} import")
+        self.summary.update(checkpoint['summary'])
+        return checkpoint['next_line']
+
+    def _save_checkpoint(self, next_line):
+        if not self.checkpoint_path:
+            return
+        temp_path = self.checkpoint_path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump({'kind': self.kind, 'next_line': next_line, 'summary': self.summary}, f)
+        os.replace(temp_path, self.checkpoint_path)
+
+    def run(self, records, progress=None):
+        """
+        Validate and insert records.
+
+        Args:
+            records: Iterable of (line number, dict) as produced by read_records()
+            progress: Optional callable receiving the summary after each batch
+
+        Returns:
+            dict: Final summary
+        """
+        try:
+            batch = []
+            last_line = None
+            for line, record in records:
+                last_line = line
+                self.summary['rows'] += 1
+                data, error = validate_record(self._form, record)
+                if data and not data['password']:
+                    if self.credentials_path:
+                        data['password'] = generate_password()
+                        data['generated_password'] = True
+                    else:
+                        data, error = None, 'password: Required when no credentials file is given'
+                if error:
+                    self.summary['invalid'] += 1
+                    self.errors.append((line, record.get('email', ''), error))
+                    continue
+                if data['email'] in self._seen_emails:
+                    self.summary['existing'] += 1
+                    continue
+                self._seen_emails.add(data['email'])
+                batch.append(data)
+                if len(batch) >= self.batch_size:
+                    self.insert_batch(batch)
+                    self._save_checkpoint(line + 1)
+                    batch = []
+                    if progress:
+                        progress(self.summary)
+            if batch:
+                self.insert_batch(batch)
+            if last_line is not None:
+                self._save_checkpoint(last_line + 1)
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown()
+
+        self.finish()
+        if progress:
+            progress(self.summary)
+        return self.summary
+
+    def _hash_passwords(self, passwords):
+        pending = [password for password in passwords if password]
+        if not pending:
+            return [UNUSABLE_PASSWORD] * len(passwords)
+        if len(pending) == 1 or self.workers == 1:
+            hashes = iter(map(generate_password_hash, pending))
+        else:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            chunk = max(1, len(pending) // (4 * self.workers))
+            hashes = iter(self._executor.map(generate_password_hash, pending, chunksize=chunk))
+        return [next(hashes) if password else UNUSABLE_PASSWORD for password in passwords]
+
+    def insert_batch(self, batch):
+        """
+        Insert one batch of validated rows and commit it.
+
+        Rows whose email is already registered are skipped. A row may carry
+        a ``created_at`` timestamp (used by ``flask seed-data``).
+
+        Args:
+            batch: List of cleaned row dicts as returned by validate_record()
+        """
+        from app.search import write_documents
+
+        emails = [data['email'] for data in batch]
+        existing = {
+            email for (email,) in db.session.query(User.email).filter(User.email.in_(emails))
+        }
+        if existing:
+            self.summary['existing'] += len(existing)
+            batch = [data for data in batch if data['email'] not in existing]
+            if not batch:
+                return
+
+        pincodes = {data['pincode'] for data in batch}
+        coordinates = {
+            row.pincode: (row.latitude, row.longitude)
+            for row in db.session.query(Pincode.pincode, Pincode.latitude, Pincode.longitude)
+            .filter(Pincode.pincode.in_(pincodes))
+        }
+        password_hashes = self._hash_passwords([data['password'] for data in batch])
+
+        now = datetime.utcnow()
+        user_ids = db.session.scalars(
+            insert(User).returning(User.id, sort_by_parameter_order=True),
+            [{
+                'email': data['email'],
+                'phone': data['phone'],
+                'password_hash': password_hash,
+                'role': self.spec['role'],
+                'is_verified': True,  # Same as the signup page
+                'is_active': True,
+                'created_at': data.get('created_at', now),
+                'updated_at': now,
+            } for data, password_hash in zip(batch, password_hashes)]
+        ).all()
+        db.session.execute(
+            insert(self.spec['model']),
+            [dict(_profile_row(self.kind, data, user_id, coordinates),
+                  created_at=data.get('created_at', now), updated_at=now)
+             for data, user_id in zip(batch, user_ids)]
+        )
+        write_documents(db.session, user_ids)
+        db.session.commit()
+        self.summary['created'] += len(batch)
+        self._save_credentials([data for data in batch if data.get('generated_password')])
+
+    def _save_credentials(self, rows):
+        if not rows:
+            return
+        new_file = not os.path.exists(self.credentials_path)
+        # Readable by the owner only: the file holds working passwords
+        fd = os.open(self.credentials_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        with open(fd, 'a', newline='') as f:
+            writer = csv.writer(f)
+            if new_file:
+                writer.writerow(['email', 'password'])
+            writer.writerows((data['email'], data['password']) for data in rows)
+        self.summary['generated_passwords'] += len(rows)
+
+    def finish(self):
+        """Bring the derived data in line with the inserted rows."""
+        from app.donor_index import donor_index
+        from app.stats import repair_blood_group_stats
+        from app.utils import invalidate_homepage_counters
+
+        if not self.summary['created']:
+            return
+        repair_blood_group_stats()
+        invalidate_homepage_counters()
+        if self.kind == 'donors':
+            donor_index.invalidate()
+        current_app.logger.info(f"Imported {self.summary['created']} {self.kind}")
+
+
+def import_file(path, kind, batch_size=1000, workers=None, restart=False, credentials_path=None, progress=None):
+    """
+    Import donors or patients from a CSV or XLSX file.
+
+    Args:
+        path: Input file
+        kind: 'donors' or 'patients'
+        batch_size: Rows inserted per transaction
+        workers: Processes used to hash passwords (default: CPU count)
+        restart: Ignore the checkpoint of an earlier run and start from the top
+        credentials_path: CSV file receiving the generated passwords of rows
+            without one (such rows are rejected when not given)
+        progress: Optional callable receiving the summary after each batch
+
+    Returns:
+        BulkImporter: The finished importer (summary and errors)
+    """
+    checkpoint_path = f'{path}.import-progress'
+    if restart and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    importer = BulkImporter(
+        kind, batch_size=batch_size, workers=workers, checkpoint_path=checkpoint_path,
+        credentials_path=credentials_path
+    )
+    start_line = importer.load_checkpoint()
+    importer.run(read_records(path, start_line=start_line), progress=progress)
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    return importer
@@ -0,0 +1,237 @@
+"""
+Small key/value cache shared by all worker processes on a host.
+
+Entries live in a SQLite file (WAL mode) so every gunicorn worker and thread
+sees the same values and invalidations. Values are stored as JSON (dates and
+datetimes round-trip) with an absolute expiry time. The cache is best-effort: any storage error is logged
+and treated as a miss, so callers always fall back to the database.
+
+``get_or_set`` is single-flight within a process: when several threads miss
+the same key at once, one computes the value and the others wait for it.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import date, datetime
+
+from flask import current_app
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return {'__datetime__': value.isoformat()}
+    if isinstance(value, date):
+        return {'__date__': value.isoformat()}
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def _json_object_hook(obj):
+    if len(obj) == 1:
+        if '__datetime__' in obj:
+            return datetime.fromisoformat(obj['__datetime__'])
+        if '__date__' in obj:
+            return date.fromisoformat(obj['__date__'])
+    return obj
+
+
+def _create_private_file(path):
+    """
+    Create the cache file readable by its owner only (SQLite gives the WAL
+    and shared-memory files the same permissions).
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    os.close(os.open(path, os.O_RDWR | os.O_CREAT, 0o600))
+    os.chmod(path, 0o600)  # Also for a file created before this was enforced
+
+
+def _is_memory_database(uri):
+    """Whether an SQLAlchemy database URI names an in-memory SQLite database."""
+    if not uri.startswith('sqlite'):
+        return False
+    path = uri.split('://', 1)[-1].lstrip('/')
+    return path in ('', ':memory:') or 'mode=memory' in path
+
+
+class _Flight:
+    """One in-progress computation that other threads can wait for."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SharedCache:
+    """
+    Cross-process TTL cache backed by a SQLite file.
+
+    The file lives in the instance folder (or at ``SHARED_CACHE_PATH``) and
+    is only accessible to the user running the application.
+
+    Each thread of each process keeps its own connection; connections are
+    reopened after a fork.
+    """
+
+    def __init__(self, app=None):
+        self._path = None
+        self._uri = False
+        self._keeper = None  # Keeps an in-memory store alive between connections
+        self._default_ttl = 300
+        self._local = threading.local()
+        self._flights = {}  # key -> _Flight, for single-flight get_or_set
+        self._flights_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Read cache settings from the application config and create the store."""
+        database_uri = app.config['SQLALCHEMY_DATABASE_URI']
+        self._path = app.config.get('SHARED_CACHE_PATH')
+        self._uri = False
+        if not self._path and _is_memory_database(database_uri):
+            # An in-memory database belongs to this app alone, and so does its cache
+            self._path = f'file:bloodcircle-cache-{uuid.uuid4().hex}?mode=memory&cache=shared'
+            self._uri = True
+        elif not self._path:
+            # One file per database in the instance folder, which other apps don't share
+            digest = hashlib.sha1(database_uri.encode()).hexdigest()[:12]
+            self._path = os.path.join(app.instance_path, f'shared-cache-{digest}.sqlite3')
+        self._default_ttl = app.config.get('SHARED_CACHE_DEFAULT_TTL', 300)
+        self._local = threading.local()
+        self._keeper = None
+        try:
+            if not self._uri:
+                _create_private_file(self._path)
+            connection = self._connection()
+            if self._uri:
+                self._keeper = connection
+        except (OSError, sqlite3.Error) as e:
+            app.logger.warning(f"Shared cache unavailable at {self._path}: {e}")
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self._path, timeout=5, isolation_level=None, uri=self._uri)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS cache '
+                '(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)'
+            )
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _log_error(self, action, error):
+        try:
+            current_app.logger.warning(f"Shared cache {action} failed: {error}")
+        except RuntimeError:
+            pass  # Outside an application context
+
+    def get(self, key, default=None):
+        """
+        Get a cached value.
+
+        Args:
+            key: Cache key
+            default: Value returned on a miss or expired entry
+
+        Returns:
+            The cached value, or ``default``
+        """
+        try:
+            row = self._connection().execute(
+                'SELECT value FROM cache WHERE key = ? AND expires_at > ?', (key, time.time())
+            ).fetchone()
+        except sqlite3.Error as e:
+            self._log_error('read', e)
+            return default
+        return default if row is None else json.loads(row[0], object_hook=_json_object_hook)
+
+    def set(self, key, value, ttl=None):
+        """
+        Store a JSON-serializable value (dates and datetimes are allowed).
+
+        Args:
+            key: Cache key
+            value: Value to store
+            ttl: Lifetime in seconds (defaults to SHARED_CACHE_DEFAULT_TTL)
+        """
+        expires_at = time.time() + (self._default_ttl if ttl is None else ttl)
+        try:
+            self._connection().execute(
+                'INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)',
+                (key, json.dumps(value, default=_json_default), expires_at)
+            )
+        except sqlite3.Error as e:
+            self._log_error('write', e)
+
+    def delete(self, *keys):
+        """Remove entries so that the next read recomputes them."""
+        if not keys:
+            return
+        try:
+            self._connection().execute(
+                f"DELETE FROM cache WHERE key IN ({', '.join('?' * len(keys))})", keys
+            )
+        except sqlite3.Error as e:
+            self._log_error('delete', e)
+
+    def get_or_set(self, key, factory, ttl=None):
+        """
+        Get a cached value, computing and storing it on a miss.
+
+        Concurrent misses for the same key in this process share one call
+        of ``factory``.
+
+        Args:
+            key: Cache key
+            factory: Callable producing the value
+            ttl: Lifetime in seconds
+
+        Returns:
+            The cached or freshly computed value
+        """
+        missing = object()
+        value = self.get(key, missing)
+        if value is not missing:
+            return value
+
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = factory()
+            self.set(key, flight.value, ttl)
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._flights_lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.value
+
+    def clear(self):
+        """Remove every entry."""
+        try:
+            self._connection().execute('DELETE FROM cache')
+        except sqlite3.Error as e:
+            self._log_error('clear', e)
+
+
+# Process-wide cache instance, initialized in create_app()
+cache = SharedCache()
@@ -0,0 +1,155 @@
+"""
+Connection pool sizing checks and metrics.
+
+Pool sizes come from the web server model (see ``pool_options`` in
+config.py). This module swaps in a QueuePool that records how long
+checkouts wait and how often they time out. ``pool_status()`` reports these
+numbers together with the pool's live counters; it backs the
+``/admin/pool-stats`` endpoint. Slow checkouts and timeouts are also
+logged as they happen.
+"""
+import logging
+import threading
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+
+from app import db
+
+
+logger = logging.getLogger(__name__)
+
+
+class PoolMetrics:
+    """Checkout counters of one pool (thread-safe)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.slow_checkouts = 0
+        self.total_wait = 0.0  # seconds
+        self.max_wait = 0.0
+        self.slow_threshold = None  # seconds, set by configure_pool
+
+    def record(self, wait, timed_out=False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            slow = not timed_out and self.slow_threshold is not None and wait >= self.slow_threshold
+            if slow:
+                self.slow_checkouts += 1
+        return slow
+
+    def as_dict(self):
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            return {
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'slow_checkouts': self.slow_checkouts,
+                'avg_wait_ms': round(self.total_wait / attempts * 1000, 2) if attempts else 0.0,
+                'max_wait_ms': round(self.max_wait * 1000, 2),
+            }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that measures checkout wait time and counts timeouts."""
+
+    slow_threshold = None  # seconds; set per application by configure_pool
+    # Log as a plain QueuePool; under app.* the pool's debug output would go
+    # through Flask's debug-level logger
+    _sqla_logger_namespace = 'sqlalchemy.pool.impl.QueuePool'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+        self.metrics.slow_threshold = self.slow_threshold
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.record(time.perf_counter() - started, timed_out=True)
+            logger.warning(f"Connection pool timeout: {self.status()}")
+            raise
+        wait = time.perf_counter() - started
+        if self.metrics.record(wait):
+            logger.warning(f"Slow connection checkout ({wait * 1000:.0f} ms): {self.status()}")
+        return connection
+
+
+def configure_pool(app):
+    """
+    Use the instrumented pool class for every bind (call before ``db.init_app``).
+
+    In-memory SQLite keeps Flask-SQLAlchemy's static pool.
+    """
+    slow_ms = app.config.get('DB_POOL_SLOW_CHECKOUT_MS')
+    pool_class = type('InstrumentedQueuePool', (InstrumentedQueuePool,), {
+        'slow_threshold': slow_ms / 1000 if slow_ms else None,
+    })
+    options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    options.setdefault('poolclass', pool_class)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+
+def check_pool_budget(app):
+    """
+    Warn when the pools can open more connections than the server accepts.
+
+    Every worker process has its own pool, so the worst case is
+    ``workers * (pool_size + max_overflow)`` plus the connections reserved
+    for migrations and shells.
+    """
+    config = app.config
+    if config.get('SQLALCHEMY_DATABASE_URI', '').startswith('sqlite'):
+        return
+
+    workers = config['WEB_CONCURRENCY']
+    per_worker = config['DB_POOL_SIZE'] + config['DB_MAX_OVERFLOW']
+    worst_case = workers * per_worker + config['DB_RESERVED_CONNECTIONS']
+    if worst_case > config['DB_MAX_CONNECTIONS']:
+        app.logger.warning(
+            f"Connection pools can open {worst_case} connections "
+            f"({workers} workers x {per_worker} + {config['DB_RESERVED_CONNECTIONS']} reserved), "
+            f"more than DB_MAX_CONNECTIONS={config['DB_MAX_CONNECTIONS']}"
+        )
+    if config['WEB_WORKER_CLASS'] == 'gthread' and config['WEB_THREADS'] > per_worker:
+        app.logger.warning(
+            f"{config['WEB_THREADS']} threads per worker share {per_worker} connections; "
+            f"requests will wait up to DB_POOL_TIMEOUT={config['DB_POOL_TIMEOUT']}s for one"
+        )
+
+
+def pool_status():
+    """
+    Get the live counters and checkout metrics of every bind's pool.
+
+    Returns:
+        dict: Bind name ('default' for the primary) -> pool statistics
+    """
+    status = {}
+    for key, engine in db.engines.items():
+        pool = engine.pool
+        stats = {'pool_class': type(pool).__name__}
+        if isinstance(pool, QueuePool):
+            stats.update({
+                'size': pool.size(),
+                'checked_out': pool.checkedout(),
+                'checked_in': pool.checkedin(),
+                'overflow': max(0, pool.overflow()),  # Negative while below pool_size
+                'max_overflow': pool._max_overflow,
+                'timeout': pool.timeout(),
+            })
+        metrics = getattr(pool, 'metrics', None)
+        if metrics is not None:
+            stats.update(metrics.as_dict())
+        status[key or 'default'] = stats
+    return status
@@ -1,13 +1,16 @@
 """
 Donor routes for registration, dashboard, and profile management.
 """
-from flask import render_template, redirect, url_for, flash, request
+from flask import render_template, redirect, url_for, flash, request, current_app
 from flask_login import login_required, current_user
 from datetime import datetime
 from app import db
 from app.donor import donor_bp
 from app.models import Donor, User
 from app.forms import DonorRegistrationForm, DonorProfileEditForm
+from app.donor_index import donor_index
+from app.batch_matching import suggested_patients
+from app.utils import invalidate_homepage_counters
 from functools import wraps
 
 
@@ -54,6 +57,7 @@ def register():
             existing_donor.medical_history = form.medical_history.data
             existing_donor.is_available = form.is_available.data
             existing_donor.updated_at = datetime.utcnow()
+            existing_donor.update_coordinates()
             
             flash('Donor profile updated successfully!', 'success')
         else:
@@ -72,10 +76,13 @@ def register():
                 medical_history=form.medical_history.data,
                 is_available=form.is_available.data
             )
+            donor.update_coordinates()
             db.session.add(donor)
             flash('Donor profile created successfully! Welcome to our community.', 'success')
         
         db.session.commit()
+        donor_index.refresh(existing_donor if existing_donor else donor)
+        invalidate_homepage_counters()
         
         # Notify matching patients about donor availability
         from app.utils import notify_matching_patients
@@ -117,11 +124,17 @@ def dashboard():
     if donor.last_donation_date:
         days_since_donation = (datetime.today().date() - donor.last_donation_date).days
     
+    # Open requests this donor was allocated to by the batch matcher
+    suggested_requests = []
+    if donor.is_available:
+        suggested_requests = suggested_patients(donor, current_app.config['SUGGESTIONS_MAX_AGE_HOURS'])
+    
     return render_template(
         'donor/dashboard.html',
         donor=donor,
         can_donate=can_donate,
         days_since_donation=days_since_donation,
+        suggested_requests=suggested_requests,
         title='Donor Dashboard'
     )
 
@@ -167,8 +180,11 @@ def edit_profile():
         donor.medical_history = form.medical_history.data
         donor.is_available = form.is_available.data
         donor.updated_at = datetime.utcnow()
+        donor.update_coordinates()
         
         db.session.commit()
+        donor_index.refresh(donor)
+        invalidate_homepage_counters()
         
         # Notify patients if donor just became available
         if was_unavailable and donor.is_available:
@@ -208,6 +224,8 @@ def toggle_availability():
     donor.is_available = not donor.is_available
     donor.updated_at = datetime.utcnow()
     db.session.commit()
+    donor_index.refresh(donor)
+    invalidate_homepage_counters()
     
     status = "available" if donor.is_available else "unavailable"
     flash(f'Your availability status has been updated to {status}.', 'success')
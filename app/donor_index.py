@@ -0,0 +1,294 @@
+"""
+In-process donor index for compatibility-aware donor search.
+
+Donors are bucketed by (normalized city, blood group) so that a patient search
+becomes a handful of set unions over the compatible blood groups. The database
+is only queried to hydrate the donors shown on the current page.
+"""
+import threading
+import time
+from collections import defaultdict, namedtuple
+from datetime import date
+
+import numpy as np
+from flask_sqlalchemy.pagination import Pagination
+
+from app import db
+from app.geo import cells_within, grid_cell, haversine_km
+from app.utils import normalize_location
+
+
+# Compact per-donor record kept in memory (no ORM objects are held)
+DonorEntry = namedtuple('DonorEntry', [
+    'id', 'blood_group', 'city_key', 'state_key', 'is_available',
+    'latitude', 'longitude', 'next_eligible_date', 'updated_at'
+])
+
+
+class DonorIndex:
+    """
+    Thread-safe in-memory index of donors keyed by (city, blood group).
+
+    The index is built lazily on first use and rebuilt after
+    ``DONOR_INDEX_REFRESH_SECONDS`` so that writes made by other worker
+    processes are eventually picked up. Writes made in this process are
+    applied immediately through :meth:`refresh`.
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.RLock()
+        self._refresh_seconds = 300
+        self._cell_degrees = 0.1
+        self._reset()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Read index settings from the application config."""
+        self._refresh_seconds = app.config.get('DONOR_INDEX_REFRESH_SECONDS', 300)
+        self._cell_degrees = app.config.get('GEO_CELL_DEGREES', 0.1)
+        with self._lock:
+            self._reset()
+
+    def _reset(self):
+        self._entries = {}
+        self._buckets = defaultdict(set)  # (city_key, blood_group) -> donor ids
+        self._groups = defaultdict(set)   # blood_group -> donor ids
+        self._cells = defaultdict(set)    # (row, col) grid cell -> donor ids
+        self._built_at = None
+
+    def _add(self, entry):
+        self._entries[entry.id] = entry
+        self._buckets[(entry.city_key, entry.blood_group)].add(entry.id)
+        self._groups[entry.blood_group].add(entry.id)
+        if entry.latitude is not None and entry.longitude is not None:
+            self._cells[grid_cell(entry.latitude, entry.longitude, self._cell_degrees)].add(entry.id)
+
+    def _discard(self, donor_id):
+        entry = self._entries.pop(donor_id, None)
+        if entry is None:
+            return
+        bucket_key = (entry.city_key, entry.blood_group)
+        self._buckets[bucket_key].discard(donor_id)
+        if not self._buckets[bucket_key]:
+            del self._buckets[bucket_key]
+        self._groups[entry.blood_group].discard(donor_id)
+        if entry.latitude is not None and entry.longitude is not None:
+            cell = grid_cell(entry.latitude, entry.longitude, self._cell_degrees)
+            self._cells[cell].discard(donor_id)
+            if not self._cells[cell]:
+                del self._cells[cell]
+
+    @staticmethod
+    def _entry_from_row(row):
+        return DonorEntry(
+            id=row.id,
+            blood_group=row.blood_group,
+            city_key=row.city_key,
+            state_key=row.state_key,
+            is_available=bool(row.is_available),
+            latitude=row.latitude,
+            longitude=row.longitude,
+            next_eligible_date=row.next_eligible_date,
+            updated_at=row.updated_at
+        )
+
+    def build(self):
+        """(Re)build the whole index from the donors table."""
+        from app.models import Donor
+
+        rows = db.session.query(
+            Donor.id, Donor.blood_group, Donor.city_key, Donor.state_key, Donor.is_available,
+            Donor.latitude, Donor.longitude, Donor.next_eligible_date, Donor.updated_at
+        ).all()
+
+        with self._lock:
+            self._reset()
+            for row in rows:
+                self._add(self._entry_from_row(row))
+            self._built_at = time.monotonic()
+
+    def ensure_built(self):
+        """Build the index if it is empty or older than the refresh interval."""
+        built_at = self._built_at
+        if built_at is None or time.monotonic() - built_at > self._refresh_seconds:
+            self.build()
+
+    def invalidate(self):
+        """Drop the index so that it is rebuilt on next use."""
+        with self._lock:
+            self._reset()
+
+    def refresh(self, donor):
+        """
+        Apply a committed donor write to the index.
+
+        Args:
+            donor: Donor object that was created or updated
+        """
+        if self._built_at is None:
+            return
+        with self._lock:
+            self._discard(donor.id)
+            self._add(self._entry_from_row(donor))
+
+    def remove(self, donor_id):
+        """Remove a deleted donor from the index."""
+        with self._lock:
+            self._discard(donor_id)
+
+    def get_entries(self, donor_ids):
+        """
+        Get the indexed records for some donors.
+
+        Args:
+            donor_ids: Iterable of donor IDs
+
+        Returns:
+            list: DonorEntry records (unknown IDs are skipped)
+        """
+        with self._lock:
+            entries = self._entries
+            return [entries[donor_id] for donor_id in donor_ids if donor_id in entries]
+
+    def match(self, blood_groups, city=None, state=None, available_only=True, eligible_only=False):
+        """
+        Find donors matching the given criteria.
+
+        Args:
+            blood_groups: Iterable of acceptable donor blood groups
+            city: City to match (normalized before lookup), or None for any city
+            state: State to match (normalized before lookup), or None for any state
+            available_only: Only return donors marked as available
+            eligible_only: Only return donors eligible to donate today
+
+        Returns:
+            list: Matching donor IDs, newest first
+        """
+        self.ensure_built()
+        city_key = normalize_location(city)
+        state_key = normalize_location(state)
+        today = date.today()
+
+        with self._lock:
+            ids = set()
+            for blood_group in blood_groups:
+                if city_key:
+                    ids |= self._buckets.get((city_key, blood_group), set())
+                else:
+                    ids |= self._groups.get(blood_group, set())
+
+            if available_only or eligible_only or state_key:
+                entries = self._entries
+                ids = [
+                    donor_id for donor_id in ids
+                    if (not available_only or entries[donor_id].is_available)
+                    and (not eligible_only or _is_eligible(entries[donor_id], today))
+                    and (not state_key or entries[donor_id].state_key == state_key)
+                ]
+
+        return sorted(ids, reverse=True)
+
+    def within_radius(self, latitude, longitude, radius_km, blood_groups, available_only=True,
+                      eligible_only=False):
+        """
+        Find donors within a radius of a coordinate, nearest first.
+
+        Candidates are prefiltered with the grid cell index and exact
+        distances are then computed in one vectorized pass.
+
+        Args:
+            latitude, longitude: Search center in degrees
+            radius_km: Search radius in kilometers
+            blood_groups: Iterable of acceptable donor blood groups
+            available_only: Only return donors marked as available
+            eligible_only: Only return donors eligible to donate today
+
+        Returns:
+            tuple: (list of donor IDs sorted by distance, dict of donor ID -> distance in km)
+        """
+        self.ensure_built()
+        blood_groups = set(blood_groups)
+        today = date.today()
+
+        with self._lock:
+            candidates = []
+            for cell in cells_within(latitude, longitude, radius_km, self._cell_degrees):
+                for donor_id in self._cells.get(cell, ()):
+                    entry = self._entries[donor_id]
+                    if (entry.blood_group in blood_groups
+                            and (entry.is_available or not available_only)
+                            and (not eligible_only or _is_eligible(entry, today))):
+                        candidates.append(entry)
+
+        if not candidates:
+            return [], {}
+
+        distances = haversine_km(
+            latitude, longitude,
+            [entry.latitude for entry in candidates],
+            [entry.longitude for entry in candidates]
+        )
+        order = np.argsort(distances, kind='stable')
+        order = order[distances[order] <= radius_km]
+
+        ids = [candidates[i].id for i in order]
+        return ids, {candidates[i].id: round(float(distances[i]), 1) for i in order}
+
+
+def _is_eligible(entry, today):
+    return entry.next_eligible_date is None or entry.next_eligible_date <= today
+
+
+class IndexPagination(Pagination):
+    """
+    Pagination over a list of donor IDs produced by :class:`DonorIndex`.
+
+    Only the donors on the requested page are loaded from the database.
+    """
+
+    def _query_items(self):
+        ids = self._query_args['ids']
+        return load_donors(ids[self._query_offset:self._query_offset + self.per_page])
+
+    def _query_count(self):
+        total = self._query_args.get('total')
+        return len(self._query_args['ids']) if total is None else total
+
+
+def load_donors(ids):
+    """
+    Load donors by ID in a single query, preserving the order of ``ids``.
+
+    Args:
+        ids: Ordered list of donor IDs
+
+    Returns:
+        list: Donor objects (IDs deleted since indexing are skipped)
+    """
+    from app.models import Donor
+
+    if not ids:
+        return []
+    donors = {donor.id: donor for donor in Donor.query.filter(Donor.id.in_(ids)).all()}
+    return [donors[donor_id] for donor_id in ids if donor_id in donors]
+
+
+def paginate_donor_ids(ids, page, per_page, total=None):
+    """
+    Paginate donor IDs returned by the index, hydrating only the current page.
+
+    Args:
+        ids: Ordered list of donor IDs (at least up to the requested page)
+        page: Page number (1-based)
+        per_page: Number of donors per page
+        total: Total number of matches, if ``ids`` is only a prefix of them
+
+    Returns:
+        IndexPagination: Pagination object compatible with the templates
+    """
+    return IndexPagination(page=page, per_page=per_page, error_out=False, ids=ids, total=total)
+
+
+# Process-wide index instance, initialized in create_app()
+donor_index = DonorIndex()
@@ -0,0 +1,156 @@
+"""
+Streaming table exports (CSV and NDJSON).
+
+Exports select plain columns, not ORM objects, and iterate them with
+``yield_per`` (a server-side cursor on PostgreSQL). Rows are encoded and
+sent as they arrive, so memory use does not depend on the number of rows
+and the client receives the first bytes immediately. With ``compress=True``
+the output is gzipped on the fly.
+"""
+import csv
+import json
+import zlib
+from datetime import date, datetime
+
+from app.models import User, Donor, Patient, Feedback
+
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+# Exported columns per table (never password hashes or derived lookup keys)
+EXPORT_COLUMNS = {
+    'users': [
+        User.id, User.email, User.phone, User.role, User.is_active, User.is_verified,
+        User.is_blocked, User.deleted_at, User.created_at, User.last_login,
+    ],
+    'donors': [
+        Donor.id, Donor.user_id, User.email, Donor.full_name, Donor.phone, Donor.blood_group,
+        Donor.date_of_birth, Donor.gender, Donor.city, Donor.state, Donor.pincode,
+        Donor.is_available, Donor.last_donation_date, Donor.next_eligible_date,
+        Donor.medical_history, Donor.created_at,
+    ],
+    'patients': [
+        Patient.id, Patient.user_id, User.email, Patient.full_name, Patient.phone,
+        Patient.blood_group_required, Patient.hospital_name, Patient.city, Patient.state,
+        Patient.pincode, Patient.urgency_level, Patient.required_by_date,
+        Patient.medical_condition, Patient.is_fulfilled, Patient.created_at,
+    ],
+    'feedback': [
+        Feedback.id, Feedback.name, Feedback.email, Feedback.subject, Feedback.message,
+        Feedback.rating, Feedback.is_resolved, Feedback.admin_response, Feedback.created_at,
+        Feedback.resolved_at,
+    ],
+}
+
+# Text is handed to the encoder/compressor in chunks of about this many characters
+CHUNK_SIZE = 64 * 1024
+
+
+def export_header(table):
+    """Get the export column names for a table (``email`` is the owning user's)."""
+    return [column.key for column in EXPORT_COLUMNS[table]]
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def _csv_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+class _Echo:
+    """File-like object whose ``write`` returns the line, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def encode_rows(rows, header, fmt):
+    """
+    Encode rows as CSV or NDJSON text, one line at a time.
+
+    Args:
+        rows: Iterable of row tuples
+        header: Column names
+        fmt: 'csv' or 'ndjson'
+
+    Yields:
+        str: Encoded lines
+    """
+    if fmt == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(header)
+        for row in rows:
+            yield writer.writerow([_csv_value(value) for value in row])
+    else:
+        for row in rows:
+            yield json.dumps(dict(zip(header, row)), default=_json_default, ensure_ascii=False) + '\n'
+
+
+def chunked(lines, size=CHUNK_SIZE):
+    """Join small strings into chunks of about ``size`` characters."""
+    buffer, length = [], 0
+    for line in lines:
+        buffer.append(line)
+        length += len(line)
+        if length >= size:
+            yield ''.join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def gzip_stream(chunks):
+    """
+    Gzip a stream of text chunks incrementally.
+
+    Args:
+        chunks: Iterable of str
+
+    Yields:
+        bytes: Gzip member data
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_stream(query, table, fmt, compress=False, batch_size=1000):
+    """
+    Stream a filtered listing query as an export file.
+
+    Args:
+        query: Filtered, unordered query over the table's model
+        table: 'users', 'donors', 'patients' or 'feedback'
+        fmt: 'csv' or 'ndjson'
+        compress: Gzip the output
+        batch_size: Rows fetched per round trip
+
+    Returns:
+        Iterator of bytes: Response body chunks
+    """
+    if table in ('donors', 'patients'):
+        model = Donor if table == 'donors' else Patient
+        query = query.join(User, model.user_id == User.id)
+    model_id = EXPORT_COLUMNS[table][0]
+    rows = (
+        query.with_entities(*EXPORT_COLUMNS[table])
+        .order_by(model_id)
+        .yield_per(batch_size)
+    )
+
+    chunks = chunked(encode_rows(rows, export_header(table), fmt))
+    if compress:
+        return gzip_stream(chunks)
+    return (chunk.encode('utf-8') for chunk in chunks)
@@ -369,7 +369,12 @@ class SearchDonorForm(FlaskForm):
     ])
     city = StringField('City', validators=[Optional()])
     state = StringField('State', validators=[Optional()])
+    radius_km = IntegerField('Within (km)', validators=[
+        Optional(),
+        NumberRange(min=1, max=500, message='Radius must be between 1 and 500 km')
+    ])
     available_only = BooleanField('Show Available Donors Only', default=True)
+    eligible_only = BooleanField('Show Donors Eligible to Donate Now', default=False)
     submit = SubmitField('Search')
 
 
@@ -0,0 +1,145 @@
+"""
+Geospatial helpers: pincode coordinates, grid cells and vectorized distances.
+"""
+import csv
+import math
+
+import numpy as np
+
+from app import db
+
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE_LAT = 111.32
+
+
+def haversine_km(lat, lon, lats, lons):
+    """
+    Vectorized Haversine distance from one point to many points.
+
+    Args:
+        lat, lon: Origin coordinate in degrees
+        lats, lons: Array-likes of destination coordinates in degrees
+
+    Returns:
+        numpy.ndarray: Distances in kilometers
+    """
+    lat1 = math.radians(lat)
+    lon1 = math.radians(lon)
+    lat2 = np.radians(np.asarray(lats, dtype=np.float64))
+    lon2 = np.radians(np.asarray(lons, dtype=np.float64))
+
+    a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def grid_cell(lat, lon, cell_degrees):
+    """
+    Get the grid cell containing a coordinate.
+
+    Args:
+        lat, lon: Coordinate in degrees
+        cell_degrees: Cell edge length in degrees
+
+    Returns:
+        tuple: (row, column) cell key
+    """
+    return (math.floor(lat / cell_degrees), math.floor(lon / cell_degrees))
+
+
+def cells_within(lat, lon, radius_km, cell_degrees):
+    """
+    Get every grid cell overlapping the bounding box of a circle.
+
+    Args:
+        lat, lon: Circle center in degrees
+        radius_km: Circle radius in kilometers
+        cell_degrees: Cell edge length in degrees
+
+    Returns:
+        list: (row, column) cell keys
+    """
+    dlat = radius_km / KM_PER_DEGREE_LAT
+    # Longitude degrees shrink towards the poles; clamp to avoid division by ~0
+    dlon = radius_km / (KM_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 0.01))
+
+    min_row, min_col = grid_cell(lat - dlat, lon - dlon, cell_degrees)
+    max_row, max_col = grid_cell(lat + dlat, lon + dlon, cell_degrees)
+
+    return [
+        (row, col)
+        for row in range(min_row, max_row + 1)
+        for col in range(min_col, max_col + 1)
+    ]
+
+
+def load_pincodes_csv(path):
+    """
+    Load pincode coordinates from a CSV file into the pincodes table.
+
+    The CSV must have ``pincode``, ``latitude`` and ``longitude`` columns;
+    ``city`` and ``state`` are optional. Existing pincodes are updated.
+
+    Args:
+        path: Path to the CSV file
+
+    Returns:
+        tuple: (number of rows inserted, number of rows updated, number of rows skipped)
+    """
+    from app.models import Pincode
+
+    rows = {}
+    skipped = 0
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        for record in csv.DictReader(f):
+            pincode = (record.get('pincode') or '').strip()
+            try:
+                latitude = float(record['latitude'])
+                longitude = float(record['longitude'])
+            except (KeyError, TypeError, ValueError):
+                skipped += 1
+                continue
+            if not pincode or not (-90 <= latitude <= 90) or not (-180 <= longitude <= 180):
+                skipped += 1
+                continue
+            rows[pincode] = {
+                'pincode': pincode,
+                'latitude': latitude,
+                'longitude': longitude,
+                'city': (record.get('city') or '').strip() or None,
+                'state': (record.get('state') or '').strip() or None,
+            }
+
+    existing = {pincode for (pincode,) in db.session.query(Pincode.pincode).all()}
+    inserts = [row for pincode, row in rows.items() if pincode not in existing]
+    updates = [row for pincode, row in rows.items() if pincode in existing]
+
+    if inserts:
+        db.session.bulk_insert_mappings(Pincode, inserts)
+    if updates:
+        db.session.bulk_update_mappings(Pincode, updates)
+    db.session.commit()
+
+    return len(inserts), len(updates), skipped
+
+
+def backfill_coordinates():
+    """
+    Copy pincode coordinates onto every donor and patient row.
+
+    Returns:
+        tuple: (donors updated, patients updated)
+    """
+    from app.models import Donor, Patient, Pincode
+
+    counts = []
+    for model in (Donor, Patient):
+        latitude = db.select(Pincode.latitude).where(Pincode.pincode == model.pincode).scalar_subquery()
+        longitude = db.select(Pincode.longitude).where(Pincode.pincode == model.pincode).scalar_subquery()
+        result = db.session.execute(
+            db.update(model).values(latitude=latitude, longitude=longitude)
+        )
+        counts.append(result.rowcount)
+    db.session.commit()
+
+    return tuple(counts)
@@ -0,0 +1,125 @@
+"""
+Cached identity loading for Flask-Login.
+
+Every authenticated request needs the user and, on most pages, their donor
+or patient profile. A column snapshot of all three is kept in the shared
+cache for ``IDENTITY_CACHE_TTL`` seconds. On a hit the snapshot is rebuilt
+into detached instances and merged into the session with ``load=False``,
+so no SQL is emitted. On a miss, one query loads the user with the donor
+and patient joined.
+
+The password hash and the medical notes are left out of the snapshot; on a
+restored instance they are unloaded and are read from the database on first
+access (login, password change, profile pages).
+
+Entries are dropped when a commit touches the user or their donor/patient
+row, for example a profile edit, role switch, block or delete.
+"""
+from flask import current_app
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import joinedload, make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app import db
+from app.cache import cache
+
+
+# Columns never written to the shared cache
+UNCACHED_COLUMNS = frozenset({'password_hash', 'medical_history', 'medical_condition'})
+
+
+def _cache_key(user_id):
+    return f'identity:{user_id}'
+
+
+def init_identity_cache(app):
+    """Register the session hooks that invalidate cached identities."""
+    if not event.contains(db.session, 'after_flush', _collect_changed_identities):
+        event.listen(db.session, 'after_flush', _collect_changed_identities)
+        event.listen(db.session, 'after_commit', _invalidate_changed_identities)
+        event.listen(db.session, 'after_rollback', _discard_changed_identities)
+
+
+def _collect_changed_identities(session, flush_context):
+    changed = session.info.setdefault('identity_changed_users', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        model_name = type(obj).__name__
+        if model_name == 'User':
+            changed.add(obj.id)
+        elif model_name in ('Donor', 'Patient'):
+            changed.add(obj.user_id)
+            # A profile moved to another user also changes the previous owner
+            changed.update(inspect(obj).attrs.user_id.history.deleted)
+    changed.discard(None)
+
+
+def _invalidate_changed_identities(session):
+    user_ids = session.info.pop('identity_changed_users', None)
+    if user_ids:
+        cache.delete(*[_cache_key(user_id) for user_id in user_ids])
+
+
+def _discard_changed_identities(session):
+    session.info.pop('identity_changed_users', None)
+
+
+def invalidate_identity(user_id):
+    """Drop a user's cached identity (for writes that bypass the ORM session)."""
+    cache.delete(_cache_key(user_id))
+
+
+def _snapshot(obj):
+    if obj is None:
+        return None
+    return {
+        attr.key: getattr(obj, attr.key)
+        for attr in inspect(obj).mapper.column_attrs
+        if attr.key not in UNCACHED_COLUMNS
+    }
+
+
+def _restore(model, values):
+    """Build a clean, detached instance from a column snapshot."""
+    obj = model.__mapper__.class_manager.new_instance()
+    for key, value in values.items():
+        set_committed_value(obj, key, value)
+    make_transient_to_detached(obj)
+    return obj
+
+
+def load_identity(user_id):
+    """
+    Load a user with their donor/patient profile, using the identity cache.
+
+    Args:
+        user_id: User ID stored in the login session
+
+    Returns:
+        User object attached to the current session, or None
+    """
+    from app.models import User, Donor, Patient
+
+    # Already loaded in this session: nothing to do
+    user = db.session.identity_map.get(inspect(User).identity_key_from_primary_key((user_id,)))
+    if user is not None:
+        return user
+
+    key = _cache_key(user_id)
+    snapshot = cache.get(key)
+    if snapshot is None:
+        user = User.query.options(
+            joinedload(User.donor), joinedload(User.patient)
+        ).filter(User.id == user_id).first()
+        if user is not None:
+            cache.set(key, {
+                'user': _snapshot(user),
+                'donor': _snapshot(user.donor),
+                'patient': _snapshot(user.patient),
+            }, current_app.config['IDENTITY_CACHE_TTL'])
+        return user
+
+    user = _restore(User, snapshot['user'])
+    for name, model in (('donor', Donor), ('patient', Patient)):
+        profile = _restore(model, snapshot[name]) if snapshot[name] else None
+        set_committed_value(user, name, profile)
+    return db.session.merge(user, load=False)
@@ -0,0 +1,150 @@
+"""
+Per-request SQL instrumentation.
+
+SQLAlchemy engine events count every statement a request executes and time
+it. Statements are grouped by shape (whitespace and expanded IN-lists
+collapsed), so a statement repeated once per row of a listing shows up as
+an N+1. At the end of each request:
+
+* a warning is logged when a shape repeats ``SQL_N_PLUS_ONE_THRESHOLD`` times,
+* a ``Server-Timing: db;dur=..;desc="N queries"`` header is added when
+  ``SQL_SERVER_TIMING`` is enabled.
+
+``assert_max_queries`` enforces query budgets in tests and scripts.
+"""
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+
+from app import db
+
+
+_WHITESPACE = re.compile(r'\s+')
+_PARAM_LIST = re.compile(r'\((?:\s*(?:\?|%\(\w+\)s|:\w+)\s*,)+\s*(?:\?|%\(\w+\)s|:\w+)\s*\)')
+
+
+def statement_shape(statement):
+    """
+    Normalize a statement so that repeated executions compare equal.
+
+    Args:
+        statement: SQL string as sent to the driver
+
+    Returns:
+        str: Statement with collapsed whitespace and parameter lists
+    """
+    shape = _WHITESPACE.sub(' ', statement).strip()
+    return _PARAM_LIST.sub('(?)', shape)
+
+
+class QueryStats:
+    """Queries executed during one request (or one ``assert_max_queries`` block)."""
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0  # seconds
+        self.shapes = Counter()
+
+    def record(self, statement, duration):
+        self.count += 1
+        self.total_time += duration
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self, threshold):
+        """Get the statement shapes executed at least ``threshold`` times."""
+        return [(shape, n) for shape, n in self.shapes.most_common() if n >= threshold]
+
+
+# Extra collectors registered by assert_max_queries (outside of requests too)
+_collectors = []
+
+
+def init_instrumentation(app):
+    """Register engine and request hooks for the application."""
+    if not app.config.get('SQL_INSTRUMENTATION', True):
+        return
+
+    with app.app_context():
+        # Every bind, including the read replica
+        for engine in db.engines.values():
+            if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+                event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+                event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the execution context, so a failed statement leaves nothing behind
+    if context is not None:
+        context._query_start_time = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_query_start_time', None)
+    if started is None:
+        return
+    duration = time.perf_counter() - started
+
+    if has_request_context():
+        stats = g.get('query_stats')
+        if stats is not None:
+            stats.record(statement, duration)
+    for stats in _collectors:
+        stats.record(statement, duration)
+
+
+def _start_request():
+    g.query_stats = QueryStats()
+
+
+def _finish_request(response):
+    stats = g.pop('query_stats', None)
+    if stats is None:
+        return response
+
+    config = current_app.config
+    threshold = config.get('SQL_N_PLUS_ONE_THRESHOLD', 10)
+    for shape, n in stats.repeated(threshold):
+        current_app.logger.warning(
+            f"Possible N+1 in {request.endpoint}: statement executed {n} times: {shape[:200]}"
+        )
+
+    if config.get('SQL_SERVER_TIMING'):
+        response.headers.add(
+            'Server-Timing', f'db;dur={stats.total_time * 1000:.1f};desc="{stats.count} queries"'
+        )
+    return response
+
+
+@contextmanager
+def assert_max_queries(max_queries):
+    """
+    Fail if the enclosed block executes more than ``max_queries`` statements.
+
+    Usage::
+
+        with app.test_client() as client, assert_max_queries(5):
+            client.get('/admin/donors')
+
+    Args:
+        max_queries: Query budget for the block
+
+    Yields:
+        QueryStats: Statistics collected for the block
+    """
+    stats = QueryStats()
+    _collectors.append(stats)
+    try:
+        yield stats
+    finally:
+        _collectors.remove(stats)
+
+    if stats.count > max_queries:
+        details = '\n'.join(f'  {n}x {shape[:200]}' for shape, n in stats.shapes.most_common())
+        raise AssertionError(f'{stats.count} queries executed, budget was {max_queries}:\n{details}')
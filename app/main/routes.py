@@ -7,31 +7,115 @@ from app import db
 from app.main import main_bp
 from app.models import Feedback, Donor, Patient, User, OTP
 from app.forms import FeedbackForm
+from app.utils import get_homepage_counters, invalidate_homepage_counters
+from app.page_cache import cached_page
+from app.replica import read_only
+
+
+# Static page content (built once at import, not per request)
+FAQS = [
+    {
+        'question': 'Who can donate blood?',
+        'answer': 'Anyone between 18-65 years of age, weighing at least 50 kg, and in good health can donate blood.'
+    },
+    {
+        'question': 'How often can I donate blood?',
+        'answer': 'You can donate blood every 3 months (90 days). Our system tracks your last donation date automatically.'
+    },
+    {
+        'question': 'Is blood donation safe?',
+        'answer': 'Yes, blood donation is completely safe. Sterile, single-use equipment is used for each donation.'
+    },
+    {
+        'question': 'How long does the donation process take?',
+        'answer': 'The actual donation takes about 10-15 minutes, but the entire process including registration and refreshments takes about 45 minutes.'
+    },
+    {
+        'question': 'What blood types are compatible?',
+        'answer': 'O- is the universal donor (can donate to all blood types). AB+ is the universal recipient (can receive from all blood types). Our system automatically shows you compatible donors/patients.'
+    },
+    {
+        'question': 'How do I search for blood donors?',
+        'answer': 'After registering as a patient, you can search for donors by blood type, location, and availability. Contact information is provided for available donors.'
+    },
+    {
+        'question': 'How is my data protected?',
+        'answer': 'We use industry-standard security measures including password hashing, CSRF protection, and secure session management to protect your data.'
+    },
+    {
+        'question': 'Can I update my availability status?',
+        'answer': 'Yes! Donors can toggle their availability status anytime from their dashboard.'
+    }
+]
+
+
+COMPATIBILITY_DATA = {
+    'O-': {
+        'can_donate_to': ['O-', 'O+', 'A-', 'A+', 'B-', 'B+', 'AB-', 'AB+'],
+        'can_receive_from': ['O-'],
+        'description': 'Universal Donor'
+    },
+    'O+': {
+        'can_donate_to': ['O+', 'A+', 'B+', 'AB+'],
+        'can_receive_from': ['O-', 'O+'],
+        'description': 'Common Blood Type'
+    },
+    'A-': {
+        'can_donate_to': ['A-', 'A+', 'AB-', 'AB+'],
+        'can_receive_from': ['A-', 'O-'],
+        'description': 'Rare Blood Type'
+    },
+    'A+': {
+        'can_donate_to': ['A+', 'AB+'],
+        'can_receive_from': ['A-', 'A+', 'O-', 'O+'],
+        'description': 'Common Blood Type'
+    },
+    'B-': {
+        'can_donate_to': ['B-', 'B+', 'AB-', 'AB+'],
+        'can_receive_from': ['B-', 'O-'],
+        'description': 'Rare Blood Type'
+    },
+    'B+': {
+        'can_donate_to': ['B+', 'AB+'],
+        'can_receive_from': ['B-', 'B+', 'O-', 'O+'],
+        'description': 'Common Blood Type'
+    },
+    'AB-': {
+        'can_donate_to': ['AB-', 'AB+'],
+        'can_receive_from': ['AB-', 'A-', 'B-', 'O-'],
+        'description': 'Rare Blood Type'
+    },
+    'AB+': {
+        'can_donate_to': ['AB+'],
+        'can_receive_from': ['O-', 'O+', 'A-', 'A+', 'B-', 'B+', 'AB-', 'AB+'],
+        'description': 'Universal Recipient'
+    }
+}
 
 
 @main_bp.route('/')
 @main_bp.route('/index')
+@read_only
 def index():
     """Homepage."""
-    # Get some statistics for display
-    total_donors = Donor.query.count()
-    available_donors = Donor.query.filter_by(is_available=True).count()
-    total_patients = Patient.query.count()
+    # Get some statistics for display (cached; also serves the health check)
+    counters = get_homepage_counters()
     
     # Get blood group distribution
     blood_groups = ['A+', 'A-', 'B+', 'B-', 'O+', 'O-', 'AB+', 'AB-']
     
     return render_template(
         'main/index.html',
-        total_donors=total_donors,
-        available_donors=available_donors,
-        total_patients=total_patients,
+        total_donors=counters['total_donors'],
+        available_donors=counters['available_donors'],
+        total_patients=counters['total_patients'],
         blood_groups=blood_groups,
         title='Home - Save Lives Through Blood Donation'
     )
 
 
 @main_bp.route('/about')
+@cached_page()
 def about():
     """About page."""
     return render_template('main/about.html', title='About Us')
@@ -76,112 +160,39 @@ def feedback():
 
 
 @main_bp.route('/how-it-works')
+@cached_page()
 def how_it_works():
     """How it works page."""
     return render_template('main/how_it_works.html', title='How It Works')
 
 
 @main_bp.route('/faq')
+@cached_page()
 def faq():
     """Frequently Asked Questions page."""
-    faqs = [
-        {
-            'question': 'Who can donate blood?',
-            'answer': 'Anyone between 18-65 years of age, weighing at least 50 kg, and in good health can donate blood.'
-        },
-        {
-            'question': 'How often can I donate blood?',
-            'answer': 'You can donate blood every 3 months (90 days). Our system tracks your last donation date automatically.'
-        },
-        {
-            'question': 'Is blood donation safe?',
-            'answer': 'Yes, blood donation is completely safe. Sterile, single-use equipment is used for each donation.'
-        },
-        {
-            'question': 'How long does the donation process take?',
-            'answer': 'The actual donation takes about 10-15 minutes, but the entire process including registration and refreshments takes about 45 minutes.'
-        },
-        {
-            'question': 'What blood types are compatible?',
-            'answer': 'O- is the universal donor (can donate to all blood types). AB+ is the universal recipient (can receive from all blood types). Our system automatically shows you compatible donors/patients.'
-        },
-        {
-            'question': 'How do I search for blood donors?',
-            'answer': 'After registering as a patient, you can search for donors by blood type, location, and availability. Contact information is provided for available donors.'
-        },
-        {
-            'question': 'How is my data protected?',
-            'answer': 'We use industry-standard security measures including password hashing, CSRF protection, and secure session management to protect your data.'
-        },
-        {
-            'question': 'Can I update my availability status?',
-            'answer': 'Yes! Donors can toggle their availability status anytime from their dashboard.'
-        }
-    ]
-    
-    return render_template('main/faq.html', faqs=faqs, title='FAQ')
+    return render_template('main/faq.html', faqs=FAQS, title='FAQ')
 
 
 @main_bp.route('/blood-compatibility')
+@cached_page()
 def blood_compatibility():
     """Blood compatibility information page."""
-    compatibility_data = {
-        'O-': {
-            'can_donate_to': ['O-', 'O+', 'A-', 'A+', 'B-', 'B+', 'AB-', 'AB+'],
-            'can_receive_from': ['O-'],
-            'description': 'Universal Donor'
-        },
-        'O+': {
-            'can_donate_to': ['O+', 'A+', 'B+', 'AB+'],
-            'can_receive_from': ['O-', 'O+'],
-            'description': 'Common Blood Type'
-        },
-        'A-': {
-            'can_donate_to': ['A-', 'A+', 'AB-', 'AB+'],
-            'can_receive_from': ['A-', 'O-'],
-            'description': 'Rare Blood Type'
-        },
-        'A+': {
-            'can_donate_to': ['A+', 'AB+'],
-            'can_receive_from': ['A-', 'A+', 'O-', 'O+'],
-            'description': 'Common Blood Type'
-        },
-        'B-': {
-            'can_donate_to': ['B-', 'B+', 'AB-', 'AB+'],
-            'can_receive_from': ['B-', 'O-'],
-            'description': 'Rare Blood Type'
-        },
-        'B+': {
-            'can_donate_to': ['B+', 'AB+'],
-            'can_receive_from': ['B-', 'B+', 'O-', 'O+'],
-            'description': 'Common Blood Type'
-        },
-        'AB-': {
-            'can_donate_to': ['AB-', 'AB+'],
-            'can_receive_from': ['AB-', 'A-', 'B-', 'O-'],
-            'description': 'Rare Blood Type'
-        },
-        'AB+': {
-            'can_donate_to': ['AB+'],
-            'can_receive_from': ['O-', 'O+', 'A-', 'A+', 'B-', 'B+', 'AB-', 'AB+'],
-            'description': 'Universal Recipient'
-        }
-    }
-    
     return render_template(
         'main/blood_compatibility.html',
-        compatibility_data=compatibility_data,
+        compatibility_data=COMPATIBILITY_DATA,
         title='Blood Compatibility Guide'
     )
 
 
 @main_bp.route('/privacy-policy')
+@cached_page()
 def privacy_policy():
     """Privacy policy page."""
     return render_template('main/privacy_policy.html', title='Privacy Policy')
 
 
 @main_bp.route('/terms-of-service')
+@cached_page()
 def terms_of_service():
     """Terms of service page."""
     return render_template('main/terms_of_service.html', title='Terms of Service')
@@ -236,6 +247,12 @@ def delete_all_users():
         User.query.delete()
         
         db.session.commit()
+        from app.donor_index import donor_index
+        donor_index.invalidate()
+        invalidate_homepage_counters()
+        # Bulk deletes bypass the flush hook that maintains the statistics
+        from app.stats import repair_blood_group_stats
+        repair_blood_group_stats()
         return "All users deleted successfully! Now remove this route from code."
     except Exception as e:
         db.session.rollback()
@@ -0,0 +1,130 @@
+"""
+Ranked donor matching for patients.
+
+Candidates come from the in-memory donor index and are scored on:
+
+* eligibility to donate now (90-day rule) and availability,
+* exact blood group match, with universal O- donors kept in reserve,
+* distance between pincodes, or same city/state when coordinates are unknown,
+* how recently the donor updated their profile.
+
+Only the top k candidates are selected (with a heap) and loaded from the database.
+"""
+import heapq
+from datetime import datetime
+
+from app.donor_index import donor_index, load_donors
+from app.geo import haversine_km
+from app.models import get_compatible_blood_groups
+
+
+ELIGIBLE_WEIGHT = 100        # Can donate today
+AVAILABLE_WEIGHT = 50        # Marked as available
+EXACT_GROUP_WEIGHT = 30      # Same blood group as required
+UNIVERSAL_DONOR_PENALTY = 10  # O- offered for a non-O- request
+LOCALITY_WEIGHT = 20         # Same city, or within LOCALITY_RADIUS_KM
+SAME_STATE_WEIGHT = 5
+RECENCY_WEIGHT = 10          # Profile updated today, decaying to 0 over a year
+
+LOCALITY_RADIUS_KM = 50.0
+RECENCY_DAYS = 365.0
+
+
+def score_donor(entry, patient, today=None, now=None, distance_km=None):
+    """
+    Score how good a donor is for a patient (higher is better).
+
+    Args:
+        entry: DonorEntry from the donor index
+        patient: Patient object
+        today: Date used for the eligibility rule (defaults to today)
+        now: Datetime used for profile recency (defaults to now)
+        distance_km: Precomputed distance to the donor, if both have coordinates
+
+    Returns:
+        float: Match score
+    """
+    today = today or datetime.today().date()
+    now = now or datetime.utcnow()
+    score = 0.0
+
+    if entry.next_eligible_date is None or entry.next_eligible_date <= today:
+        score += ELIGIBLE_WEIGHT
+    if entry.is_available:
+        score += AVAILABLE_WEIGHT
+
+    if entry.blood_group == patient.blood_group_required:
+        score += EXACT_GROUP_WEIGHT
+    elif entry.blood_group == 'O-':
+        score -= UNIVERSAL_DONOR_PENALTY
+
+    if None not in (entry.latitude, entry.longitude, patient.latitude, patient.longitude):
+        if distance_km is None:
+            distance_km = float(haversine_km(
+                patient.latitude, patient.longitude, [entry.latitude], [entry.longitude]
+            )[0])
+        score += LOCALITY_WEIGHT * max(0.0, 1.0 - distance_km / LOCALITY_RADIUS_KM)
+    elif entry.city_key == patient.city_key:
+        score += LOCALITY_WEIGHT
+    elif entry.state_key == patient.state_key:
+        score += SAME_STATE_WEIGHT
+
+    if entry.updated_at is not None:
+        age_days = max((now - entry.updated_at).total_seconds() / 86400.0, 0.0)
+        score += RECENCY_WEIGHT * max(0.0, 1.0 - age_days / RECENCY_DAYS)
+
+    return score
+
+
+def _candidate_distances(patient, entries):
+    """Distances (km) from the patient to every candidate with coordinates, in one vectorized call."""
+    if patient.latitude is None or patient.longitude is None:
+        return {}
+    located = [entry for entry in entries if entry.latitude is not None and entry.longitude is not None]
+    if not located:
+        return {}
+    distances = haversine_km(
+        patient.latitude, patient.longitude,
+        [entry.latitude for entry in located], [entry.longitude for entry in located]
+    )
+    return {entry.id: float(distance) for entry, distance in zip(located, distances)}
+
+
+def rank_donor_ids(patient, donor_ids, k):
+    """
+    Select the k best donors for a patient, best first.
+
+    Args:
+        patient: Patient object
+        donor_ids: Candidate donor IDs (e.g. from DonorIndex.match)
+        k: Number of donors to select
+
+    Returns:
+        list: Up to k donor IDs ordered by descending score
+    """
+    today = datetime.today().date()
+    now = datetime.utcnow()
+    entries = donor_index.get_entries(donor_ids)
+    distances = _candidate_distances(patient, entries)
+    best = heapq.nlargest(k, entries, key=lambda entry: (
+        score_donor(entry, patient, today, now, distances.get(entry.id)), entry.id
+    ))
+    return [entry.id for entry in best]
+
+
+def top_matching_donors(patient, k=10, city=None, eligible_only=False):
+    """
+    Find the best available, compatible donors for a patient.
+
+    Args:
+        patient: Patient object
+        k: Number of donors to return
+        city: City to search in (defaults to the patient's city)
+        eligible_only: Only consider donors eligible to donate today
+
+    Returns:
+        list: Up to k Donor objects, best match first
+    """
+    compatible_groups = get_compatible_blood_groups(patient.blood_group_required)
+    donor_ids = donor_index.match(compatible_groups, city=city or patient.city, eligible_only=eligible_only)
+    return load_donors(rank_donor_ids(patient, donor_ids, k))
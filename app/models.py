@@ -3,14 +3,55 @@ Database models for the BloodCircle application.
 """
 from datetime import datetime, timedelta
 from flask_login import UserMixin
+from sqlalchemy.orm import validates
 from werkzeug.security import generate_password_hash, check_password_hash
 from app import db, login_manager
+from app.utils import normalize_location
+
+
+# Minimum days between two donations
+DONATION_INTERVAL_DAYS = 90
+
+
+def next_eligible_date_for(last_donation_date):
+    """
+    Get the first date a donor may donate again.
+    
+    Args:
+        last_donation_date: Date of the last donation, or None
+    
+    Returns:
+        date: First eligible date, or None if the donor has never donated
+    """
+    if not last_donation_date:
+        return None
+    return last_donation_date + timedelta(days=DONATION_INTERVAL_DAYS)
+
+
+# Patient urgency levels by priority rank (lower is more urgent)
+URGENCY_LEVELS = {1: 'Critical', 2: 'Urgent', 3: 'Normal'}
+URGENCY_RANKS = {level: rank for rank, level in URGENCY_LEVELS.items()}
+UNKNOWN_URGENCY_RANK = 9  # Sorts after every known level
+
+
+def urgency_rank_for(urgency_level):
+    """
+    Get the priority rank stored for an urgency level.
+    
+    Args:
+        urgency_level: 'Critical', 'Urgent' or 'Normal'
+    
+    Returns:
+        int: Rank (1 = most urgent)
+    """
+    return URGENCY_RANKS.get(urgency_level, UNKNOWN_URGENCY_RANK)
 
 
 @login_manager.user_loader
 def load_user(user_id):
-    """Load user by ID for Flask-Login."""
-    return User.query.get(int(user_id))
+    """Load user by ID for Flask-Login (served from the identity cache)."""
+    from app.identity import load_identity
+    return load_identity(int(user_id))
 
 
 class User(UserMixin, db.Model):
@@ -35,7 +76,14 @@ class User(UserMixin, db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     last_login = db.Column(db.DateTime)
     
-    # Relationships
+    # Indexes for the admin listings (newest first, optionally by role)
+    __table_args__ = (
+        db.Index('ix_users_created_at_id', 'created_at', 'id'),
+        db.Index('ix_users_role_created_at', 'role', 'created_at'),
+    )
+    
+    # Relationships (lazy by default; list pages opt into eager loading per query,
+    # see ADMIN_LOADING_STRATEGY, and the user loader joins donor/patient itself)
     donor = db.relationship('Donor', backref='user', uselist=False, cascade='all, delete-orphan')
     patient = db.relationship('Patient', backref='user', uselist=False, cascade='all, delete-orphan')
     otps = db.relationship('OTP', backref='user', lazy='dynamic', cascade='all, delete-orphan')
@@ -65,15 +113,31 @@ class Donor(db.Model):
     blood_group = db.Column(db.String(5), nullable=False, index=True)  # A+, A-, B+, B-, O+, O-, AB+, AB-
     date_of_birth = db.Column(db.Date, nullable=False)
     gender = db.Column(db.String(10), nullable=False)  # Male, Female, Other
-    city = db.Column(db.String(50), nullable=False, index=True)
+    city = db.Column(db.String(50), nullable=False)  # Looked up through city_key
     state = db.Column(db.String(50), nullable=False)
+    city_key = db.Column(db.String(50))  # Normalized city/state for equality lookups
+    state_key = db.Column(db.String(50))
     pincode = db.Column(db.String(10), nullable=False)
+    latitude = db.Column(db.Float)  # Derived from pincode
+    longitude = db.Column(db.Float)
     last_donation_date = db.Column(db.Date)
+    next_eligible_date = db.Column(db.Date)  # Derived from last_donation_date
     medical_history = db.Column(db.Text)
-    is_available = db.Column(db.Boolean, default=True, index=True)
+    is_available = db.Column(db.Boolean, default=True)  # Filtered through the partial indexes
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Matching seeks (city_key, blood_group, is_available); the eligibility
+    # index only holds available donors (`flask db-explain` shows the plans;
+    # migrate_indexes.py creates them)
+    __table_args__ = (
+        db.Index('ix_donors_city_key_blood_group_available', 'city_key', 'blood_group', 'is_available'),
+        db.Index('ix_donors_state_key_blood_group', 'state_key', 'blood_group'),
+        db.Index('ix_donors_available_next_eligible_date', 'next_eligible_date',
+                 postgresql_where=db.text('is_available'), sqlite_where=db.text('is_available = 1')),
+        db.Index('ix_donors_created_at_id', 'created_at', 'id'),
+    )
+    
     def get_age(self):
         """Calculate donor's age."""
         today = datetime.today().date()
@@ -81,14 +145,67 @@ class Donor(db.Model):
             (today.month, today.day) < (self.date_of_birth.month, self.date_of_birth.day)
         )
     
+    def update_coordinates(self):
+        """Set latitude/longitude from the pincode reference table."""
+        self.latitude, self.longitude = Pincode.coordinates_for(self.pincode)
+    
+    @validates('city', 'state')
+    def _sync_location_key(self, key, value):
+        setattr(self, f'{key}_key', normalize_location(value))
+        return value
+    
+    @validates('last_donation_date')
+    def _sync_next_eligible_date(self, key, value):
+        # Keep the indexed eligibility date in step with every write path
+        self.next_eligible_date = next_eligible_date_for(value)
+        return value
+    
+    @classmethod
+    def eligible_on(cls, day=None):
+        """
+        SQL condition for donors eligible to donate on a date.
+        
+        Args:
+            day: Date to check (defaults to today)
+        
+        Returns:
+            SQL expression usable in ``query.filter()``
+        """
+        day = day or datetime.today().date()
+        return db.or_(cls.next_eligible_date.is_(None), cls.next_eligible_date <= day)
+    
+    @staticmethod
+    def backfill_next_eligible_dates(batch_size=1000):
+        """
+        Recompute next_eligible_date for every donor.
+        
+        Args:
+            batch_size: Number of rows updated per statement
+        
+        Returns:
+            int: Number of donors whose date changed
+        """
+        rows = db.session.query(
+            Donor.id, Donor.last_donation_date, Donor.next_eligible_date
+        ).order_by(Donor.id).all()
+        
+        updates = []
+        for row in rows:
+            next_date = next_eligible_date_for(row.last_donation_date)
+            if next_date != row.next_eligible_date:
+                updates.append({'id': row.id, 'next_eligible_date': next_date})
+        
+        for start in range(0, len(updates), batch_size):
+            db.session.bulk_update_mappings(Donor, updates[start:start + batch_size])
+        db.session.commit()
+        
+        return len(updates)
+    
     def can_donate(self):
         """Check if donor is eligible to donate based on last donation date."""
-        if not self.last_donation_date:
-            return True
-        
         # Donors can donate every 3 months (90 days)
-        days_since_last_donation = (datetime.today().date() - self.last_donation_date).days
-        return days_since_last_donation >= 90
+        next_date = self.next_eligible_date or next_eligible_date_for(self.last_donation_date)
+        return next_date is None or next_date <= datetime.today().date()
     
     def __repr__(self):
         return f'<Donor {self.full_name} - {self.blood_group}>'
@@ -106,16 +223,74 @@ class Patient(db.Model):
     phone = db.Column(db.String(20), nullable=False)  # Required for donors to contact
     blood_group_required = db.Column(db.String(5), nullable=False, index=True)
     hospital_name = db.Column(db.String(100), nullable=False)
-    city = db.Column(db.String(50), nullable=False, index=True)
+    city = db.Column(db.String(50), nullable=False)  # Looked up through city_key
     state = db.Column(db.String(50), nullable=False)
+    city_key = db.Column(db.String(50))  # Normalized city/state for equality lookups
+    state_key = db.Column(db.String(50))
     pincode = db.Column(db.String(10), nullable=False)
+    latitude = db.Column(db.Float)  # Derived from pincode
+    longitude = db.Column(db.Float)
     urgency_level = db.Column(db.String(20), nullable=False)  # Critical, Urgent, Normal
+    urgency_rank = db.Column(db.SmallInteger, nullable=False, default=UNKNOWN_URGENCY_RANK)  # Derived from urgency_level, see URGENCY_LEVELS
     required_by_date = db.Column(db.Date, nullable=False)
     medical_condition = db.Column(db.Text)
     is_fulfilled = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Priority order: open requests first, then most urgent, then earliest needed.
+    # ix_patients_priority stands in for a partial index on open requests:
+    # with is_fulfilled leading, the open rows are one contiguous range of it,
+    # so the open-request queries (is_fulfilled = false, rendered as a
+    # literal) read the same entries a partial index would hold, and the
+    # admin listing, which orders open and fulfilled requests together,
+    # needs the full index anyway.
+    __table_args__ = (
+        db.Index('ix_patients_city_key_blood_group', 'city_key', 'blood_group_required'),
+        db.Index('ix_patients_state_key_blood_group', 'state_key', 'blood_group_required'),
+        db.Index('ix_patients_priority', 'is_fulfilled', 'urgency_rank', 'required_by_date', 'id'),
+    )
+    
+    @validates('city', 'state')
+    def _sync_location_key(self, key, value):
+        setattr(self, f'{key}_key', normalize_location(value))
+        return value
+    
+    @validates('urgency_level')
+    def _sync_urgency_rank(self, key, value):
+        self.urgency_rank = urgency_rank_for(value)
+        return value
+    
+    @classmethod
+    def priority_order(cls):
+        """
+        Ordering for patient listings: open requests first, most urgent, earliest needed.
+        
+        Returns:
+            list: (column, descending) pairs, ending with the primary key
+        """
+        return [
+            (cls.is_fulfilled, False),
+            (cls.urgency_rank, False),
+            (cls.required_by_date, False),
+            (cls.id, False),
+        ]
+    
+    @staticmethod
+    def backfill_urgency_ranks():
+        """
+        Recompute urgency_rank for every patient in one statement.
+        
+        Returns:
+            int: Number of patients whose rank changed
+        """
+        rank = db.case(URGENCY_RANKS, value=Patient.urgency_level, else_=UNKNOWN_URGENCY_RANK)
+        updated = Patient.query.filter(
+            db.or_(Patient.urgency_rank.is_(None), Patient.urgency_rank != rank)
+        ).update({Patient.urgency_rank: rank}, synchronize_session=False)
+        db.session.commit()
+        return updated
+    
     def is_urgent(self):
         """Check if request is still urgent based on required date."""
         return self.required_by_date >= datetime.today().date()
@@ -124,10 +299,105 @@ class Patient(db.Model):
         """Calculate days remaining until required date."""
         return (self.required_by_date - datetime.today().date()).days
     
+    def update_coordinates(self):
+        """Set latitude/longitude from the pincode reference table."""
+        self.latitude, self.longitude = Pincode.coordinates_for(self.pincode)
+    
     def __repr__(self):
         return f'<Patient {self.full_name} - Needs {self.blood_group_required}>'
 
 
+class DonorSuggestion(db.Model):
+    """
+    Donor suggested for an open patient request by the batch matcher.
+    The whole table is replaced on every `flask match-all` run.
+    """
+    __tablename__ = 'donor_suggestions'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    patient_id = db.Column(db.Integer, db.ForeignKey('patients.id', ondelete='CASCADE'), nullable=False, index=True)
+    donor_id = db.Column(db.Integer, db.ForeignKey('donors.id', ondelete='CASCADE'), nullable=False, index=True)
+    rank = db.Column(db.Integer, nullable=False)  # 1 = best suggestion for the patient
+    distance_km = db.Column(db.Float)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    patient = db.relationship('Patient')
+    donor = db.relationship('Donor')
+    
+    def __repr__(self):
+        return f'<DonorSuggestion patient={self.patient_id} donor={self.donor_id} rank={self.rank}>'
+
+
+class Pincode(db.Model):
+    """
+    Pincode reference table mapping postal codes to coordinates.
+    Loaded from a CSV with `flask load-pincodes`.
+    """
+    __tablename__ = 'pincodes'
+    
+    pincode = db.Column(db.String(10), primary_key=True)
+    latitude = db.Column(db.Float, nullable=False)
+    longitude = db.Column(db.Float, nullable=False)
+    city = db.Column(db.String(50))
+    state = db.Column(db.String(50))
+    
+    @staticmethod
+    def coordinates_for(pincode):
+        """
+        Look up coordinates for a pincode.
+        
+        Args:
+            pincode: Postal code
+        
+        Returns:
+            tuple: (latitude, longitude), or (None, None) if the pincode is unknown
+        """
+        if not pincode:
+            return None, None
+        row = db.session.query(Pincode.latitude, Pincode.longitude).filter_by(
+            pincode=pincode.strip()
+        ).first()
+        return (row.latitude, row.longitude) if row else (None, None)
+    
+    def __repr__(self):
+        return f'<Pincode {self.pincode}>'
+
+
+class UserSearchDocument(db.Model):
+    """
+    Denormalized search document per user, backing the admin prefix search.
+    Kept in sync automatically by app.search on every commit.
+    """
+    __tablename__ = 'user_search_documents'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    email = db.Column(db.String(120))
+    user_phone = db.Column(db.String(20))
+    donor_name = db.Column(db.String(100))
+    donor_phone = db.Column(db.String(20))
+    patient_name = db.Column(db.String(100))
+    patient_phone = db.Column(db.String(20))
+    
+    def __repr__(self):
+        return f'<UserSearchDocument {self.user_id}>'
+
+
+class BloodGroupStat(db.Model):
+    """
+    Running donor/patient counts per blood group for the admin statistics.
+    Maintained incrementally by app.stats on every flush.
+    """
+    __tablename__ = 'blood_group_stats'
+    
+    blood_group = db.Column(db.String(5), primary_key=True)
+    donors = db.Column(db.Integer, nullable=False, default=0)
+    available_donors = db.Column(db.Integer, nullable=False, default=0)
+    patients = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<BloodGroupStat {self.blood_group}: {self.donors} donors, {self.patients} patients>'
+
+
 class Feedback(db.Model):
     """
     Feedback model for user feedback and contact messages.
@@ -145,6 +415,11 @@ class Feedback(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     resolved_at = db.Column(db.DateTime)
     
+    __table_args__ = (
+        db.Index('ix_feedback_is_resolved_created_at', 'is_resolved', 'created_at'),
+        db.Index('ix_feedback_created_at_id', 'created_at', 'id'),
+    )
+    
     def __repr__(self):
         return f'<Feedback from {self.name} - {self.subject}>'
 
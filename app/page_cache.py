@@ -0,0 +1,102 @@
+"""
+Full-page response cache for static informational pages.
+
+Rendered pages are stored in the shared cache (app.cache) per
+(endpoint, view args, auth state, locale, version) and served with a strong
+ETag, so repeat visitors get a ``304 Not Modified`` without the template
+being rendered again.
+
+Every deploy starts from a fresh cache because ``PAGE_CACHE_VERSION``
+(defaulting to the deployed commit) is part of the key.
+``flask clear-page-cache`` bumps a generation counter to drop all pages at
+runtime.
+"""
+import hashlib
+from functools import wraps
+
+from flask import current_app, make_response, request, session
+from flask_login import current_user
+
+from app.cache import cache
+
+
+GENERATION_KEY = 'page_cache:generation'
+
+
+def _auth_state():
+    # The navbar shows the user's role and email, so pages differ per user
+    if not current_user.is_authenticated:
+        return 'anon'
+    fingerprint = f'{current_user.id}:{current_user.role}:{current_user.email}'
+    return 'user:' + hashlib.sha1(fingerprint.encode()).hexdigest()[:16]
+
+
+def _locale():
+    locales = current_app.config['PAGE_CACHE_LOCALES']
+    return request.accept_languages.best_match(locales) or locales[0]
+
+
+def _cache_key():
+    generation = cache.get(GENERATION_KEY, 0)
+    view_args = ','.join(f'{k}={v}' for k, v in sorted((request.view_args or {}).items()))
+    return ':'.join([
+        'page',
+        current_app.config['PAGE_CACHE_VERSION'],
+        str(generation),
+        request.endpoint,
+        view_args,
+        _auth_state(),
+        _locale(),
+    ])
+
+
+def _conditional_response(body, mimetype, etag, authenticated):
+    response = make_response(body)
+    response.mimetype = mimetype
+    response.set_etag(etag)
+    # Browsers may keep the page but must revalidate it with the ETag
+    response.headers['Cache-Control'] = ('private' if authenticated else 'public') + ', no-cache'
+    response.vary.update(('Cookie', 'Accept-Language'))
+    return response.make_conditional(request)
+
+
+def cached_page(ttl=None):
+    """
+    Cache the rendered output of a GET view.
+
+    Only successful HTML responses are stored. Requests with pending flash
+    messages bypass the cache because the page would display (and consume)
+    them.
+
+    Args:
+        ttl: Lifetime in seconds (defaults to PAGE_CACHE_TTL)
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            config = current_app.config
+            if not config['PAGE_CACHE_ENABLED'] or request.method != 'GET' or session.get('_flashes'):
+                return view(*args, **kwargs)
+
+            key = _cache_key()
+            authenticated = current_user.is_authenticated
+            entry = cache.get(key)
+            if entry is not None:
+                return _conditional_response(entry['body'], entry['mimetype'], entry['etag'], authenticated)
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200 or response.direct_passthrough:
+                return response
+
+            body = response.get_data(as_text=True)
+            etag = hashlib.sha256(body.encode()).hexdigest()[:32]
+            cache.set(key, {'body': body, 'mimetype': response.mimetype, 'etag': etag},
+                      ttl if ttl is not None else config['PAGE_CACHE_TTL'])
+            return _conditional_response(body, response.mimetype, etag, authenticated)
+        return wrapper
+    return decorator
+
+
+def clear_page_cache():
+    """Invalidate every cached page by bumping the cache generation."""
+    cache.set(GENERATION_KEY, cache.get(GENERATION_KEY, 0) + 1, ttl=10 * 365 * 24 * 3600)
@@ -0,0 +1,268 @@
+"""
+Keyset (cursor) pagination for listing pages.
+
+Offset pagination issues a full COUNT(*) and a deep OFFSET for every page, so
+its cost grows with table size and page number. Keyset pagination seeks
+directly to the row after (or before) the last one shown, using the ordering
+columns as an opaque cursor.
+"""
+import base64
+import json
+from datetime import date, datetime
+
+from flask import current_app, request
+from sqlalchemy import Boolean, and_, false, func, or_
+
+from app import db
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    if isinstance(value, date):
+        return {'d': value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if 'dt' in value:
+            return datetime.fromisoformat(value['dt'])
+        if 'd' in value:
+            return date.fromisoformat(value['d'])
+    return value
+
+
+def _after(column, value, descending):
+    """
+    Condition for values that come after ``value`` in one ordering column.
+
+    Booleans only support equality comparisons, so False < True is spelled
+    out: the one value after False (ascending) is True, and nothing follows
+    True.
+    """
+    if isinstance(column.type, Boolean):
+        if value == descending:
+            return column == (not value)
+        return false()
+    return column < value if descending else column > value
+
+
+def encode_cursor(values, direction):
+    """
+    Encode ordering-column values into an opaque URL-safe cursor.
+
+    Args:
+        values: Ordering-column values of the boundary row
+        direction: 'next' or 'prev'
+
+    Returns:
+        str: Cursor token
+    """
+    payload = json.dumps({'k': [_encode_value(v) for v in values], 'd': direction[0]},
+                         separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """
+    Decode a cursor token.
+
+    Args:
+        token: Cursor produced by :func:`encode_cursor`
+
+    Returns:
+        tuple: (list of values, 'next' or 'prev'), or (None, None) if the token is invalid
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values = [_decode_value(v) for v in payload['k']]
+        direction = 'prev' if payload['d'] == 'p' else 'next'
+        return values, direction
+    except (ValueError, KeyError, TypeError):
+        return None, None
+
+
+class KeysetPagination:
+    """
+    Cursor-based pagination over an SQLAlchemy query.
+
+    ``order_by`` is a sequence of ``(column, descending)`` pairs and must end
+    with a unique column (normally the primary key) so that the ordering is
+    total. The query must not already be ordered.
+
+    Exposes ``items``, ``has_next``/``has_prev``, ``next_cursor``/``prev_cursor``
+    and an optional ``total``. ``count`` selects how the total is computed:
+    ``'exact'``, ``'capped'`` (at most ``count_cap``), ``'estimate'`` (PostgreSQL
+    planner estimate, capped elsewhere) or None to skip counting.
+    ``total_kind`` records which of these the total actually is.
+    """
+
+    is_keyset = True
+
+    def __init__(self, query, order_by, per_page, cursor=None, count='capped', count_cap=1000):
+        self.per_page = per_page
+        self.order_by = list(order_by)
+        self.count_cap = count_cap
+
+        values, direction = decode_cursor(cursor) if cursor else (None, None)
+        if values is not None and not self._valid_key(values):
+            values, direction = None, None  # Crafted or stale cursor: start from the first page
+        self.direction = direction or 'next'
+        backwards = self.direction == 'prev'
+
+        page_query = query
+        if values is not None:
+            page_query = page_query.filter(self._seek_condition(values, backwards))
+        page_query = page_query.order_by(*self._ordering(backwards))
+
+        rows = page_query.limit(per_page + 1).all()
+        has_more = len(rows) > per_page
+        rows = rows[:per_page]
+        if backwards:
+            rows.reverse()
+
+        self.items = rows
+        if backwards:
+            self.has_prev = has_more
+            self.has_next = True
+        else:
+            self.has_prev = values is not None
+            self.has_next = has_more
+
+        self.next_cursor = encode_cursor(self._row_key(rows[-1]), 'next') if rows and self.has_next else None
+        self.prev_cursor = encode_cursor(self._row_key(rows[0]), 'prev') if rows and self.has_prev else None
+
+        self.total = None
+        self.total_kind = None
+        if count:
+            self.total, self.total_kind = self._count(query, count)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def _ordering(self, backwards):
+        ordering = []
+        for column, descending in self.order_by:
+            descending = descending != backwards
+            ordering.append(column.desc() if descending else column.asc())
+        return ordering
+
+    def _valid_key(self, values):
+        """Check that cursor values match the ordering columns in number and type."""
+        if len(values) != len(self.order_by):
+            return False
+        for value, (column, _) in zip(values, self.order_by):
+            if value is None:
+                return False  # Only equality works with NULL
+            try:
+                python_type = column.type.python_type
+            except NotImplementedError:
+                continue
+            if python_type is float:
+                python_type = (int, float)
+            elif python_type is int or python_type is date:
+                # bool is an int and datetime a date, but neither is a valid key here
+                if isinstance(value, (bool, datetime)):
+                    return False
+            if not isinstance(value, python_type):
+                return False
+        return True
+
+    def _seek_condition(self, values, backwards):
+        """Build the lexicographic "row comes after the cursor" condition."""
+        clauses = []
+        for i, (column, descending) in enumerate(self.order_by):
+            descending = descending != backwards
+            equal_prefix = [col == values[j] for j, (col, _) in enumerate(self.order_by[:i])]
+            clauses.append(and_(*equal_prefix, _after(column, values[i], descending)))
+        return or_(*clauses)
+
+    def _row_key(self, row):
+        return [getattr(row, column.key) for column, _ in self.order_by]
+
+    def _count(self, query, mode):
+        """
+        Count matching rows.
+
+        Returns:
+            tuple: (total, 'exact', 'capped' or 'estimate')
+        """
+        query = query.order_by(None)
+
+        if mode == 'exact':
+            return query.count(), 'exact'
+
+        if mode == 'estimate' and db.engine.dialect.name == 'postgresql':
+            estimate = _planner_row_estimate(query)
+            if estimate is not None:
+                return estimate, 'estimate'
+
+        # Capped count: never scans more than count_cap + 1 rows
+        limited = query.limit(self.count_cap + 1).subquery()
+        total = db.session.query(func.count()).select_from(limited).scalar()
+        if total > self.count_cap:
+            return self.count_cap, 'capped'
+        return total, 'exact'
+
+
+def _planner_row_estimate(query):
+    """Return PostgreSQL's planner row estimate for a query (no execution)."""
+    try:
+        compiled = query.statement.compile(dialect=db.engine.dialect)
+        plan = db.session.connection().exec_driver_sql(
+            'EXPLAIN (FORMAT JSON) ' + compiled.string, compiled.params
+        ).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+    except Exception as e:
+        current_app.logger.warning(f"Row estimate failed, falling back to capped count: {e}")
+        return None
+
+
+def order_query(query, order_by):
+    """
+    Apply a listing order given as (column, descending) pairs.
+
+    Args:
+        query: Unordered SQLAlchemy query
+        order_by: Sequence of (column, descending) pairs
+
+    Returns:
+        Ordered query
+    """
+    return query.order_by(*[column.desc() if descending else column.asc() for column, descending in order_by])
+
+
+def paginate(query, order_by, per_page):
+    """
+    Paginate a listing query using the configured pagination mode.
+
+    Keyset pagination is used when ``PAGINATION_MODE`` is ``keyset`` or when
+    the request carries a ``cursor`` argument; otherwise classic page-number
+    pagination is used.
+
+    Args:
+        query: Unordered SQLAlchemy query
+        order_by: Sequence of (column, descending) pairs ending with a unique column
+        per_page: Number of items per page
+
+    Returns:
+        KeysetPagination or flask_sqlalchemy Pagination
+    """
+    cursor = request.args.get('cursor')
+    if cursor or current_app.config.get('PAGINATION_MODE') == 'keyset':
+        count = current_app.config.get('PAGINATION_COUNT', 'capped')
+        return KeysetPagination(
+            query,
+            order_by,
+            per_page,
+            cursor=cursor,
+            count=None if count == 'none' else count,
+            count_cap=current_app.config.get('PAGINATION_COUNT_CAP', 1000)
+        )
+
+    page = request.args.get('page', 1, type=int)
+    return order_query(query, order_by).paginate(page=page, per_page=per_page, error_out=False)
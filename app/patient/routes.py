@@ -1,13 +1,18 @@
 """
 Patient routes for registration, dashboard, and donor search.
 """
-from flask import render_template, redirect, url_for, flash, request
+from flask import render_template, redirect, url_for, flash, request, current_app
 from flask_login import login_required, current_user
 from datetime import datetime
 from app import db
 from app.patient import patient_bp
 from app.models import Patient, Donor, User, get_compatible_blood_groups
 from app.forms import PatientRegistrationForm, PatientProfileEditForm, SearchDonorForm
+from app.donor_index import donor_index, paginate_donor_ids
+from app.matching import rank_donor_ids, top_matching_donors
+from app.batch_matching import suggested_donors
+from app.utils import calculate_distance, invalidate_homepage_counters
+from app.replica import read_only
 from functools import wraps
 
 
@@ -51,6 +56,7 @@ def register():
             existing_patient.required_by_date = form.required_by_date.data
             existing_patient.medical_condition = form.medical_condition.data
             existing_patient.updated_at = datetime.utcnow()
+            existing_patient.update_coordinates()
             
             flash('Patient profile updated successfully!', 'success')
         else:
@@ -69,10 +75,13 @@ def register():
                 medical_condition=form.medical_condition.data,
                 is_fulfilled=False
             )
+            patient.update_coordinates()
             db.session.add(patient)
             flash('Patient profile created successfully!', 'success')
         
         db.session.commit()
+        if not existing_patient:
+            invalidate_homepage_counters()
         
         # Notify matching donors about patient need
         from app.utils import notify_matching_donors
@@ -106,15 +115,16 @@ def dashboard():
         flash('Please complete your patient profile first.', 'warning')
         return redirect(url_for('patient.register'))
     
-    # Get compatible blood groups
-    compatible_groups = get_compatible_blood_groups(patient.blood_group_required)
+    # Optionally hide donors still inside the 90-day donation interval
+    eligible_only = request.args.get('eligible', '').lower() in ('1', 'true', 'y')
     
-    # Find available donors with compatible blood groups in same city
-    matching_donors = Donor.query.filter(
-        Donor.blood_group.in_(compatible_groups),
-        Donor.is_available == True,
-        Donor.city.ilike(f'%{patient.city}%')
-    ).limit(10).all()
+    # Donors allocated by the last `flask match-all` run, falling back to the
+    # best available donors with compatible blood groups in same city
+    matching_donors = suggested_donors(
+        patient, current_app.config['SUGGESTIONS_MAX_AGE_HOURS'], eligible_only=eligible_only
+    )
+    if not matching_donors:
+        matching_donors = top_matching_donors(patient, k=10, eligible_only=eligible_only)
     
     # Calculate days remaining
     days_remaining = patient.days_remaining()
@@ -123,12 +133,14 @@ def dashboard():
         'patient/dashboard.html',
         patient=patient,
         matching_donors=matching_donors,
+        eligible_only=eligible_only,
         days_remaining=days_remaining,
         title='Patient Dashboard'
     )
 
 
 @patient_bp.route('/search', methods=['GET', 'POST'])
+@read_only
 @patient_required
 def search_donors():
     """Search for blood donors with filters."""
@@ -140,44 +152,66 @@ def search_donors():
     
     form = SearchDonorForm()
     
-    # Start with base query
-    query = Donor.query
-    
     # Get compatible blood groups for patient
     compatible_groups = get_compatible_blood_groups(patient.blood_group_required)
     
-    # Apply filters
+    distances = {}
+    eligible_only = False
+    
+    # Apply filters (matching is served from the in-memory donor index)
     if form.validate_on_submit() or request.method == 'GET':
         blood_group = request.args.get('blood_group') or (form.blood_group.data if form.blood_group.data else None)
         city = request.args.get('city') or (form.city.data if form.city.data else None)
         state = request.args.get('state') or (form.state.data if form.state.data else None)
+        radius_km = request.args.get('radius_km', type=int) or form.radius_km.data
         available_only = request.args.get('available_only', 'true').lower() == 'true'
+        eligible_only = request.args.get('eligible_only', '').lower() in ('y', 'true', '1') or form.eligible_only.data
         
-        if blood_group:
-            query = query.filter(Donor.blood_group == blood_group)
-        else:
-            # Show only compatible blood groups
-            query = query.filter(Donor.blood_group.in_(compatible_groups))
+        # Show only compatible blood groups unless a specific group is requested
+        blood_groups = [blood_group] if blood_group else compatible_groups
         
-        if city:
-            query = query.filter(Donor.city.ilike(f'%{city}%'))
+        if radius_km and not (1 <= radius_km <= 500):
+            flash('Radius must be between 1 and 500 km.', 'warning')
+            radius_km = None
         
-        if state:
-            query = query.filter(Donor.state.ilike(f'%{state}%'))
+        if radius_km and patient.latitude is None:
+            flash('Distance search is unavailable because your pincode location is unknown. '
+                  'Showing donors by city instead.', 'warning')
+            radius_km = None
         
-        if available_only:
-            query = query.filter(Donor.is_available == True)
+        if radius_km:
+            # Donors within N km of the patient's pincode, nearest first
+            donor_ids, distances = donor_index.within_radius(
+                patient.latitude,
+                patient.longitude,
+                radius_km,
+                blood_groups,
+                available_only=available_only,
+                eligible_only=eligible_only
+            )
+        else:
+            donor_ids = donor_index.match(
+                blood_groups,
+                city=city,
+                state=state,
+                available_only=available_only,
+                eligible_only=eligible_only
+            )
     else:
         # Default: show compatible blood groups in same city
-        query = query.filter(
-            Donor.blood_group.in_(compatible_groups),
-            Donor.city.ilike(f'%{patient.city}%')
-        )
+        donor_ids = donor_index.match(compatible_groups, city=patient.city, available_only=False)
     
-    # Pagination
+    # Pagination (only the current page is loaded from the database)
     page = request.args.get('page', 1, type=int)
     per_page = 10
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+    
+    if distances:
+        # Distance searches stay nearest-first
+        pagination = paginate_donor_ids(donor_ids, page=page, per_page=per_page)
+    else:
+        # Rank only as many donors as needed to fill pages 1..page
+        ranked_ids = rank_donor_ids(patient, donor_ids, k=max(page, 1) * per_page)
+        pagination = paginate_donor_ids(ranked_ids, page=page, per_page=per_page, total=len(donor_ids))
     donors = pagination.items
     
     return render_template(
@@ -187,11 +221,14 @@ def search_donors():
         pagination=pagination,
         patient=patient,
         compatible_groups=compatible_groups,
+        distances=distances,
+        eligible_only=eligible_only,
         title='Search Donors'
     )
 
 
 @patient_bp.route('/donor/<int:donor_id>')
+@read_only
 @patient_required
 def view_donor(donor_id):
     """View detailed donor information."""
@@ -207,11 +244,19 @@ def view_donor(donor_id):
     compatible_groups = get_compatible_blood_groups(patient.blood_group_required)
     is_compatible = donor.blood_group in compatible_groups
     
+    # Distance between patient and donor pincodes, when both are known
+    distance_km = None
+    if None not in (patient.latitude, patient.longitude, donor.latitude, donor.longitude):
+        distance_km = round(calculate_distance(
+            patient.latitude, patient.longitude, donor.latitude, donor.longitude
+        ), 1)
+    
     return render_template(
         'patient/view_donor.html',
         donor=donor,
         patient=patient,
         is_compatible=is_compatible,
+        distance_km=distance_km,
         now=datetime.now(),
         title=f'Donor - {donor.full_name}'
     )
@@ -264,6 +309,7 @@ def edit_profile():
         patient.medical_condition = form.medical_condition.data
         patient.is_fulfilled = form.is_fulfilled.data
         patient.updated_at = datetime.utcnow()
+        patient.update_coordinates()
         
         db.session.commit()
         flash('Profile updated successfully!', 'success')
@@ -0,0 +1,96 @@
+"""
+Read-replica routing.
+
+When ``DATABASE_REPLICA_URL`` is set, the replica is registered as the
+``replica`` bind and the session routes queries as follows:
+
+* Views decorated with :func:`read_only` send their reads to the replica,
+  but only for GET/HEAD requests.
+* Everything else uses the primary: other views, CLI commands, and every
+  flush.
+* Once a request has flushed, its later queries go to the primary, so a
+  request always reads its own writes.
+* After a request writes, the client is pinned to the primary for
+  ``REPLICA_STICKY_SECONDS`` (a timestamp in the Flask session). The page
+  it is redirected to then shows the change even if the replica lags
+  behind.
+"""
+import time
+from functools import wraps
+
+from flask import current_app, g, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+
+REPLICA_BIND = 'replica'
+STICKY_SESSION_KEY = '_primary_until'
+
+
+class RoutingSession(Session):
+    """Session that sends reads to the replica when the request allows it."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and not self._flushing
+            and self.info.get('use_replica')
+            and not self.info.get('wrote')
+        ):
+            engine = self._db.engines.get(REPLICA_BIND)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def read_only(view):
+    """
+    Mark a view as read-only so its queries may be served by the replica.
+
+    The mark survives other ``functools.wraps`` decorators, so the position
+    in the decorator stack does not matter.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        return view(*args, **kwargs)
+    wrapper.replica_read = True
+    return wrapper
+
+
+def init_replica(app):
+    """Register the request and session hooks when a replica is configured."""
+    from app import db
+
+    if not app.config.get('DATABASE_REPLICA_URL'):
+        return
+
+    if not event.contains(db.session, 'after_flush', _mark_written):
+        event.listen(db.session, 'after_flush', _mark_written)
+
+    app.before_request(_route_request)
+    app.after_request(_pin_to_primary)
+
+
+def _mark_written(db_session, flush_context):
+    db_session.info['wrote'] = True
+    if has_request_context():
+        g.replica_wrote = True
+
+
+def _route_request():
+    from app import db
+
+    view = current_app.view_functions.get(request.endpoint)
+    if (
+        view is not None
+        and getattr(view, 'replica_read', False)
+        and request.method in ('GET', 'HEAD')
+        and session.get(STICKY_SESSION_KEY, 0) < time.time()
+    ):
+        db.session.info['use_replica'] = True
+
+
+def _pin_to_primary(response):
+    if g.get('replica_wrote'):
+        session[STICKY_SESSION_KEY] = time.time() + current_app.config['REPLICA_STICKY_SECONDS']
+    return response
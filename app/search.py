@@ -0,0 +1,221 @@
+"""
+Indexed user search backing the admin ``name-``, ``email-`` and ``phone-`` prefixes.
+
+Every user has a denormalized search document (email, phones and donor/patient
+names) that is rewritten whenever the user or their donor/patient profile is
+committed. Substring lookups are served by an index instead of ``ilike`` scans
+over joined tables:
+
+* PostgreSQL: GIN ``pg_trgm`` indexes on the document columns.
+* SQLite: an FTS5 shadow table using the trigram tokenizer.
+* Anything else (or if the above are unavailable): plain LIKE on the documents.
+"""
+from flask import current_app
+from sqlalchemy import event, inspect, or_, text
+from sqlalchemy.sql import column, table
+
+from app import db
+
+
+DOCUMENT_COLUMNS = ['email', 'user_phone', 'donor_name', 'donor_phone', 'patient_name', 'patient_phone']
+
+# Search fields accepted by matching_user_ids() and the document columns they cover
+SEARCH_FIELDS = {
+    'email': ['email'],
+    'name': ['donor_name', 'patient_name'],
+    'phone': ['user_phone', 'donor_phone', 'patient_phone'],
+    'donor_name': ['donor_name'],
+    'donor_phone': ['donor_phone'],
+    'patient_name': ['patient_name'],
+    'patient_phone': ['patient_phone'],
+}
+
+# Model attributes that feed the search document
+TRACKED_ATTRIBUTES = {
+    'User': ('email', 'phone'),
+    'Donor': ('full_name', 'phone', 'user_id'),
+    'Patient': ('full_name', 'phone', 'user_id'),
+}
+
+FTS_TABLE = 'user_search_fts'
+fts_table = table(FTS_TABLE, column('rowid'), *[column(name) for name in DOCUMENT_COLUMNS])
+
+
+def init_search(app):
+    """
+    Set up the search backend for the application's database.
+
+    Registers the session hooks that keep documents in sync, creates the
+    dialect-specific index structures and builds the documents if the table
+    is empty.
+    """
+    from app.models import UserSearchDocument, User
+
+    if not event.contains(db.session, 'after_flush', _collect_changed_users):
+        event.listen(db.session, 'after_flush', _collect_changed_users)
+        event.listen(db.session, 'before_commit', _sync_changed_users)
+        event.listen(db.session, 'after_rollback', _discard_changed_users)
+
+    backend = 'like'
+    with app.app_context():
+        dialect = db.engine.dialect.name
+        try:
+            if dialect == 'postgresql':
+                with db.engine.begin() as conn:
+                    conn.execute(text('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+                    for name in DOCUMENT_COLUMNS:
+                        conn.execute(text(
+                            f'CREATE INDEX IF NOT EXISTS ix_user_search_{name}_trgm '
+                            f'ON user_search_documents USING gin ({name} gin_trgm_ops)'
+                        ))
+                backend = 'trgm'
+            elif dialect == 'sqlite':
+                with db.engine.begin() as conn:
+                    conn.execute(text(
+                        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+                        f"USING fts5({', '.join(DOCUMENT_COLUMNS)}, tokenize='trigram')"
+                    ))
+                backend = 'fts5'
+        except Exception as e:
+            app.logger.warning(f"Search index unavailable, falling back to LIKE scans: {e}")
+
+        app.extensions['user_search'] = backend
+
+        try:
+            if UserSearchDocument.query.first() is None and User.query.first() is not None:
+                rebuild_search_index()
+        except Exception as e:
+            db.session.rollback()
+            app.logger.warning(f"Could not build search documents on startup: {e}")
+
+
+def _backend():
+    return current_app.extensions.get('user_search', 'like')
+
+
+def _attribute_changed(obj, names):
+    state = inspect(obj)
+    return any(state.attrs[name].history.has_changes() for name in names)
+
+
+def _collect_changed_users(session, flush_context):
+    """Record the users whose search document is affected by this flush."""
+    changed = session.info.setdefault('search_changed_users', set())
+
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        model_name = type(obj).__name__
+        names = TRACKED_ATTRIBUTES.get(model_name)
+        if names is None:
+            continue
+        if obj in session.dirty and not _attribute_changed(obj, names):
+            continue
+        if model_name == 'User':
+            changed.add(obj.id)
+        else:
+            changed.add(obj.user_id)
+            # A profile moved to another user also changes the previous owner's document
+            changed.update(inspect(obj).attrs.user_id.history.deleted)
+    changed.discard(None)
+
+
+def _sync_changed_users(session):
+    """Rewrite the search documents of users changed in this transaction."""
+    session.flush()
+    user_ids = session.info.pop('search_changed_users', None)
+    if user_ids:
+        write_documents(session, user_ids)
+
+
+def _discard_changed_users(session):
+    session.info.pop('search_changed_users', None)
+
+
+def _document_rows(session, user_ids=None):
+    from app.models import User, Donor, Patient
+
+    query = session.query(
+        User.id, User.email, User.phone,
+        Donor.full_name, Donor.phone,
+        Patient.full_name, Patient.phone
+    ).outerjoin(Donor, Donor.user_id == User.id).outerjoin(Patient, Patient.user_id == User.id)
+    if user_ids is not None:
+        query = query.filter(User.id.in_(user_ids))
+
+    for row in query.yield_per(1000):
+        yield dict(zip(['user_id'] + DOCUMENT_COLUMNS, row))
+
+
+def write_documents(session, user_ids=None):
+    """
+    Rewrite search documents.
+
+    Args:
+        session: SQLAlchemy session to write with
+        user_ids: IDs of the users to rewrite, or None for all users
+    """
+    from app.models import UserSearchDocument
+
+    documents = UserSearchDocument.__table__
+    use_fts = _backend() == 'fts5'
+
+    if user_ids is None:
+        session.execute(documents.delete())
+        if use_fts:
+            session.execute(fts_table.delete())
+    else:
+        user_ids = list(user_ids)
+        session.execute(documents.delete().where(documents.c.user_id.in_(user_ids)))
+        if use_fts:
+            session.execute(fts_table.delete().where(fts_table.c.rowid.in_(user_ids)))
+
+    batch = []
+    for row in _document_rows(session, user_ids):
+        batch.append(row)
+        if len(batch) >= 1000:
+            _insert_documents(session, batch, use_fts)
+            batch = []
+    if batch:
+        _insert_documents(session, batch, use_fts)
+
+
+def _insert_documents(session, rows, use_fts):
+    from app.models import UserSearchDocument
+
+    session.execute(UserSearchDocument.__table__.insert(), rows)
+    if use_fts:
+        session.execute(
+            fts_table.insert(),
+            [dict({name: row[name] for name in DOCUMENT_COLUMNS}, rowid=row['user_id']) for row in rows]
+        )
+
+
+def rebuild_search_index():
+    """Rebuild every user's search document from scratch."""
+    write_documents(db.session)
+    db.session.commit()
+
+
+def matching_user_ids(field, value):
+    """
+    Build a subquery of user IDs whose search document contains ``value``.
+
+    Args:
+        field: One of SEARCH_FIELDS ('email', 'name', 'phone', 'donor_name', ...)
+        value: Substring to search for (case-insensitive)
+
+    Returns:
+        Select: Subquery suitable for ``Column.in_()``
+    """
+    from app.models import UserSearchDocument
+
+    pattern = f'%{value}%'
+
+    if _backend() == 'fts5':
+        # SQLite LIKE is case-insensitive and FTS5 trigram serves it from the index
+        return db.select(fts_table.c.rowid).where(
+            or_(*[fts_table.c[name].like(pattern) for name in SEARCH_FIELDS[field]])
+        )
+
+    return db.select(UserSearchDocument.user_id).where(
+        or_(*[getattr(UserSearchDocument, name).ilike(pattern) for name in SEARCH_FIELDS[field]])
+    )
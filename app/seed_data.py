@@ -0,0 +1,260 @@
+"""
+Synthetic data for load testing (`flask seed-data`).
+
+Generates donors, patients and feedback with a weighted distribution of
+cities and blood groups. Rows go through the bulk importer, so derived
+columns, search documents and statistics are filled exactly as for a real
+import. Pincode coordinates are created for every generated pincode, so
+radius searches have data to work on.
+
+Generated accounts have no usable password and use ``@seed.example``
+emails numbered from 1. Running the command again with larger counts only
+adds the missing rows. ``seed_login_accounts`` creates one admin, one donor
+and one patient that can log in (used by ``flask benchmark``). Because that
+includes an admin, ``flask seed-data`` refuses to run against production
+unless told to, and gives the accounts a random password by default.
+"""
+import json
+import random
+from datetime import date, datetime, timedelta
+
+from app import db
+from app.bulk_import import BulkImporter
+from app.models import User, Donor, Patient, Feedback, Pincode, URGENCY_LEVELS
+
+
+SEED_EMAIL_DOMAIN = 'seed.example'
+
+# (city, state, first pincode, latitude, longitude, weight)
+DEFAULT_CITIES = [
+    ('Mumbai', 'Maharashtra', 400001, 19.076, 72.877, 14),
+    ('Delhi', 'Delhi', 110001, 28.614, 77.209, 14),
+    ('Bengaluru', 'Karnataka', 560001, 12.972, 77.595, 11),
+    ('Hyderabad', 'Telangana', 500001, 17.385, 78.487, 10),
+    ('Chennai', 'Tamil Nadu', 600001, 13.083, 80.270, 9),
+    ('Kolkata', 'West Bengal', 700001, 22.573, 88.364, 9),
+    ('Pune', 'Maharashtra', 411001, 18.520, 73.857, 7),
+    ('Ahmedabad', 'Gujarat', 380001, 23.023, 72.571, 7),
+    ('Jaipur', 'Rajasthan', 302001, 26.912, 75.787, 5),
+    ('Lucknow', 'Uttar Pradesh', 226001, 26.847, 80.947, 5),
+    ('Warangal', 'Telangana', 506001, 17.968, 79.594, 3),
+    ('Nagpur', 'Maharashtra', 440001, 21.146, 79.088, 3),
+    ('Kochi', 'Kerala', 682001, 9.931, 76.267, 3),
+]
+
+# Approximate share of each blood group in the Indian population (%)
+DEFAULT_BLOOD_GROUPS = {
+    'O+': 36, 'B+': 32, 'A+': 22, 'AB+': 7, 'O-': 1, 'B-': 1, 'A-': 0.6, 'AB-': 0.4,
+}
+
+# Pincodes generated per city; each gets coordinates a few km from the centre
+PINCODES_PER_CITY = 20
+
+FIRST_NAMES = [
+    'Aarav', 'Aditi', 'Akash', 'Ananya', 'Arjun', 'Deepa', 'Divya', 'Farhan', 'Gaurav', 'Harini',
+    'Ishaan', 'Kavya', 'Kiran', 'Lakshmi', 'Manoj', 'Meera', 'Nikhil', 'Pooja', 'Rahul', 'Ravi',
+    'Sana', 'Sneha', 'Suresh', 'Tanvi', 'Varun', 'Vikram', 'Yash', 'Zoya',
+]
+LAST_NAMES = [
+    'Agarwal', 'Banerjee', 'Das', 'Gupta', 'Iyer', 'Khan', 'Kumar', 'Menon', 'Nair', 'Patel',
+    'Rao', 'Reddy', 'Shah', 'Sharma', 'Singh', 'Verma',
+]
+HOSPITALS = [
+    'City General Hospital', 'Apollo Hospital', 'Government Medical College', 'KIMS',
+    'Care Hospital', 'Fortis Hospital', 'Manipal Hospital', 'District Hospital',
+]
+FEEDBACK_SUBJECTS = [
+    'Could not find donors nearby', 'Great service', 'Profile update problem',
+    'Request for a new city', 'Donor did not respond', 'Thank you',
+]
+
+
+def load_distribution(path):
+    """
+    Read a custom city/blood group distribution from a JSON file.
+
+    The file may set ``cities`` (a list of objects with city, state,
+    pincode, latitude, longitude and weight) and ``blood_groups`` (group ->
+    weight). A key that is left out keeps its default.
+
+    Returns:
+        tuple: (cities, blood_groups) in the format of the defaults
+    """
+    with open(path) as f:
+        distribution = json.load(f)
+    cities = [
+        (c['city'], c['state'], int(c['pincode']), float(c['latitude']), float(c['longitude']),
+         float(c.get('weight', 1)))
+        for c in distribution.get('cities', [])
+    ] or DEFAULT_CITIES
+    return cities, distribution.get('blood_groups') or DEFAULT_BLOOD_GROUPS
+
+
+class SeedGenerator:
+    """Random but reproducible (for a given seed) rows of each kind."""
+
+    def __init__(self, cities=None, blood_groups=None, seed=None):
+        self.random = random.Random(seed)
+        self.cities = cities or DEFAULT_CITIES
+        self.city_weights = [city[-1] for city in self.cities]
+        blood_groups = blood_groups or DEFAULT_BLOOD_GROUPS
+        self.blood_groups = list(blood_groups)
+        self.blood_group_weights = list(blood_groups.values())
+        self.today = date.today()
+
+    def pincodes(self):
+        """Get Pincode rows for every generated pincode."""
+        rows = []
+        for city, state, first_pincode, latitude, longitude, _ in self.cities:
+            for offset in range(PINCODES_PER_CITY):
+                rows.append({
+                    'pincode': str(first_pincode + offset),
+                    'latitude': latitude + self.random.uniform(-0.08, 0.08),
+                    'longitude': longitude + self.random.uniform(-0.08, 0.08),
+                    'city': city,
+                    'state': state,
+                })
+        return rows
+
+    def _person(self, email):
+        r = self.random
+        city, state, first_pincode, _, _, _ = r.choices(self.cities, self.city_weights)[0]
+        return {
+            'email': email,
+            'password': None,
+            'full_name': f'{r.choice(FIRST_NAMES)} {r.choice(LAST_NAMES)}',
+            'phone': f'9{r.randrange(10 ** 9):09d}',
+            'city': city,
+            'state': state,
+            'pincode': str(first_pincode + r.randrange(PINCODES_PER_CITY)),
+            'created_at': datetime.utcnow() - timedelta(days=r.expovariate(1 / 120), seconds=r.randrange(86400)),
+        }
+
+    def donor(self, n):
+        r = self.random
+        row = self._person(f'donor{n}@{SEED_EMAIL_DOMAIN}')
+        donated = r.random() < 0.6
+        row.update({
+            'blood_group': r.choices(self.blood_groups, self.blood_group_weights)[0],
+            'date_of_birth': self.today - timedelta(days=r.randrange(18 * 365 + 5, 64 * 365)),
+            'gender': r.choices(['Male', 'Female', 'Other'], [55, 44, 1])[0],
+            'last_donation_date': self.today - timedelta(days=r.randrange(1, 720)) if donated else None,
+            'medical_history': None,
+            'is_available': r.random() < 0.75,
+        })
+        return row
+
+    def patient(self, n):
+        r = self.random
+        row = self._person(f'patient{n}@{SEED_EMAIL_DOMAIN}')
+        row.update({
+            'blood_group_required': r.choices(self.blood_groups, self.blood_group_weights)[0],
+            'hospital_name': r.choice(HOSPITALS),
+            'urgency_level': URGENCY_LEVELS[r.choices([1, 2, 3], [15, 35, 50])[0]],
+            'required_by_date': self.today + timedelta(days=r.randrange(-10, 30)),
+            'medical_condition': None,
+        })
+        return row
+
+    def feedback(self, n):
+        r = self.random
+        resolved = r.random() < 0.7
+        created_at = datetime.utcnow() - timedelta(days=r.expovariate(1 / 60))
+        return {
+            'name': f'{r.choice(FIRST_NAMES)} {r.choice(LAST_NAMES)}',
+            'email': f'feedback{n}@{SEED_EMAIL_DOMAIN}',
+            'subject': r.choice(FEEDBACK_SUBJECTS),
+            'message': 'Generated feedback message for load testing.',
+            'rating': r.randint(1, 5),
+            'is_resolved': resolved,
+            'admin_response': 'Thanks, we have looked into it.' if resolved else None,
+            'created_at': created_at,
+            'resolved_at': created_at + timedelta(hours=r.randrange(1, 72)) if resolved else None,
+        }
+
+
+def seed_data(donors=0, patients=0, feedback=0, cities=None, blood_groups=None, seed=None,
+              batch_size=5000, progress=None):
+    """
+    Generate synthetic donors, patients and feedback.
+
+    Args:
+        donors: Number of seeded donors to have in total
+        patients: Number of seeded patients to have in total
+        feedback: Number of feedback entries to add
+        cities: Weighted cities (see DEFAULT_CITIES)
+        blood_groups: Blood group weights (see DEFAULT_BLOOD_GROUPS)
+        seed: Random seed for reproducible data
+        batch_size: Rows inserted per transaction
+        progress: Optional callable receiving (kind, rows done, rows total)
+
+    Returns:
+        dict: Rows created per kind
+    """
+    generator = SeedGenerator(cities, blood_groups, seed)
+
+    existing = {pincode for (pincode,) in db.session.query(Pincode.pincode)}
+    pincodes = [row for row in generator.pincodes() if row['pincode'] not in existing]
+    if pincodes:
+        db.session.execute(db.insert(Pincode), pincodes)
+        db.session.commit()
+
+    created = {}
+    for kind, total, make_row in (('donors', donors, generator.donor), ('patients', patients, generator.patient)):
+        importer = BulkImporter(kind, batch_size=batch_size)
+        for start in range(1, total + 1, batch_size):
+            stop = min(start + batch_size, total + 1)
+            importer.insert_batch([make_row(n) for n in range(start, stop)])
+            if progress:
+                progress(kind, stop - 1, total)
+        importer.finish()
+        created[kind] = importer.summary['created']
+
+    created['feedback'] = 0
+    for start in range(0, feedback, batch_size):
+        rows = [generator.feedback(n) for n in range(start, min(start + batch_size, feedback))]
+        db.session.execute(db.insert(Feedback), rows)
+        db.session.commit()
+        created['feedback'] += len(rows)
+        if progress:
+            progress('feedback', created['feedback'], feedback)
+
+    return created
+
+
+def seed_login_accounts(password):
+    """
+    Create (or reset) the admin, donor and patient accounts used by benchmarks.
+
+    Args:
+        password: Password for the three accounts
+
+    Returns:
+        dict: Role -> email
+    """
+    generator = SeedGenerator(seed=0)
+    accounts = {role: f'{role}@{SEED_EMAIL_DOMAIN}' for role in ('admin', 'donor', 'patient')}
+
+    for role, email in accounts.items():
+        user = User.query.filter_by(email=email).first()
+        if user is None:
+            user = User(email=email, role=role, is_verified=True, is_active=True)
+            db.session.add(user)
+        user.set_password(password)
+        user.is_blocked = False
+
+        if role == 'donor' and user.donor is None:
+            row = generator.donor(0)
+            user.donor = Donor(**{key: row[key] for key in (
+                'full_name', 'phone', 'blood_group', 'date_of_birth', 'gender', 'city', 'state',
+                'pincode', 'last_donation_date', 'is_available')})
+            user.donor.update_coordinates()
+        elif role == 'patient' and user.patient is None:
+            row = generator.patient(0)
+            user.patient = Patient(**{key: row[key] for key in (
+                'full_name', 'phone', 'blood_group_required', 'hospital_name', 'city', 'state',
+                'pincode', 'urgency_level', 'required_by_date')})
+            user.patient.update_coordinates()
+
+    db.session.commit()
+    return accounts
@@ -0,0 +1,184 @@
+"""
+Incrementally maintained blood group statistics.
+
+The blood_group_stats table holds one row per blood group with the number
+of donors, available donors and patient requests. Instead of counting and
+grouping the donors/patients tables on every dashboard view, each flush
+computes how the flushed Donor/Patient rows change these counts and applies
+the deltas in the same transaction with ``SET n = n + delta`` updates.
+
+Bulk statements that bypass the ORM (``Query.delete()``, Core inserts) are
+not seen by the flush hook; run ``flask repair-stats`` after them.
+"""
+from collections import Counter, defaultdict
+
+from flask import current_app
+from sqlalchemy import event, func, inspect
+
+from app import db
+
+
+STAT_COLUMNS = ('donors', 'available_donors', 'patients')
+
+# Model attributes that affect the statistics
+TRACKED_ATTRIBUTES = {
+    'Donor': ('blood_group', 'is_available'),
+    'Patient': ('blood_group_required',),
+}
+
+
+def init_stats(app):
+    """
+    Register the flush hook and build the statistics table if it is empty.
+    """
+    from app.models import BloodGroupStat, Donor, Patient
+
+    if not event.contains(db.session, 'after_flush', _apply_flush_deltas):
+        event.listen(db.session, 'after_flush', _apply_flush_deltas)
+
+    with app.app_context():
+        try:
+            if BloodGroupStat.query.first() is None and (
+                Donor.query.first() is not None or Patient.query.first() is not None
+            ):
+                repair_blood_group_stats()
+        except Exception as e:
+            db.session.rollback()
+            app.logger.warning(f"Could not build blood group statistics on startup: {e}")
+
+
+def _values(obj, names, old):
+    """Get attribute values before (``old``) or after the flush."""
+    state = inspect(obj)
+    values = []
+    for name in names:
+        history = state.attrs[name].history
+        if old and history.deleted:
+            values.append(history.deleted[0])
+        elif not old and history.added:
+            values.append(history.added[0])
+        else:
+            values.append(state.dict.get(name))
+    return values
+
+
+def _contribution(model_name, values):
+    """Get the (blood_group, column) counters a row with these values adds to."""
+    if model_name == 'Donor':
+        blood_group, is_available = values
+        counters = [(blood_group, 'donors')]
+        if is_available:
+            counters.append((blood_group, 'available_donors'))
+        return counters
+    return [(values[0], 'patients')]
+
+
+def _apply_flush_deltas(session, flush_context):
+    """Apply the statistics changes caused by this flush."""
+    deltas = defaultdict(Counter)
+
+    def add(model_name, values, sign):
+        for blood_group, column in _contribution(model_name, values):
+            if blood_group:
+                deltas[blood_group][column] += sign
+
+    for obj in session.new:
+        names = TRACKED_ATTRIBUTES.get(type(obj).__name__)
+        if names:
+            add(type(obj).__name__, _values(obj, names, old=False), 1)
+
+    for obj in session.deleted:
+        names = TRACKED_ATTRIBUTES.get(type(obj).__name__)
+        if names:
+            add(type(obj).__name__, _values(obj, names, old=True), -1)
+
+    for obj in session.dirty:
+        names = TRACKED_ATTRIBUTES.get(type(obj).__name__)
+        if not names or obj in session.new or obj in session.deleted:
+            continue
+        state = inspect(obj)
+        if not any(state.attrs[name].history.has_changes() for name in names):
+            continue
+        add(type(obj).__name__, _values(obj, names, old=True), -1)
+        add(type(obj).__name__, _values(obj, names, old=False), 1)
+
+    if deltas:
+        _write_deltas(session.connection(), deltas)
+
+
+def _write_deltas(connection, deltas):
+    from app.models import BloodGroupStat
+
+    stats = BloodGroupStat.__table__
+    for blood_group, changes in deltas.items():
+        changes = {column: delta for column, delta in changes.items() if delta}
+        if not changes:
+            continue
+        result = connection.execute(
+            stats.update()
+            .where(stats.c.blood_group == blood_group)
+            .values({column: stats.c[column] + delta for column, delta in changes.items()})
+        )
+        if result.rowcount == 0:
+            row = dict.fromkeys(STAT_COLUMNS, 0)
+            row.update(changes)
+            connection.execute(stats.insert().values(blood_group=blood_group, **row))
+
+
+def compute_blood_group_stats():
+    """
+    Count the statistics directly from the donors and patients tables.
+
+    Returns:
+        dict: blood group -> dict of STAT_COLUMNS counts
+    """
+    from app.models import Donor, Patient
+
+    counts = defaultdict(lambda: dict.fromkeys(STAT_COLUMNS, 0))
+    for blood_group, donors, available in db.session.query(
+        Donor.blood_group,
+        func.count(Donor.id),
+        func.count(Donor.id).filter(Donor.is_available == True)
+    ).group_by(Donor.blood_group):
+        counts[blood_group]['donors'] = donors
+        counts[blood_group]['available_donors'] = available
+
+    for blood_group, patients in db.session.query(
+        Patient.blood_group_required, func.count(Patient.id)
+    ).group_by(Patient.blood_group_required):
+        counts[blood_group]['patients'] = patients
+
+    return dict(counts)
+
+
+def repair_blood_group_stats():
+    """
+    Recount the statistics table from scratch.
+
+    Returns:
+        list: Blood groups whose stored counts were wrong
+    """
+    from app.models import BloodGroupStat
+
+    actual = compute_blood_group_stats()
+    stored = {
+        row.blood_group: {column: getattr(row, column) for column in STAT_COLUMNS}
+        for row in BloodGroupStat.query.all()
+    }
+    drifted = sorted(
+        blood_group for blood_group in set(actual) | set(stored)
+        if actual.get(blood_group, dict.fromkeys(STAT_COLUMNS, 0))
+        != stored.get(blood_group, dict.fromkeys(STAT_COLUMNS, 0))
+    )
+
+    stats = BloodGroupStat.__table__
+    db.session.execute(stats.delete())
+    if actual:
+        db.session.execute(stats.insert(), [
+            dict(counts, blood_group=blood_group) for blood_group, counts in actual.items()
+        ])
+    db.session.commit()
+
+    if drifted:
+        current_app.logger.info(f"Repaired blood group statistics for {', '.join(drifted)}")
+    return drifted
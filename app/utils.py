@@ -28,6 +28,51 @@ def format_phone_number(phone):
     return '+' + digits
 
 
+def normalize_location(value):
+    """
+    Normalize a city or state name for equality matching.
+    
+    Args:
+        value: City or state name as entered by the user
+    
+    Returns:
+        str: Lower-cased name with surrounding and repeated whitespace removed
+    """
+    if not value:
+        return ''
+    return ' '.join(value.split()).casefold()
+
+
+def backfill_location_keys(batch_size=1000):
+    """
+    Recompute the normalized city/state keys of every donor and patient.
+    
+    Args:
+        batch_size: Number of rows updated per statement
+    
+    Returns:
+        tuple: (donors updated, patients updated)
+    """
+    from app.models import Donor, Patient
+    
+    counts = []
+    for model in (Donor, Patient):
+        updates = []
+        rows = db.session.query(model.id, model.city, model.state, model.city_key, model.state_key).all()
+        for row in rows:
+            city_key = normalize_location(row.city)
+            state_key = normalize_location(row.state)
+            if (city_key, state_key) != (row.city_key, row.state_key):
+                updates.append({'id': row.id, 'city_key': city_key, 'state_key': state_key})
+        
+        for start in range(0, len(updates), batch_size):
+            db.session.bulk_update_mappings(model, updates[start:start + batch_size])
+        counts.append(len(updates))
+    db.session.commit()
+    
+    return tuple(counts)
+
+
 def calculate_distance(lat1, lon1, lat2, lon2):
     """
     Calculate distance between two coordinates using Haversine formula.
@@ -39,56 +84,74 @@ def calculate_distance(lat1, lon1, lat2, lon2):
     Returns:
         float: Distance in kilometers
     """
-    from math import radians, sin, cos, sqrt, atan2
-    
-    R = 6371  # Earth's radius in kilometers
-    
-    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
+    from app.geo import haversine_km
     
-    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-    c = 2 * atan2(sqrt(a), sqrt(1-a))
-    
-    return R * c
+    return float(haversine_km(lat1, lon1, [lat2], [lon2])[0])
 
 
-def get_blood_group_statistics():
+def get_blood_group_statistics(eligible_donors=None):
     """
     Get statistics about blood groups in the system.
     
+    Counts come from the incrementally maintained blood_group_stats table
+    (see app.stats), so the cost does not grow with the number of donors.
+    
+    Args:
+        eligible_donors: Already counted eligible donors (counted here if None)
+    
     Returns:
         dict: Statistics including total donors, patients, and blood group distribution
     """
-    from app.models import Donor, Patient
-    from sqlalchemy import func
+    from app.models import BloodGroupStat, Donor
     
-    # Total counts
-    total_donors = Donor.query.count()
-    total_patients = Patient.query.count()
-    available_donors = Donor.query.filter_by(is_available=True).count()
+    rows = BloodGroupStat.query.all()
     
-    # Blood group distribution for donors
-    donor_distribution = db.session.query(
-        Donor.blood_group,
-        func.count(Donor.id)
-    ).group_by(Donor.blood_group).all()
-    
-    # Blood group requests from patients
-    patient_requests = db.session.query(
-        Patient.blood_group_required,
-        func.count(Patient.id)
-    ).group_by(Patient.blood_group_required).all()
+    # Eligibility depends on today's date, so it is counted (via the index) rather than stored
+    if eligible_donors is None:
+        eligible_donors = Donor.query.filter(Donor.is_available == True, Donor.eligible_on()).count()
     
     return {
-        'total_donors': total_donors,
-        'total_patients': total_patients,
-        'available_donors': available_donors,
-        'donor_distribution': dict(donor_distribution),
-        'patient_requests': dict(patient_requests)
+        'total_donors': sum(row.donors for row in rows),
+        'total_patients': sum(row.patients for row in rows),
+        'available_donors': sum(row.available_donors for row in rows),
+        'eligible_donors': eligible_donors,
+        'donor_distribution': {row.blood_group: row.donors for row in rows if row.donors},
+        'patient_requests': {row.blood_group: row.patients for row in rows if row.patients}
     }
 
 
+HOMEPAGE_COUNTERS_KEY = 'homepage_counters'
+
+
+def get_homepage_counters():
+    """
+    Get the donor/patient counters shown on the homepage.
+    
+    Served from the shared cache; the database is only counted on a miss
+    (expired TTL or after an explicit invalidation).
+    
+    Returns:
+        dict: total_donors, available_donors and total_patients
+    """
+    from app.cache import cache
+    from app.models import Donor, Patient
+    
+    def compute():
+        return {
+            'total_donors': Donor.query.count(),
+            'available_donors': Donor.query.filter_by(is_available=True).count(),
+            'total_patients': Patient.query.count(),
+        }
+    
+    return cache.get_or_set(HOMEPAGE_COUNTERS_KEY, compute, current_app.config['HOMEPAGE_COUNTERS_TTL'])
+
+
+def invalidate_homepage_counters():
+    """Drop the cached homepage counters after donors or patients change."""
+    from app.cache import cache
+    cache.delete(HOMEPAGE_COUNTERS_KEY)
+
+
 def notify_matching_donors(patient):
     """
     Stub function for notifying matching donors.
@@ -8,8 +8,19 @@ pip install -r requirements.txt
 
 echo "Running database migration..."
 python migrate_phone_fields.py
+python migrate_location_fields.py
+python migrate_eligibility_fields.py
+python migrate_location_keys.py
+python migrate_urgency_rank.py
+python migrate_indexes.py
 
 echo "Initializing database..."
 python init_admin.py
 
+echo "Building static assets..."
+flask --app run.py build-assets
+
+echo "Precompiling templates..."
+flask --app run.py precompile-templates
+
 echo "Build completed successfully!"
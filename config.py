@@ -9,6 +9,37 @@ from dotenv import load_dotenv
 load_dotenv()
 
 
+def pool_options(worker_class, workers, threads, max_connections, reserved=5):
+    """
+    Derive per-worker connection pool sizes from the web server model.
+    
+    Every worker process owns a pool, so the connections left after the
+    reserved ones are split evenly between workers. A sync worker handles
+    one request at a time and needs a single connection. A gthread worker
+    needs one per thread. A gevent worker can run many requests at once, so
+    it gets a share of the budget as overflow.
+    
+    Args:
+        worker_class (str): Gunicorn worker class: sync, gthread or gevent
+        workers (int): Number of worker processes
+        threads (int): Threads per worker (gthread)
+        max_connections (int): Connections the database server accepts
+        reserved (int): Connections kept free for migrations, shells and cron jobs
+    
+    Returns:
+        dict: pool_size and max_overflow for each worker's pool
+    """
+    budget = max(1, (max_connections - reserved) // max(1, workers))
+    if worker_class == 'sync':
+        return {'pool_size': 1, 'max_overflow': 0}
+    if worker_class == 'gevent':
+        pool_size = max(1, min(10, budget // 2))
+        return {'pool_size': pool_size, 'max_overflow': max(0, budget - pool_size)}
+    # gthread: one connection per thread, overflow for streamed responses
+    pool_size = max(1, min(threads, budget))
+    return {'pool_size': pool_size, 'max_overflow': max(0, min(threads, budget - pool_size))}
+
+
 class Config:
     """Base configuration class with default settings."""
     
@@ -22,9 +53,32 @@ class Config:
         database_url = database_url.replace('postgres://', 'postgresql://', 1)
     
     SQLALCHEMY_DATABASE_URI = database_url or 'sqlite:///blood_donation.db'
+    
+    # Optional read replica for read-only views (see app.replica)
+    replica_url = os.environ.get('DATABASE_REPLICA_URL')
+    if replica_url and replica_url.startswith('postgres://'):
+        replica_url = replica_url.replace('postgres://', 'postgresql://', 1)
+    DATABASE_REPLICA_URL = replica_url
+    SQLALCHEMY_BINDS = {'replica': replica_url} if replica_url else {}
+    REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 15))  # Read-your-writes window
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    
+    # Connection pool presets follow the gunicorn worker model (keep in sync with render.yaml)
+    WEB_WORKER_CLASS = os.environ.get('WEB_WORKER_CLASS', 'gthread')  # sync, gthread or gevent
+    WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', 1))  # Worker processes
+    WEB_THREADS = int(os.environ.get('WEB_THREADS', 2))  # Threads per worker (gthread)
+    DB_MAX_CONNECTIONS = int(os.environ.get('DB_MAX_CONNECTIONS', 100))  # Server max_connections
+    DB_RESERVED_CONNECTIONS = int(os.environ.get('DB_RESERVED_CONNECTIONS', 5))  # Migrations, shells, cron
+    pool_preset = pool_options(WEB_WORKER_CLASS, WEB_CONCURRENCY, WEB_THREADS,
+                               DB_MAX_CONNECTIONS, DB_RESERVED_CONNECTIONS)
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE') or pool_preset['pool_size'])
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW') or pool_preset['max_overflow'])
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 10))  # Seconds to wait for a free connection
+    DB_POOL_SLOW_CHECKOUT_MS = int(os.environ.get('DB_POOL_SLOW_CHECKOUT_MS', 100))  # Log slower checkouts
     SQLALCHEMY_ENGINE_OPTIONS = {
-        'pool_size': 10,
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'pool_timeout': DB_POOL_TIMEOUT,
         'pool_recycle': 3600,
         'pool_pre_ping': True,
     }
@@ -37,6 +91,46 @@ class Config:
     
     # Pagination
     ITEMS_PER_PAGE = int(os.environ.get('ITEMS_PER_PAGE', 10))
+    PAGINATION_MODE = os.environ.get('PAGINATION_MODE', 'offset')  # offset or keyset (cursor)
+    PAGINATION_COUNT = os.environ.get('PAGINATION_COUNT', 'capped')  # exact, capped, estimate or none
+    PAGINATION_COUNT_CAP = int(os.environ.get('PAGINATION_COUNT_CAP', 1000))
+    
+    # Donor search index (rebuilt periodically to pick up other workers' writes)
+    DONOR_INDEX_REFRESH_SECONDS = int(os.environ.get('DONOR_INDEX_REFRESH_SECONDS', 300))
+    GEO_CELL_DEGREES = float(os.environ.get('GEO_CELL_DEGREES', 0.1))  # ~11 km grid cells
+    
+    # Cross-worker cache (SQLite file shared by all processes on the host)
+    SHARED_CACHE_PATH = os.environ.get('SHARED_CACHE_PATH')  # Defaults to a per-database file in the instance folder (in memory for :memory: databases)
+    SHARED_CACHE_DEFAULT_TTL = int(os.environ.get('SHARED_CACHE_DEFAULT_TTL', 300))
+    HOMEPAGE_COUNTERS_TTL = int(os.environ.get('HOMEPAGE_COUNTERS_TTL', 300))
+    IDENTITY_CACHE_TTL = int(os.environ.get('IDENTITY_CACHE_TTL', 60))  # Logged-in user + profile
+    ADMIN_DASHBOARD_TTL = int(os.environ.get('ADMIN_DASHBOARD_TTL', 5))  # 0 disables the cache
+    
+    # Full-page cache for informational pages; the version changes on every deploy
+    PAGE_CACHE_ENABLED = os.environ.get('PAGE_CACHE_ENABLED', 'true').lower() == 'true'
+    PAGE_CACHE_TTL = int(os.environ.get('PAGE_CACHE_TTL', 3600))
+    PAGE_CACHE_VERSION = os.environ.get('PAGE_CACHE_VERSION') or os.environ.get('RENDER_GIT_COMMIT', 'dev')
+    PAGE_CACHE_LOCALES = ['en']
+    
+    # SQL instrumentation (query counts per request, N+1 warnings, Server-Timing header)
+    SQL_INSTRUMENTATION = os.environ.get('SQL_INSTRUMENTATION', 'true').lower() == 'true'
+    SQL_N_PLUS_ONE_THRESHOLD = int(os.environ.get('SQL_N_PLUS_ONE_THRESHOLD', 10))
+    SQL_SERVER_TIMING = os.environ.get('SQL_SERVER_TIMING', 'false').lower() == 'true'
+    
+    # Serve fingerprinted assets from app/static/dist when `flask build-assets` has run
+    ASSETS_USE_MANIFEST = os.environ.get('ASSETS_USE_MANIFEST', 'true').lower() == 'true'
+    
+    # Jinja bytecode cache directory (defaults to instance/jinja_cache)
+    TEMPLATE_CACHE_DIR = os.environ.get('TEMPLATE_CACHE_DIR')
+    
+    # Eager loading for admin list pages: joined, selectin or lazy
+    ADMIN_LOADING_STRATEGY = os.environ.get('ADMIN_LOADING_STRATEGY', 'joined')
+    
+    # Rows fetched per round trip when a listing is streamed (sub-admin "view all")
+    LISTING_YIELD_PER = int(os.environ.get('LISTING_YIELD_PER', 200))
+    
+    # Batch matching (`flask match-all`) suggestions older than this are ignored
+    SUGGESTIONS_MAX_AGE_HOURS = int(os.environ.get('SUGGESTIONS_MAX_AGE_HOURS', 24))
     
     # Upload Configuration
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
@@ -50,6 +144,9 @@ class DevelopmentConfig(Config):
     """Development environment configuration."""
     DEBUG = True
     TESTING = False
+    PAGE_CACHE_ENABLED = False  # Template edits should show up immediately
+    SQL_SERVER_TIMING = True
+    ASSETS_USE_MANIFEST = False  # Serve the editable sources directly
 
 
 class ProductionConfig(Config):
@@ -64,15 +161,13 @@ class ProductionConfig(Config):
         raise ValueError("SECRET_KEY environment variable must be set in production")
     
     # Ensure proper PostgreSQL connection pooling for Render
-    SQLALCHEMY_ENGINE_OPTIONS = {
-        'pool_size': 5,
-        'max_overflow': 10,
-        'pool_recycle': 300,
-        'pool_pre_ping': True,
-        'connect_args': {
+    SQLALCHEMY_ENGINE_OPTIONS = dict(
+        Config.SQLALCHEMY_ENGINE_OPTIONS,
+        pool_recycle=300,
+        connect_args={
             'connect_timeout': 10,
         }
-    }
+    )
 
 
 class TestingConfig(Config):
@@ -80,6 +175,7 @@ class TestingConfig(Config):
     TESTING = True
     DEBUG = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    SQLALCHEMY_ENGINE_OPTIONS = {}  # In-memory SQLite uses a single static connection
     WTF_CSRF_ENABLED = False
 
 
@@ -0,0 +1,35 @@
+"""
+Migration script to add the next_eligible_date column to donors.
+The column is backfilled from last_donation_date; its partial index is
+created by migrate_indexes.py.
+Run this script after deployment to update existing database.
+"""
+import os
+from sqlalchemy import inspect, text
+from app import create_app, db
+from app.models import Donor
+
+app = create_app(os.environ.get('FLASK_ENV', 'production'))
+
+with app.app_context():
+    try:
+        print("Starting eligibility fields migration...")
+        
+        inspector = inspect(db.engine)
+        existing = {column['name'] for column in inspector.get_columns('donors')}
+        if 'next_eligible_date' not in existing:
+            db.session.execute(text('ALTER TABLE donors ADD COLUMN next_eligible_date DATE'))
+            print("Added next_eligible_date column to donors table")
+        db.session.commit()
+        
+        updated = Donor.backfill_next_eligible_dates()
+        print(f"Backfilled next_eligible_date for {updated} donors")
+        
+        print("✅ Eligibility fields migration completed successfully!")
+        
+    except Exception as e:
+        db.session.rollback()
+        print(f"❌ Migration error: {e}")
+        # Don't fail the build - app might still work
+        import traceback
+        traceback.print_exc()
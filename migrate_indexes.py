@@ -0,0 +1,55 @@
+"""
+Migration script to bring the indexes of the main tables in line with the
+models: creates the composite and partial indexes declared in
+``__table_args__`` and drops single-column indexes they replace.
+Run this script after deployment to update existing database.
+"""
+import os
+from sqlalchemy import inspect, text
+from app import create_app, db
+from app.models import User, Donor, Patient, Feedback
+
+app = create_app(os.environ.get('FLASK_ENV', 'production'))
+
+# Indexes no query uses any more (city lookups go through city_key,
+# availability/eligibility filters through the partial indexes and patient
+# priority through urgency_rank)
+OBSOLETE_INDEXES = [
+    'ix_donors_available_city_key_blood_group',  # Duplicated ix_donors_city_key_blood_group_available
+    'ix_donors_city',
+    'ix_donors_is_available',
+    'ix_donors_next_eligible_date',
+    'ix_patients_city',
+    'ix_patients_open_urgency_created_at',  # Replaced by ix_patients_priority
+    'ix_patients_urgency_created_at_id',
+]
+
+with app.app_context():
+    try:
+        print("Starting index migration...")
+        
+        inspector = inspect(db.engine)
+        for model in (User, Donor, Patient, Feedback):
+            table = model.__table__
+            existing = {index['name'] for index in inspector.get_indexes(table.name)}
+            for index in sorted(table.indexes, key=lambda index: index.name):
+                if index.name not in existing:
+                    index.create(db.engine)
+                    print(f"Created index {index.name}")
+        
+        for name in OBSOLETE_INDEXES:
+            db.session.execute(text(f'DROP INDEX IF EXISTS {name}'))
+        db.session.commit()
+        
+        # Refresh planner statistics so the new indexes are considered right away
+        db.session.execute(text('ANALYZE'))
+        db.session.commit()
+        
+        print("✅ Index migration completed successfully!")
+        
+    except Exception as e:
+        db.session.rollback()
+        print(f"❌ Migration error: {e}")
+        # Don't fail the build - app might still work
+        import traceback
+        traceback.print_exc()
@@ -0,0 +1,37 @@
+"""
+Migration script to add latitude/longitude columns to donors and patients.
+The pincodes reference table itself is created by db.create_all().
+Run this script after deployment to update existing database.
+"""
+import os
+from sqlalchemy import inspect, text
+from app import create_app, db
+
+app = create_app(os.environ.get('FLASK_ENV', 'production'))
+
+NEW_COLUMNS = {
+    'donors': ['latitude', 'longitude'],
+    'patients': ['latitude', 'longitude'],
+}
+
+with app.app_context():
+    try:
+        print("Starting location fields migration...")
+        
+        inspector = inspect(db.engine)
+        for table, columns in NEW_COLUMNS.items():
+            existing = {column['name'] for column in inspector.get_columns(table)}
+            for column in columns:
+                if column not in existing:
+                    db.session.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} FLOAT'))
+                    print(f"Added {column} column to {table} table")
+        
+        db.session.commit()
+        print("✅ Location fields migration completed successfully!")
+        
+    except Exception as e:
+        db.session.rollback()
+        print(f"❌ Migration error: {e}")
+        # Don't fail the build - app might still work
+        import traceback
+        traceback.print_exc()
@@ -0,0 +1,51 @@
+"""
+Migration script to add normalized city_key/state_key columns to donors and
+patients, with their composite indexes, and backfill existing rows.
+Run this script after deployment to update existing database.
+"""
+import os
+from sqlalchemy import inspect, text
+from app import create_app, db
+from app.utils import backfill_location_keys
+
+app = create_app(os.environ.get('FLASK_ENV', 'production'))
+
+NEW_COLUMNS = {
+    'donors': ['city_key', 'state_key'],
+    'patients': ['city_key', 'state_key'],
+}
+
+NEW_INDEXES = {
+    'ix_donors_city_key_blood_group_available': 'donors (city_key, blood_group, is_available)',
+    'ix_donors_state_key_blood_group': 'donors (state_key, blood_group)',
+    'ix_patients_city_key_blood_group': 'patients (city_key, blood_group_required)',
+    'ix_patients_state_key_blood_group': 'patients (state_key, blood_group_required)',
+}
+
+with app.app_context():
+    try:
+        print("Starting location keys migration...")
+        
+        inspector = inspect(db.engine)
+        for table, columns in NEW_COLUMNS.items():
+            existing = {column['name'] for column in inspector.get_columns(table)}
+            for column in columns:
+                if column not in existing:
+                    db.session.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} VARCHAR(50)'))
+                    print(f"Added {column} column to {table} table")
+        
+        for name, definition in NEW_INDEXES.items():
+            db.session.execute(text(f'CREATE INDEX IF NOT EXISTS {name} ON {definition}'))
+        db.session.commit()
+        
+        donors, patients = backfill_location_keys()
+        print(f"Backfilled location keys for {donors} donors and {patients} patients")
+        
+        print("✅ Location keys migration completed successfully!")
+        
+    except Exception as e:
+        db.session.rollback()
+        print(f"❌ Migration error: {e}")
+        # Don't fail the build - app might still work
+        import traceback
+        traceback.print_exc()
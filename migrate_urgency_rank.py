@@ -0,0 +1,41 @@
+"""
+Migration script to add the urgency_rank column to patients, backfill it
+from urgency_level and make it NOT NULL (PostgreSQL; SQLite cannot alter
+columns, the backfill leaves no NULLs there). The priority index on it is created by migrate_indexes.py.
+Run this script after deployment to update existing database.
+"""
+import os
+from sqlalchemy import inspect, text
+from app import create_app, db
+from app.models import Patient
+
+app = create_app(os.environ.get('FLASK_ENV', 'production'))
+
+with app.app_context():
+    try:
+        print("Starting urgency rank migration...")
+        
+        inspector = inspect(db.engine)
+        existing = {column['name'] for column in inspector.get_columns('patients')}
+        if 'urgency_rank' not in existing:
+            db.session.execute(text('ALTER TABLE patients ADD COLUMN urgency_rank SMALLINT'))
+            print("Added urgency_rank column to patients table")
+        db.session.commit()
+        
+        updated = Patient.backfill_urgency_ranks()
+        print(f"Backfilled urgency_rank for {updated} patients")
+        
+        # Keyset pagination seeks on urgency_rank, which skips NULL ranks
+        if db.engine.dialect.name == 'postgresql':
+            db.session.execute(text('ALTER TABLE patients ALTER COLUMN urgency_rank SET NOT NULL'))
+            db.session.commit()
+            print("Made urgency_rank NOT NULL")
+        
+        print("✅ Urgency rank migration completed successfully!")
+        
+    except Exception as e:
+        db.session.rollback()
+        print(f"❌ Migration error: {e}")
+        # Don't fail the build - app might still work
+        import traceback
+        traceback.print_exc()
@@ -3,7 +3,8 @@ Application entry point for the Blood Donation Network.
 """
 import os
 from app import create_app, db
-from app.models import User, Donor, Patient, Feedback, OTP
+import click
+from app.models import User, Donor, Patient, Feedback, OTP, Pincode, DonorSuggestion, BloodGroupStat
 
 # Get configuration from environment variable, default to production for safety
 config_name = os.environ.get('FLASK_ENV', 'production')
@@ -22,7 +23,10 @@ def make_shell_context():
         'Donor': Donor,
         'Patient': Patient,
         'Feedback': Feedback,
-        'OTP': OTP
+        'OTP': OTP,
+        'Pincode': Pincode,
+        'DonorSuggestion': DonorSuggestion,
+        'BloodGroupStat': BloodGroupStat
     }
 
 
@@ -43,5 +47,298 @@ def drop_db():
         print("Operation cancelled.")
 
 
+@app.cli.command('load-pincodes')
+@click.argument('csv_path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--no-backfill', is_flag=True, help='Do not update donor/patient coordinates.')
+def load_pincodes(csv_path, no_backfill):
+    """Load pincode coordinates from a CSV (pincode,latitude,longitude[,city,state])."""
+    from app.geo import load_pincodes_csv, backfill_coordinates
+    from app.donor_index import donor_index
+    
+    inserted, updated, skipped = load_pincodes_csv(csv_path)
+    print(f"Pincodes loaded: {inserted} inserted, {updated} updated, {skipped} skipped")
+    
+    if not no_backfill:
+        donors, patients = backfill_coordinates()
+        donor_index.invalidate()
+        print(f"Coordinates updated for {donors} donors and {patients} patients")
+
+
+@app.cli.command('rebuild-search-index')
+def rebuild_search_index():
+    """Rebuild the admin user search documents."""
+    from app.search import rebuild_search_index as rebuild
+    
+    rebuild()
+    print(f"Search index rebuilt for {User.query.count()} users")
+
+
+@app.cli.command('build-assets')
+def build_assets():
+    """Fingerprint, minify and precompress the static assets."""
+    from app.assets import build_assets as build, brotli
+    
+    manifest = build(app.static_folder)
+    for source, hashed in sorted(manifest.items()):
+        print(f"{source} -> {hashed}")
+    if brotli is None:
+        print("brotli is not installed; only gzip variants were written")
+    print(f"Built {len(manifest)} assets")
+
+
+@app.cli.command('precompile-templates')
+def precompile_templates():
+    """Compile every template into the bytecode cache."""
+    names = app.jinja_env.list_templates(extensions=['html'])
+    for name in names:
+        app.jinja_env.get_template(name)
+    print(f"Precompiled {len(names)} templates")
+
+
+@app.cli.command('benchmark-templates')
+@click.option('--rounds', type=int, default=5, show_default=True, help='Cold loads to average.')
+def benchmark_templates(rounds):
+    """Compare cold template loading with and without the bytecode cache."""
+    import time
+    
+    names = app.jinja_env.list_templates(extensions=['html'])
+    bytecode_cache = app.jinja_env.bytecode_cache
+    
+    def cold_load(cache):
+        started = time.perf_counter()
+        for _ in range(rounds):
+            # A fresh environment behaves like a newly started worker
+            env = app.jinja_env.overlay(cache_size=0, bytecode_cache=cache)
+            for name in names:
+                env.get_template(name)
+        return (time.perf_counter() - started) / rounds * 1000
+    
+    if bytecode_cache is not None:
+        cold_load(bytecode_cache)  # Make sure the cache is populated
+    compiled = cold_load(None)
+    cached = cold_load(bytecode_cache) if bytecode_cache is not None else compiled
+    
+    print(f"{len(names)} templates, average of {rounds} cold loads")
+    print(f"  compiling from source: {compiled:.1f} ms")
+    print(f"  from bytecode cache:   {cached:.1f} ms ({compiled / cached:.1f}x faster)")
+
+
+@app.cli.command('clear-page-cache')
+def clear_page_cache():
+    """Drop every cached informational page."""
+    from app.page_cache import clear_page_cache as clear
+    
+    clear()
+    print("Page cache cleared")
+
+
+@app.cli.command('db-explain')
+@click.option('--analyze', is_flag=True, help='Execute the queries and show actual timings (PostgreSQL).')
+def db_explain(analyze):
+    """Show the query plans of the main listing and matching queries."""
+    from app.query_plans import report_queries, explain
+    
+    for title, query in report_queries():
+        print(f"== {title}")
+        for line in explain(query, analyze=analyze):
+            print(f"   {line}")
+        print()
+
+
+@app.cli.command('repair-stats')
+def repair_stats():
+    """Recount the blood group statistics table."""
+    from app.stats import repair_blood_group_stats
+    
+    drifted = repair_blood_group_stats()
+    if drifted:
+        print(f"Blood group statistics repaired for: {', '.join(drifted)}")
+    else:
+        print("Blood group statistics were consistent")
+
+
+@app.cli.command('backfill-eligibility')
+def backfill_eligibility():
+    """Recompute every donor's next eligible donation date."""
+    updated = Donor.backfill_next_eligible_dates()
+    print(f"Next eligible date updated for {updated} donors")
+
+
+@app.cli.command('match-all')
+@click.option('--workers', type=int, default=None, help='Worker processes (default: CPU count).')
+@click.option('--per-patient', type=int, default=5, show_default=True, help='Donors suggested per request.')
+@click.option('--max-offers', type=int, default=3, show_default=True, help='Requests a donor is suggested for.')
+@click.option('--universal-max-offers', type=int, default=1, show_default=True,
+              help='Requests an O- donor is suggested for.')
+def match_all(workers, per_patient, max_offers, universal_max_offers):
+    """Assign available donors to all open patient requests."""
+    import time
+    from app.batch_matching import match_all as run_match_all
+    
+    started = time.perf_counter()
+    summary = run_match_all(
+        workers=workers,
+        per_patient=per_patient,
+        max_offers=max_offers,
+        universal_max_offers=universal_max_offers
+    )
+    elapsed = time.perf_counter() - started
+    print(f"Matched {summary['requests_matched']} requests across {summary['states']} states "
+          f"with {summary['suggestions']} suggestions in {elapsed:.2f}s")
+
+
+def run_import(kind, path, batch_size, workers, restart, errors_path, credentials_path):
+    """Run a bulk import and report progress, shared by the import commands."""
+    import csv
+    import time
+    from app.bulk_import import import_file
+    
+    started = time.perf_counter()
+    
+    def progress(summary):
+        # Counts include the rows of an interrupted run this one resumes
+        print(f"{summary['rows']} rows: {summary['created']} created, {summary['existing']} existing, "
+              f"{summary['invalid']} invalid ({time.perf_counter() - started:.1f}s)")
+    
+    importer = import_file(
+        path, kind, batch_size=batch_size, workers=workers, restart=restart,
+        credentials_path=credentials_path, progress=progress
+    )
+    
+    if importer.errors:
+        if errors_path:
+            with open(errors_path, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(['line', 'email', 'errors'])
+                writer.writerows(importer.errors)
+            print(f"{len(importer.errors)} invalid rows written to {errors_path}")
+        else:
+            for line, email, message in importer.errors[:20]:
+                print(f"  line {line} ({email or 'no email'}): {message}")
+            if len(importer.errors) > 20:
+                print(f"  ... and {len(importer.errors) - 20} more (use --errors to save them all)")
+    if importer.summary['generated_passwords']:
+        print(f"{importer.summary['generated_passwords']} generated passwords written to {credentials_path}; "
+              f"give them to the account holders")
+    print(f"Imported {importer.summary['created']} {kind} in {time.perf_counter() - started:.1f}s")
+
+
+def import_options(command):
+    """Options shared by import-donors and import-patients."""
+    options = [
+        click.argument('path', type=click.Path(exists=True, dir_okay=False)),
+        click.option('--batch-size', type=int, default=1000, show_default=True, help='Rows per transaction.'),
+        click.option('--workers', type=int, default=None,
+                     help='Processes hashing passwords (default: CPU count).'),
+        click.option('--restart', is_flag=True, help='Ignore the checkpoint of an interrupted run.'),
+        click.option('--errors', 'errors_path', type=click.Path(dir_okay=False),
+                     help='Write rejected rows to this CSV file.'),
+        click.option('--credentials', 'credentials_path', type=click.Path(dir_okay=False),
+                     help='Generate passwords for rows without one and append them to this CSV file.'),
+    ]
+    for option in reversed(options):
+        command = option(command)
+    return command
+
+
+@app.cli.command('import-donors')
+@import_options
+def import_donors(path, batch_size, workers, restart, errors_path, credentials_path):
+    """Create donor accounts from a CSV or XLSX file (resumable)."""
+    run_import('donors', path, batch_size, workers, restart, errors_path, credentials_path)
+
+
+@app.cli.command('import-patients')
+@import_options
+def import_patients(path, batch_size, workers, restart, errors_path, credentials_path):
+    """Create patient requests from a CSV or XLSX file (resumable)."""
+    run_import('patients', path, batch_size, workers, restart, errors_path, credentials_path)
+
+
+@app.cli.command('seed-data')
+@click.option('--donors', type=int, default=10000, show_default=True, help='Seeded donors to have in total.')
+@click.option('--patients', type=int, default=1000, show_default=True, help='Seeded patients to have in total.')
+@click.option('--feedback', type=int, default=200, show_default=True, help='Feedback entries to add.')
+@click.option('--distribution', type=click.Path(exists=True, dir_okay=False),
+              help='JSON file with city and blood group weights.')
+@click.option('--seed', type=int, default=None, help='Random seed for reproducible data.')
+@click.option('--batch-size', type=int, default=5000, show_default=True, help='Rows per transaction.')
+@click.option('--password', default=None,
+              help='Password of the admin/donor/patient login accounts (default: a random one, printed).')
+@click.option('--allow-production', is_flag=True,
+              help='Run even though FLASK_ENV is production (creates an admin login).')
+def seed_data(donors, patients, feedback, distribution, seed, batch_size, password, allow_production):
+    """Generate synthetic users, donors, patients and feedback for load testing."""
+    import secrets
+    import time
+    from app.seed_data import load_distribution, seed_data as generate, seed_login_accounts
+    
+    if config_name == 'production' and not allow_production:
+        raise click.UsageError(
+            "Refusing to seed a production database (FLASK_ENV is production or unset); "
+            "pass --allow-production to do it anyway"
+        )
+    password = password or secrets.token_urlsafe(12)
+    
+    cities, blood_groups = load_distribution(distribution) if distribution else (None, None)
+    started = time.perf_counter()
+    
+    def progress(kind, done, total):
+        print(f"{kind}: {done}/{total} ({time.perf_counter() - started:.1f}s)")
+    
+    created = generate(donors=donors, patients=patients, feedback=feedback, cities=cities,
+                       blood_groups=blood_groups, seed=seed, batch_size=batch_size, progress=progress)
+    accounts = seed_login_accounts(password)
+    print(f"Created {created['donors']} donors, {created['patients']} patients and "
+          f"{created['feedback']} feedback entries in {time.perf_counter() - started:.1f}s")
+    print(f"Login accounts: {', '.join(accounts.values())}")
+    print(f"Password: {password} (pass it to `flask benchmark --password`)")
+
+
+@app.cli.command('benchmark')
+@click.option('--requests', type=int, default=50, show_default=True, help='Measured requests per endpoint.')
+@click.option('--warmup', type=int, default=5, show_default=True, help='Unmeasured requests per endpoint.')
+@click.option('--concurrency', type=int, default=1, show_default=True, help='Threads per endpoint.')
+@click.option('--endpoint', 'endpoints', multiple=True, help='Endpoint to run (repeatable, default: all).')
+@click.option('--password', required=True, help='Password of the seed-data login accounts.')
+@click.option('--output', type=click.Path(dir_okay=False), help='Result file (default: benchmarks/<time>-<commit>.json).')
+@click.option('--compare', type=click.Path(exists=True, dir_okay=False), help='Earlier result file to compare with.')
+def benchmark(requests, warmup, concurrency, endpoints, password, output, compare):
+    """Measure latency percentiles, queries per request and throughput of the main pages."""
+    import json
+    from app.benchmark import BENCHMARK_ENDPOINTS, compare_results, run_benchmark
+    from app.seed_data import SEED_EMAIL_DOMAIN
+    
+    unknown = set(endpoints) - set(BENCHMARK_ENDPOINTS)
+    if unknown:
+        raise click.BadParameter(f"unknown endpoint(s): {', '.join(sorted(unknown))}", param_hint='--endpoint')
+    
+    accounts = {role: f'{role}@{SEED_EMAIL_DOMAIN}' for role in ('admin', 'donor', 'patient')}
+    print(f"{'endpoint':<24}{'p50':>9}{'p95':>9}{'p99':>9}{'queries':>9}{'req/s':>9}")
+    
+    def progress(name, result):
+        queries = result['queries_per_request']
+        print(f"{name:<24}{result['p50_ms']:>9.1f}{result['p95_ms']:>9.1f}{result['p99_ms']:>9.1f}"
+              f"{'-' if queries is None else queries:>9}{result['throughput_rps']:>9.1f}")
+    
+    result = run_benchmark(accounts, password, endpoints=list(endpoints) or None, requests=requests,
+                           warmup=warmup, concurrency=concurrency, progress=progress)
+    
+    if not output:
+        stamp = result['timestamp'].replace(':', '').replace('-', '')
+        output = os.path.join('benchmarks', f"{stamp}-{result['commit'] or 'unknown'}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(result, f, indent=2)
+    print(f"Results saved to {output}")
+    
+    if compare:
+        with open(compare) as f:
+            baseline = json.load(f)
+        print(f"Compared with {compare} ({baseline.get('commit') or 'unknown commit'}):")
+        for name, metric, old, new, change in compare_results(baseline, result):
+            print(f"  {name:<24}{metric:<22}{old:>9}{new:>9}{change:>+8.1f}%")
+
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,65 @@
+"""
+Shared fixtures: an application on a fresh in-memory database, seeded data
+and logged-in clients.
+"""
+import os
+
+os.environ.setdefault('SECRET_KEY', 'test-secret-key')
+
+import pytest
+
+from app import create_app, db
+from app.models import User
+from app.seed_data import seed_data
+
+
+PASSWORD = 'test-password'
+
+
+@pytest.fixture
+def app():
+    """
+    Application with empty tables.
+
+    No application context stays pushed, so every test request gets its
+    own ``g`` (and its own logged-in user), as in production.
+    """
+    return create_app('testing')
+
+
+@pytest.fixture
+def seeded(app):
+    """Enough donors, patients and feedback for several listing pages."""
+    with app.app_context():
+        seed_data(donors=45, patients=45, feedback=45, seed=1, batch_size=100)
+    return app
+
+
+def create_login(app, role):
+    """Create a verified account with ``PASSWORD`` and return its email."""
+    email = f'{role}@tests.example'
+    with app.app_context():
+        user = User(email=email, role=role, is_verified=True, is_active=True)
+        user.set_password(PASSWORD)
+        db.session.add(user)
+        db.session.commit()
+    return email
+
+
+def logged_in_client(app, role):
+    """Test client logged in as a new account of ``role``."""
+    email = create_login(app, role)
+    client = app.test_client()
+    response = client.post('/auth/login', data={'email': email, 'password': PASSWORD})
+    assert response.status_code == 302, f'login as {role} failed'
+    return client
+
+
+@pytest.fixture
+def admin_client(seeded):
+    return logged_in_client(seeded, 'admin')
+
+
+@pytest.fixture
+def sub_admin_client(seeded):
+    return logged_in_client(seeded, 'sub_admin')
@@ -0,0 +1,56 @@
+"""
+Query budgets of the admin and sub-admin listings.
+
+The seeded data fills more than two pages, so a relationship loaded once
+per row would push a page far over its budget. Each budget counts loading
+the logged-in user, the listing's own statements (count, page, summary)
+and nothing per row.
+"""
+import pytest
+
+from app.instrumentation import assert_max_queries
+
+
+ADMIN_LISTINGS = [
+    ('/admin/users', 3),  # user, count, page
+    ('/admin/donors', 4),  # user, count, page, city filter options
+    ('/admin/patients', 3),
+    ('/admin/feedback', 3),
+]
+
+SUB_ADMIN_LISTINGS = [
+    ('/admin/sub-admin/users', 4),  # user, summary, count, page
+    ('/admin/sub-admin/donors', 4),
+    ('/admin/sub-admin/patients', 4),
+    ('/admin/sub-admin/users?view=all', 3),  # user, summary, every row in one streamed query
+    ('/admin/sub-admin/donors?view=all', 3),
+    ('/admin/sub-admin/patients?view=all', 3),
+]
+
+
+def get_within_budget(client, url, max_queries):
+    with assert_max_queries(max_queries):
+        response = client.get(url)
+        body = response.get_data(as_text=True)  # Streamed pages query while rendering
+    assert response.status_code == 200
+    return body
+
+
+@pytest.mark.parametrize('url, max_queries', ADMIN_LISTINGS)
+def test_admin_listing_query_budget(admin_client, url, max_queries):
+    get_within_budget(admin_client, url, max_queries)
+    get_within_budget(admin_client, url + '?page=2', max_queries)
+
+
+@pytest.mark.parametrize('url, max_queries', SUB_ADMIN_LISTINGS)
+def test_sub_admin_listing_query_budget(sub_admin_client, url, max_queries):
+    get_within_budget(sub_admin_client, url, max_queries)
+    if 'view=all' not in url:
+        get_within_budget(sub_admin_client, url + '?page=2', max_queries)
+
+
+@pytest.mark.parametrize('strategy', ['joined', 'selectin'])
+def test_loading_strategies_stay_within_budget(admin_client, strategy):
+    admin_client.application.config['ADMIN_LOADING_STRATEGY'] = strategy
+    extra = 2 if strategy == 'selectin' else 0  # One IN query per relationship
+    get_within_budget(admin_client, '/admin/users', 3 + extra)
@@ -0,0 +1,31 @@
+"""
+Identity cache: what it stores and what a cached identity can still load.
+"""
+from app import db
+from app.cache import cache
+from app.identity import UNCACHED_COLUMNS, load_identity
+from app.instrumentation import assert_max_queries
+from app.models import User
+
+
+def test_snapshot_leaves_out_secret_columns(seeded):
+    with seeded.app_context():
+        user = User.query.filter_by(role='donor').first()
+        user.set_password('first-password')
+        user.donor.medical_history = 'asthma'
+        db.session.commit()
+        user_id = user.id
+        db.session.remove()
+
+        load_identity(user_id)
+        db.session.remove()
+        snapshot = cache.get(f'identity:{user_id}')
+        for values in (snapshot['user'], snapshot['donor']):
+            assert not UNCACHED_COLUMNS & set(values)
+
+        with assert_max_queries(0):
+            user = load_identity(user_id)
+            assert user.donor.full_name
+        # Left-out columns are loaded on first access
+        assert user.check_password('first-password')
+        assert user.donor.medical_history == 'asthma'
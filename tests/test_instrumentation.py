@@ -0,0 +1,82 @@
+"""
+Per-request query counting, the Server-Timing header and N+1 warnings.
+"""
+import logging
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app import db
+from app.instrumentation import assert_max_queries, statement_shape
+
+
+@pytest.fixture
+def app(app):
+    """Application with views that run a known number of statements."""
+    @app.route('/_test/queries/<int:n>')
+    def run_queries(n):
+        for i in range(n):
+            db.session.execute(text('SELECT :i'), {'i': i})
+        return 'ok'
+
+    @app.route('/_test/failed-query')
+    def run_failed_query():
+        try:
+            db.session.execute(text('SELECT * FROM no_such_table'))
+        except OperationalError:
+            db.session.rollback()
+        db.session.execute(text('SELECT 1'))
+        return 'ok'
+
+    app.config['SQL_SERVER_TIMING'] = True
+    return app
+
+
+def test_server_timing_reports_query_count(app):
+    response = app.test_client().get('/_test/queries/3')
+    assert response.headers['Server-Timing'].startswith('db;dur=')
+    assert response.headers['Server-Timing'].endswith('desc="3 queries"')
+
+
+def test_server_timing_can_be_disabled(app):
+    app.config['SQL_SERVER_TIMING'] = False
+    assert 'Server-Timing' not in app.test_client().get('/_test/queries/3').headers
+
+
+def test_failed_statement_is_not_counted(app):
+    client = app.test_client()
+    assert client.get('/_test/failed-query').headers['Server-Timing'].endswith('desc="1 queries"')
+    # The next request on the same connection still counts exactly
+    assert client.get('/_test/queries/2').headers['Server-Timing'].endswith('desc="2 queries"')
+
+
+def test_repeated_statement_logs_n_plus_one(app, caplog):
+    app.config['SQL_N_PLUS_ONE_THRESHOLD'] = 5
+    client = app.test_client()
+
+    with caplog.at_level(logging.WARNING):
+        client.get('/_test/queries/4')
+    assert 'Possible N+1' not in caplog.text
+
+    with caplog.at_level(logging.WARNING):
+        client.get('/_test/queries/5')
+    assert 'Possible N+1 in run_queries: statement executed 5 times' in caplog.text
+
+
+def test_assert_max_queries(app):
+    with app.app_context():
+        with assert_max_queries(2) as stats:
+            db.session.execute(text('SELECT 1'))
+            db.session.execute(text('SELECT 2'))
+        assert stats.count == 2
+
+        with pytest.raises(AssertionError, match='3 queries executed, budget was 2'):
+            with assert_max_queries(2):
+                for i in range(3):
+                    db.session.execute(text('SELECT 1'))
+
+
+def test_statement_shape_collapses_parameter_lists():
+    assert statement_shape('SELECT *\n  FROM t WHERE id IN (?, ?, ?)') == \
+        statement_shape('SELECT * FROM t WHERE id IN (?, ?)') == 'SELECT * FROM t WHERE id IN (?)'
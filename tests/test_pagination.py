@@ -0,0 +1,90 @@
+"""
+Keyset pagination over the listing orders.
+"""
+import base64
+import json
+import re
+from datetime import date
+
+import pytest
+
+from app import db
+from app.admin.routes import PATIENT_ORDER, USER_ORDER
+from app.models import Patient, User
+from app.pagination import KeysetPagination, order_query
+
+
+@pytest.fixture
+def patients_with_fulfilled(seeded):
+    """Seeded patients, a third of them fulfilled, so pages cross the open/fulfilled boundary."""
+    with seeded.app_context():
+        Patient.query.filter(Patient.id % 3 == 0).update({Patient.is_fulfilled: True}, synchronize_session=False)
+        db.session.commit()
+    return seeded
+
+
+def walk(query, order_by, per_page):
+    """Follow next cursors to the end, then prev cursors back to the start."""
+    forward, pages = [], []
+    cursor = None
+    while True:
+        page = KeysetPagination(query, order_by, per_page, cursor=cursor, count=None)
+        forward.extend(row.id for row in page.items)
+        pages.append([row.id for row in page.items])
+        if not page.has_next:
+            break
+        cursor = page.next_cursor
+
+    backward = []
+    while page.has_prev:
+        page = KeysetPagination(query, order_by, per_page, cursor=page.prev_cursor, count=None)
+        backward.append([row.id for row in page.items])
+    return forward, pages, backward
+
+
+@pytest.mark.parametrize('model, order_by', [(Patient, PATIENT_ORDER), (User, USER_ORDER)])
+def test_cursor_walks_every_row_once(patients_with_fulfilled, model, order_by):
+    with patients_with_fulfilled.app_context():
+        expected = [row.id for row in order_query(model.query, order_by)]
+        forward, pages, backward = walk(model.query, order_by, per_page=7)
+
+        assert forward == expected
+        assert backward == pages[-2::-1]
+
+
+def test_patient_listing_second_page_in_keyset_mode(patients_with_fulfilled, admin_client, sub_admin_client):
+    patients_with_fulfilled.config['PAGINATION_MODE'] = 'keyset'
+    for client, url in ((admin_client, '/admin/patients'), (sub_admin_client, '/admin/sub-admin/patients')):
+        seen = set()
+        while url:
+            response = client.get(url)
+            assert response.status_code == 200
+            body = response.get_data(as_text=True)
+            seen.update(re.findall(r'<tr>\s*<td>(\d+)</td>', body))
+            match = re.search(r'href="([^"]*cursor=[^"]*)"[^>]*>\s*Next', body)
+            url = match.group(1).replace('&amp;', '&') if match else None
+        assert len(seen) == 45
+
+
+@pytest.mark.parametrize('key', [
+    [[1], 'x'],
+    ['x', 1],
+    [{'d': '2026-01-01'}, 1],  # A date where a datetime is expected
+    [True, 1],
+    [None, 1],
+    [{'dt': '2026-01-01T00:00:00'}, 1, 2],
+])
+def test_malformed_cursor_falls_back_to_first_page(admin_client, key):
+    token = base64.urlsafe_b64encode(json.dumps({'k': key, 'd': 'n'}).encode()).decode().rstrip('=')
+    first = admin_client.get('/admin/users?cursor=')
+    response = admin_client.get(f'/admin/users?cursor={token}')
+    assert response.status_code == 200
+    assert re.findall(r'<td>(\d+)</td>', response.get_data(as_text=True)) == \
+        re.findall(r'<td>(\d+)</td>', first.get_data(as_text=True))
+
+
+def test_patient_cursor_accepts_its_own_keys(patients_with_fulfilled):
+    with patients_with_fulfilled.app_context():
+        page = KeysetPagination(Patient.query, PATIENT_ORDER, 10, count=None)
+        assert page._valid_key(page._row_key(page.items[-1]))
+        assert not page._valid_key([1, 2, date.today(), 3])  # int where a boolean is expected